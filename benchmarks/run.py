@@ -0,0 +1,144 @@
+import argparse
+import contextlib
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from benchmarks.server import StandInAPI
+from benchmarks.synthetic import write_jsonl
+
+SCENARIOS = ("extract", "transform_csv", "transform_parquet", "pipeline")
+DEFAULT_CONFIG = Path(__file__).resolve().parents[1] / "config" / "config.yaml"
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process, None where `resource` is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_scenario(name, config, workdir, rows, latency, error_rate):
+    """Run one scenario in the current (fresh) process and return its measurements."""
+    from etl_pipeline.extractor import Extractor
+    from etl_pipeline.pipeline import Pipeline
+    from etl_pipeline.transformer import Transformer
+
+    logging.disable(logging.CRITICAL)
+    data_dir = Path(workdir)
+    config = copy.deepcopy(config)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if name == "extract":
+            with StandInAPI(rows, latency, error_rate, config["api"]["api_path"]) as api:
+                config["api"]["base_url"] = api.base_url
+                start = time.perf_counter()
+                _, count = Extractor(config, data_dir=data_dir).run()
+                elapsed = time.perf_counter() - start
+        elif name in ("transform_csv", "transform_parquet"):
+            config["output"]["format"] = name.split("_", 1)[1]
+            start = time.perf_counter()
+            _, count = Transformer(config, data_dir=data_dir).run()
+            elapsed = time.perf_counter() - start
+        elif name == "pipeline":
+            with StandInAPI(rows, latency, error_rate, config["api"]["api_path"]) as api:
+                config["api"]["base_url"] = api.base_url
+                config["output"]["raw_file"] = "pipeline_raw.jsonl"
+                start = time.perf_counter()
+                result = Pipeline(Extractor(config, data_dir=data_dir), Transformer(config, data_dir=data_dir)).run()
+                elapsed = time.perf_counter() - start
+            count = result["transformed"][1] if result else 0
+        else:
+            raise ValueError(f"Unknown scenario: {name}")
+
+    return {
+        "rows": count,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(count / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """List scenarios whose throughput dropped, or peak memory grew, by more than `threshold`."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous.get("rows_per_sec") and current["rows_per_sec"] is not None:
+            if current["rows_per_sec"] < previous["rows_per_sec"] * (1 - threshold):
+                regressions.append(f"{name}: {current['rows_per_sec']} rows/s vs {previous['rows_per_sec']} baseline")
+        if previous.get("peak_rss_mb") and current["peak_rss_mb"] is not None:
+            if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + threshold):
+                regressions.append(f"{name}: {current['peak_rss_mb']} MB peak RSS vs {previous['peak_rss_mb']} baseline")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ETL pipeline against a local stand-in API.")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG), help="pipeline config to benchmark")
+    parser.add_argument("--rows", type=int, default=10000, help="rows served by the API / generated for transforms")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of latency per API request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API requests failing with a 500")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of scenarios")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+
+    results = {"commit": git_commit(), "rows": args.rows, "latency": args.latency, "error_rate": args.error_rate, "scenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="etl-bench-") as workdir:
+        if any(s.startswith("transform") for s in scenarios):
+            write_jsonl(os.path.join(workdir, config["output"]["raw_file"]), args.rows)
+
+        # One fresh process per scenario, so peak RSS is that scenario's alone
+        context = multiprocessing.get_context("spawn")
+        for name in scenarios:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                measured = pool.submit(run_scenario, name, config, workdir, args.rows, args.latency, args.error_rate).result()
+            results["scenarios"][name] = measured
+            print(f"{name:<18} {measured['rows']:>9} rows  {measured['seconds']:>8.2f}s  "
+                  f"{measured['rows_per_sec'] or 0:>11.1f} rows/s  {measured['peak_rss_mb']} MB peak")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import make_character
+
+
+class CharactersHandler(BaseHTTPRequestHandler):
+    """Serves /v1/public/characters with the Marvel envelope over synthetic rows."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path != server.api_path:
+            return self._send(404, {"code": 404, "status": "Not found"})
+
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            failed = server.rng.random() < server.error_rate
+        if failed:
+            return self._send(500, {"code": 500, "status": "Synthetic failure"})
+
+        query = parse_qs(url.query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["20"])[0])
+        results = [make_character(i) for i in range(offset, min(offset + limit, server.rows))]
+        self._send(200, {
+            "code": 200,
+            "status": "Ok",
+            "etag": f"{offset}-{limit}-{server.rows}",
+            "data": {"offset": offset, "limit": limit, "total": server.rows, "count": len(results), "results": results},
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInAPI:
+    """Local stand-in for the Marvel API, run in a background thread."""
+
+    def __init__(self, rows=1000, latency=0.0, error_rate=0.0, api_path="/v1/public/characters", seed=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), CharactersHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.rows = rows
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.api_path = api_path
+        self.httpd.rng = random.Random(seed)
+        self.httpd.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for /v1/public/characters.")
+    parser.add_argument("--rows", type=int, default=1500)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    args = parser.parse_args()
+
+    with StandInAPI(args.rows, args.latency, args.error_rate) as api:
+        print(f"Serving {args.rows} characters at {api.base_url}/v1/public/characters (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
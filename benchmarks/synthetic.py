@@ -0,0 +1,56 @@
+import argparse
+import json
+import random
+
+WORDS = ["mutant", "gamma", "shield", "avenger", "cosmic", "symbiote", "asgard", "web", "armor", "hydra"]
+
+
+def make_character(i):
+    """Deterministic synthetic character shaped like a /v1/public/characters result."""
+    rng = random.Random(i)
+    words = rng.choices(WORDS, k=rng.randint(0, 40))
+    # messy whitespace like the real descriptions
+    description = "".join(w + rng.choice([" ", "  ", "\n", "\t ", "\r\n"]) for w in words)
+
+    def collection(kind):
+        if rng.random() < 0.02:
+            return None
+        available = rng.randint(0, 3000)
+        items = [{"resourceURI": f"http://gateway.marvel.com/v1/public/{kind}/{rng.randint(1, 99999)}", "name": f"{kind} item"}
+                 for _ in range(min(available, 20))]
+        return {"available": available, "collectionURI": f"http://gateway.marvel.com/v1/public/characters/{i}/{kind}",
+                "items": items, "returned": len(items)}
+
+    return {
+        "id": 1000000 + i,
+        "name": f"Synthetic Hero {i}",
+        "description": description,
+        "modified": f"20{rng.randint(10, 24):02d}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00-0400",
+        "thumbnail": {"path": f"http://i.annihil.us/u/prod/marvel/i/mg/{i}", "extension": "jpg"},
+        "resourceURI": f"http://gateway.marvel.com/v1/public/characters/{1000000 + i}",
+        "comics": collection("comics"),
+        "series": collection("series"),
+        "stories": collection("stories"),
+        "events": collection("events"),
+        "urls": [{"type": "detail", "url": f"http://marvel.com/characters/{i}"}],
+    }
+
+
+def write_jsonl(path, rows):
+    """Write `rows` synthetic characters as raw JSONL, like Extractor.run would."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(json.dumps(make_character(i)) + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic character JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+    write_jsonl(args.path, args.rows)
+
+
+if __name__ == "__main__":
+    main()
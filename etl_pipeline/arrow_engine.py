@@ -0,0 +1,89 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+
+from etl_pipeline import raw_io
+
+# Same characters Python's `\s` (str.isspace) matches in the pandas engine, spelled for RE2
+WHITESPACE = r"[\t-\r\x1c-\x20\x85\p{Z}]+"
+
+
+def raw_schema(nested_fields, name_field="name"):
+    """Explicit JSON schema: only the fields the output needs are parsed, everything else is skipped."""
+    fields = [("id", pa.int64()), (name_field, pa.string()), ("description", pa.string())]
+    for column, kind in nested_fields.items():
+        if kind == "available":
+            fields.append((column, pa.struct([("available", pa.int64())])))
+        elif kind == "length":
+            fields.append((column, pa.list_(pa.struct([]))))
+        else:
+            raise ValueError(f"Unsupported nested field extraction: {kind}")
+    return pa.schema(fields)
+
+
+def read_raw(path, nested_fields, name_field="name"):
+    """Read the raw file: Arrow IPC landings are memory-mapped, JSONL goes through the multithreaded JSON reader."""
+    fmt, compression = raw_io.detect_format(path)
+    if fmt == "arrow":
+        return raw_io.read_arrow(path)
+    return read_jsonl(pa.input_stream(str(path), compression=compression), nested_fields, name_field)
+
+
+def read_jsonl(source, nested_fields, name_field="name"):
+    """Parse JSONL from a stream or file-like object, keeping only the fields of raw_schema."""
+    return pa_json.read_json(
+        source,
+        read_options=pa_json.ReadOptions(use_threads=True),
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=raw_schema(nested_fields, name_field), unexpected_field_behavior="ignore"
+        ),
+    )
+
+
+def flatten(raw, nested_fields, name_field="name"):
+    """Extract nested counts and clean description with Arrow compute kernels.
+
+    Column types follow the pandas engine: counts with missing values become float64
+    and all-missing counts become null, so both engines write the same schema.
+    """
+    description = pc.replace_substring_regex(raw["description"].fill_null(""), WHITESPACE, " ")
+    columns = {
+        "id": raw["id"],
+        "name": raw[name_field],
+        # every whitespace run is a single space now, so trimming spaces is a full strip
+        "description": pc.utf8_trim(description, characters=" "),
+    }
+    for column, kind in nested_fields.items():
+        if kind == "available":
+            counts = pc.struct_field(raw[column], "available")
+        else:
+            counts = pc.list_value_length(raw[column])
+        if counts.null_count == len(counts):
+            counts = pa.nulls(len(counts))
+        elif counts.null_count:
+            counts = counts.cast(pa.float64())
+        columns[column] = counts
+    return pa.table(columns)
+
+
+def write_csv(table, path, dtypes=None):
+    """Write CSV through pandas' formatter, so both engines produce the same bytes.
+
+    Arrow's own writer quotes every string and drops the `.0` of float counts. The table is converted to
+    the dtypes the pandas engine writes: the declared `dtypes`, or Arrow's default pandas conversion.
+    """
+    df = table.to_pandas()
+    if dtypes:
+        df = df.astype(dtypes)
+    df.to_csv(path, index=False)
+
+
+def preview_markdown(table, max_rows=10, max_colwidth=20):
+    from tabulate import tabulate
+
+    rows = table.slice(0, max_rows).to_pylist()
+    for row in rows:
+        for key, value in row.items():
+            if isinstance(value, str) and len(value) > max_colwidth:
+                row[key] = value[:max_colwidth] + "..."
+    print(tabulate(rows, headers="keys", tablefmt="pipe"))
@@ -0,0 +1,46 @@
+import contextlib
+import os
+import shutil
+
+
+def partial_path(path):
+    """Where an output is written before it is published under `path`."""
+    return f"{path}.partial"
+
+
+def discard(path):
+    """Remove a file or directory if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def publish(tmp_path, path):
+    """Atomically move a finished output into place, replacing the previous one.
+
+    Files are swapped with a single rename. A directory (partitioned Parquet dataset) cannot replace
+    a non-empty one in one rename, so the old output is moved aside first and removed afterwards.
+    """
+    if not os.path.isdir(path) and not os.path.isdir(tmp_path):
+        os.replace(tmp_path, path)
+        return
+    old_path = f"{path}.old"
+    discard(old_path)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    discard(old_path)
+
+
+@contextlib.contextmanager
+def atomic_output(path):
+    """Yield a temporary path to write to, published under `path` only if the block completes."""
+    tmp_path = partial_path(path)
+    discard(tmp_path)
+    try:
+        yield tmp_path
+    except BaseException:
+        discard(tmp_path)
+        raise
+    publish(tmp_path, path)
@@ -0,0 +1,290 @@
+import json
+import logging
+import math
+import os
+import signal
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import yaml
+
+from etl_pipeline.atomic import atomic_output
+from etl_pipeline.http_session import build_session
+from etl_pipeline.main import CONFIG_PATH, DATA_DIR, build_pipelines, load_config, run_resources
+from etl_pipeline.scheduler import resource_configs
+
+DEFAULT_SETTINGS = {
+    "interval_seconds": 300,
+    "cron": None,
+    "history_size": 100,
+    "history_file": "daemon_history.json",
+}
+
+# (low, high) of the five cron fields: minute, hour, day of month, month, day of week (0 and 7 = Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        base, slash, step = part.partition("/")
+        step = int(step) if slash else 1
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (int(value) for value in base.split("-", 1))
+        else:
+            start = int(base)
+            end = high if slash else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field: {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A 5-field cron expression (minute hour day-of-month month day-of-week) evaluated in local time.
+
+    Fields accept `*`, numbers, ranges `a-b`, steps `*/n` / `a-b/n` and comma lists. As in cron, when both
+    day fields are restricted a day matching either of them matches.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def matches(self, moment):
+        return (moment.minute in self.minutes and moment.hour in self.hours
+                and moment.month in self.months and self._day_matches(moment))
+
+    def next_after(self, moment):
+        """The first matching minute strictly after `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+def _pool_size(config):
+    """Connections needed by the widest resource, or by the shared in-flight budget when it is larger."""
+    sizes = []
+    for _, resource in resource_configs(config):
+        api = resource["api"]
+        sizes.append(max(api.get("pool_size", max(10, api.get("concurrency", 1))), api.get("max_in_flight") or 0))
+    return max(sizes)
+
+
+def _summary(result):
+    if not result:
+        return {"success": False}
+    summary = {"success": True, "raw_rows": result["raw"][1], "transformed_rows": result["transformed"][1],
+               "timings": result["timings"]}
+    if "loaded" in result:
+        summary["loaded_rows"] = result["loaded"][1]
+    return summary
+
+
+class Daemon:
+    """Keep one process running the pipeline on an interval or cron schedule.
+
+    Runs never overlap: the next one is scheduled once the current one has finished, and ticks missed
+    while a run overran are skipped. The HTTP session and imported modules stay warm between runs, the
+    config file is reloaded when it changes, SIGTERM/SIGINT stop after the page being extracted and
+    SIGUSR1 dumps the bounded run history to the data directory.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH, data_dir=DATA_DIR, interval=None, cron=None, history_size=None,
+                 force=False, clock=time.time):
+        self.config_path = config_path
+        self.data_dir = data_dir
+        self.force = force
+        self.clock = clock
+        # command line values win over the config's daemon section
+        self.overrides = {"interval_seconds": interval, "cron": cron, "history_size": history_size}
+
+        self.stop_event = threading.Event()
+        self.session = None
+        self._session_pool_size = None
+        self._previous_handlers = {}
+
+        self.config = None
+        self._config_mtime = None
+        self.reload_config()
+        self.history = deque(maxlen=self.settings["history_size"])
+        self.runs = 0
+
+    def _settings(self, config):
+        settings = {**DEFAULT_SETTINGS, **(config.get("daemon") or {})}
+        settings.update({key: value for key, value in self.overrides.items() if value is not None})
+        if settings["cron"]:
+            schedule = CronSchedule(settings["cron"])
+        elif settings["interval_seconds"] and settings["interval_seconds"] > 0:
+            schedule = None
+        else:
+            raise ValueError("daemon needs a positive interval_seconds or a cron expression")
+        return settings, schedule
+
+    def reload_config(self):
+        """Load the config file if it changed since the last load; an invalid file keeps the running config."""
+        mtime = os.stat(self.config_path).st_mtime_ns
+        if mtime == self._config_mtime:
+            return False
+        self._config_mtime = mtime
+        try:
+            config = load_config(self.config_path)
+            resource_configs(config)
+            settings, schedule = self._settings(config)
+        except (OSError, yaml.YAMLError, KeyError, TypeError, ValueError) as e:
+            if self.config is None:
+                raise
+            logging.error(f"Config {self.config_path} not reloaded, keeping the running one: {e}")
+            return False
+
+        if self.config is not None:
+            logging.info(f"Config {self.config_path} changed, reloaded.")
+            if settings["history_size"] != self.history.maxlen:
+                self.history = deque(self.history, maxlen=settings["history_size"])
+        self.config, self.settings, self.schedule = config, settings, schedule
+        return True
+
+    def _session(self):
+        pool_size = _pool_size(self.config)
+        if pool_size != self._session_pool_size:
+            if self.session is not None:
+                self.session.close()
+            self.session = build_session(pool_size)
+            self._session_pool_size = pool_size
+        return self.session
+
+    def run_once(self):
+        """Run every configured resource once and record the outcome in the history."""
+        self.reload_config()
+        self.runs += 1
+        entry = {"run": self.runs, "started_at": self.clock()}
+        start = time.perf_counter()
+        try:
+            pipelines = build_pipelines(self.config, data_dir=self.data_dir, force=self.force,
+                                        session=self._session(), stop_event=self.stop_event)
+            result = run_resources(pipelines)
+            results = result if len(pipelines) > 1 else {next(iter(pipelines)): result}
+            entry["resources"] = {name: _summary(result) for name, result in results.items()}
+            entry["success"] = all(summary["success"] for summary in entry["resources"].values())
+        except Exception as e:
+            logging.error(f"Daemon run {self.runs} failed: {e}")
+            entry["success"] = False
+            entry["error"] = str(e)
+        entry["finished_at"] = self.clock()
+        entry["duration"] = time.perf_counter() - start
+        entry["interrupted"] = self.stop_event.is_set()
+        self.history.append(entry)
+        logging.info(f"Daemon run {self.runs} {'succeeded' if entry['success'] else 'failed'} in {entry['duration']:.2f}s")
+        return entry
+
+    def next_run(self, started, now=None):
+        """Start time of the next run after one that started at `started`, skipping ticks missed meanwhile."""
+        now = self.clock() if now is None else now
+        if self.schedule is not None:
+            due = self.schedule.next_after(datetime.fromtimestamp(started)).timestamp()
+            if due <= now:
+                upcoming = self.schedule.next_after(datetime.fromtimestamp(now)).timestamp()
+                logging.warning(f"Run overran its schedule, skipping ticks until {datetime.fromtimestamp(upcoming)}")
+                return upcoming
+            return due
+        interval = self.settings["interval_seconds"]
+        ticks = max(1, math.floor((now - started) / interval) + 1)
+        if ticks > 1:
+            logging.warning(f"Run overran the {interval}s interval, skipping {ticks - 1} tick(s)")
+        return started + ticks * interval
+
+    def run_forever(self, max_runs=None):
+        """Run on schedule until stopped (or `max_runs` runs are done) and return the history."""
+        self._install_signal_handlers()
+        schedule = f"cron '{self.schedule.expression}'" if self.schedule else f"every {self.settings['interval_seconds']}s"
+        logging.info(f"Daemon started, running {schedule}.")
+        now = self.clock()
+        next_run = self.schedule.next_after(datetime.fromtimestamp(now)).timestamp() if self.schedule else now
+        try:
+            while not self.stop_event.is_set():
+                delay = next_run - self.clock()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+                started = self.clock()
+                self.run_once()
+                if max_runs is not None and self.runs >= max_runs:
+                    break
+                self.reload_config()  # a schedule change applies from the next tick on
+                next_run = self.next_run(started)
+        finally:
+            self._restore_signal_handlers()
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+                self._session_pool_size = None
+        logging.info(f"Daemon stopped after {self.runs} run(s).")
+        return list(self.history)
+
+    def stop(self):
+        """Ask the daemon to stop: the current extraction ends after its page, no further run starts."""
+        self.stop_event.set()
+
+    def dump_history(self, path=None):
+        """Write the in-memory run history as JSON and return the file path."""
+        path = path or self.data_dir / self.settings["history_file"]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with atomic_output(str(path)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"dumped_at": self.clock(), "runs": list(self.history)}, f, indent=2)
+        logging.info(f"Daemon history ({len(self.history)} runs) written to {path}")
+        return path
+
+    def _handle_stop(self, signum, frame):
+        if self.stop_event.is_set():
+            raise KeyboardInterrupt  # second signal: stop now
+        logging.info(f"Received {signal.Signals(signum).name}, stopping after the current page.")
+        self.stop()
+
+    def _handle_dump(self, signum, frame):
+        try:
+            self.dump_history()
+        except OSError as e:
+            logging.error(f"Could not dump the daemon history: {e}")
+
+    def _install_signal_handlers(self):
+        # signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return
+        handlers = {signal.SIGTERM: self._handle_stop, signal.SIGINT: self._handle_stop}
+        if hasattr(signal, "SIGUSR1"):
+            handlers[signal.SIGUSR1] = self._handle_dump
+        for signum, handler in handlers.items():
+            self._previous_handlers[signum] = signal.signal(signum, handler)
+
+    def _restore_signal_handlers(self):
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
@@ -0,0 +1,103 @@
+import hashlib
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+
+# ids buffered in a plain set before being merged into the packed array
+MIN_MERGE = 4096
+DEDUP_METHODS = ("exact", "bloom")
+
+
+class IdSet:
+    """Exact set of integer ids packed into a sorted array: 8 bytes per id instead of ~70 in a Python set.
+
+    New ids collect in a small set that is merged into the array once it reaches an eighth of its size,
+    which keeps the merges amortized O(log n) per id.
+    """
+
+    def __init__(self):
+        self._sorted = array("q")
+        self._recent = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, value):
+        if value in self._recent:
+            return True
+        i = bisect_left(self._sorted, value)
+        return i < len(self._sorted) and self._sorted[i] == value
+
+    def add(self, value):
+        """Add `value`, returning False when it was already in the set."""
+        if value in self:
+            return False
+        self._recent.add(value)
+        if len(self._recent) >= max(MIN_MERGE, len(self._sorted) // 8):
+            self._sorted = array("q", heapq.merge(self._sorted, sorted(self._recent)))
+            self._recent = set()
+        return True
+
+    @property
+    def nbytes(self):
+        return self._sorted.itemsize * len(self._sorted) + 70 * len(self._recent)
+
+
+class BloomFilter:
+    """Probabilistic id set of fixed size: never misses an added id, wrongly reports about `error_rate`
+    of the others as present once `capacity` ids were added.
+    """
+
+    def __init__(self, capacity, error_rate=0.0001):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Bloom filter needs capacity >= 1 and 0 < error_rate < 1")
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _positions(self, value):
+        # double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.to_bytes(8, "little", signed=True), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, value):
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+    def add(self, value):
+        """Add `value`, returning False when it may already have been added."""
+        new = False
+        for p in self._positions(value):
+            if not self._bits[p >> 3] & (1 << (p & 7)):
+                self._bits[p >> 3] |= 1 << (p & 7)
+                new = True
+        self._count += new
+        return new
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+def build_id_filter(dedup_config):
+    """Return the seen-id structure configured in the `dedup` section, or None when deduplication is off."""
+    dedup_config = dedup_config or {}
+    if not dedup_config.get("enabled", False):
+        return None
+    method = dedup_config.get("method", "exact")
+    if method not in DEDUP_METHODS:
+        raise ValueError(f"Unsupported dedup method: {method}")
+    if method == "bloom":
+        return BloomFilter(dedup_config.get("expected_rows", 1_000_000), dedup_config.get("error_rate", 0.0001))
+    return IdSet()
+
+
+def row_id(row):
+    """The row's integer id, None when it has none (such rows are never treated as duplicates)."""
+    value = row.get("id") if isinstance(row, dict) else None
+    return value if isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63 else None
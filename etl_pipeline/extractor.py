@@ -1,78 +1,508 @@
-import requests
+import contextlib
 import logging
-import json
+import math
 import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from etl_pipeline.atomic import discard, partial_path, publish
+from etl_pipeline.dedup import BloomFilter, IdSet, build_id_filter, row_id
+from etl_pipeline.http_cache import ResponseCache, cache_key
+from etl_pipeline.http_session import build_session, pool_stats
+from etl_pipeline.json_codec import JsonRows, get_codec, split_results
+from etl_pipeline.metrics import MetricsCollector
+from etl_pipeline.raw_io import RawWriter
+from etl_pipeline.state import load_state, pending_watermark_path, save_state, save_watermark, parse_modified
+from etl_pipeline.throttling import (
+    backoff_delay, build_breaker, build_limiter, is_retryable, retry_after_seconds, status_code,
+)
+
+# concurrent mode: pages fetched ahead of the consumer, per worker
+PREFETCH_PER_WORKER = 2
+
+
+class ExtractionInterrupted(Exception):
+    """Raised after the current page when a stop was requested (daemon shutdown)."""
+
 class Extractor:
-    def __init__(self, config, data_dir=Path(__file__).resolve().parents[1] / "data"):
+    def __init__(self, config, data_dir=Path(__file__).resolve().parents[1] / "data", session=None, metrics=None, budget=None,
+                 limiter=None, breaker=None, stop_event=None):
         # api properties
         self.base_url = config["api"]["base_url"]
         self.api_path = config["api"]["api_path"]
         self.limit = config["api"]["page_size"]
         self.retries = config["api"]["retries"]
         self.timeout = config["api"]["timeout"]
+        self.concurrency = config["api"].get("concurrency", 1)
+
+        ## http properties - one pooled keep-alive session per extractor, or one shared by several resources
+        self.connect_timeout = config["api"].get("connect_timeout", self.timeout)
+        self.read_timeout = config["api"].get("read_timeout", self.timeout)
+        self.pool_size = config["api"].get("pool_size", max(10, self.concurrency))
+        self.session = session or build_session(self.pool_size)
+        # shared semaphore capping in-flight requests across all resources (None = only concurrency applies)
+        self.budget = budget or contextlib.nullcontext()
+
+        ## throttling properties - token bucket sized to the API quota, jittered backoff, circuit breaker
+        ## (main shares one limiter and breaker between resources, the quota is per API key)
+        self.limiter = limiter or build_limiter(config["api"])
+        self.breaker = breaker or build_breaker(config["api"])
+        self.backoff_base = config["api"].get("backoff_base", 1.0)
+        self.backoff_cap = config["api"].get("backoff_cap", 30.0)
+
+        ## cache properties - conditional requests revalidated by ETag
+        cache = config.get("cache", {})
+        self.cache = None
+        if cache.get("enabled", False):
+            self.cache = ResponseCache(
+                os.path.join(data_dir, cache.get("dir", "http_cache")),
+                ttl_seconds=cache.get("ttl_seconds", 3600),
+                max_bytes=cache.get("max_bytes", 100 * 1024 * 1024),
+            )
 
-        ## storage properties        
+        ## storage properties
         self.raw_filename = config["output"]["raw_file"]
+        self.raw_format = config["output"].get("raw_format", "jsonl")  # options: jsonl, arrow
+        self.raw_compression = config["output"].get("raw_compression")  # options: gzip, zstd
+        # passthrough: rows are written as the API sent them, not decoded and re-encoded
+        self.passthrough = config["output"].get("passthrough", False)
+        self.codec = get_codec(config["output"].get("json_codec", "auto"))
+        self.nested_fields = config.get("transform", {}).get("nested_fields")
+        self.name_field = config.get("transform", {}).get("name_field", "name")
         self.data_dir = data_dir
-        
+
+        ## stop_event, when set, ends the extraction after the page being written (checkpoint kept)
+        self.stop_event = stop_event
+
+        ## checkpoint properties - resume an interrupted extraction from the last page written
+        self.resume = config["output"].get("resume", True)
+        self.checkpoint_path = os.path.join(data_dir, f"{self.raw_filename}.checkpoint.json")
+
+        ## duplicate detection - offset pages over a collection changing mid-crawl can repeat or skip rows
+        self.dedup_config = config.get("dedup", {})
+        self.reconcile = self.dedup_config.get("enabled", False) and self.dedup_config.get("reconcile", True)
+        self.seen = None  # ids written so far, built per run (IdSet or BloomFilter)
+        self.held = {}  # bloom filter: id -> JSON line of a possible duplicate, verified against the raw file
+        self.shifts = []  # [offset, previous total, total] wherever data.total changed between pages
+        self._last_total = None
+
+        ## incremental properties - modifiedSince high-water mark kept per api path
+        incremental = config.get("incremental", {})
+        self.incremental = incremental.get("enabled", False)
+        self.state_path = os.path.join(data_dir, incremental.get("state_file", "extract_state.json"))
+        self.since = None
+        self.watermark = None
+
+        ## run metrics - Pipeline swaps in its shared collector
+        self.metrics = metrics or MetricsCollector()
+
         ## auth properties - harcoded for testing purposes
         self.ts = '1'
         self.apikey = 'a439401808d851ea84afb3bbb5184299'
         self.hash = 'ac21937da96021d43e052393da516ceb'
 
-    def run(self):
-            """Extract data from API with limit+offset pagination, write JSONL file, and return file path + row count."""
+    def _fetch_page(self, offset):
+        """Fetch a single page, retrying only that page on transient failures."""
+        retries = 0
+        while True:
+            try:
+                url = self.base_url + self.api_path
+                params = {"ts": self.ts, "apikey": self.apikey, "hash": self.hash, "limit": self.limit, "offset": offset}
+                if self.since:
+                    params["modifiedSince"] = self.since
+                payload = self._get(url, params)
+                self.breaker.record_success()
+                self.limiter.record_success()
+                return payload
+
+            except Exception as e:
+                if not is_retryable(e):
+                    logging.error(f"Extractor failed at offset {offset} with a non-retryable error: {e}")
+                    raise
+                self.breaker.record_failure()
+                retries += 1
+                self.metrics.increment("http_retries")
+                if retries > self.retries:
+                    logging.error(f"Extractor failed after {self.retries} retries: {e}")
+                    raise
+
+                delay = backoff_delay(retries, self.backoff_base, self.backoff_cap)
+                if status_code(e) == 429:
+                    # Pause every worker sharing the limiter, the next acquire() waits it out
+                    self.metrics.increment("http_throttled")
+                    retry_after = retry_after_seconds(e)
+                    self.limiter.throttle(retry_after if retry_after is not None else delay)
+                    delay = 0
+                logging.warning(f"Retry {retries}/{self.retries} at offset {offset} in {delay:.2f}s after error: {e}")
+                time.sleep(delay)
+
+    def _get(self, url, params):
+        """GET a page as parsed JSON, served from or revalidated against the response cache when enabled."""
+        timeout = (self.connect_timeout, self.read_timeout)
+        if self.cache is None:
+            response = self._timed_get(url, params, timeout)
+            response.raise_for_status()
+            return self._decode_response(response)
+
+        key = cache_key(url, params)
+        entry, body = self.cache.lookup(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record_hit(body)
+            return self._decode(body)
+
+        headers = {"If-None-Match": entry["etag"]} if entry is not None and entry["etag"] else {}
+        response = self._timed_get(url, params, timeout, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.record_revalidated(key, body)
+            return self._decode(body)
+        response.raise_for_status()
+
+        payload = self._decode_response(response)
+        # The API puts the etag in the body as well as in the ETag header
+        etag = response.headers.get("ETag") or payload.get("etag")
+        self.cache.store(key, response.content, etag)
+        return payload
+
+    def _decode(self, body):
+        """Parse a response body; in passthrough mode the rows keep their JSON text for the raw writer."""
+        return split_results(body, self.codec) if self.passthrough else self.codec.loads(body)
+
+    def _decode_response(self, response):
+        return self._decode(response.content) if self.passthrough else response.json()
+
+    def _timed_get(self, url, params, timeout, **kwargs):
+        # Cache hits never get here, they cost no quota
+        self.breaker.check()
+        self.limiter.acquire()
+        with self.budget:
+            start = time.perf_counter()
+            response = self.session.get(url, params=params, timeout=timeout, **kwargs)
+            self.metrics.observe_request(time.perf_counter() - start)
+        content = getattr(response, "content", None)
+        if isinstance(content, bytes):
+            self.metrics.add_bytes("extract", read=len(content))
+        return response
+
+    @staticmethod
+    def _results(payload):
+        """Navigate to data.results, tolerating malformed payloads."""
+        data = payload.get("data")
+        return data.get("results", []) if isinstance(data, dict) else []
+
+    @staticmethod
+    def _total(payload):
+        """Return data.total reported by the API, or None when missing."""
+        data = payload.get("data")
+        total = data.get("total") if isinstance(data, dict) else None
+        return total if isinstance(total, int) else None
+
+    def _observe_total(self, offset, payload):
+        total = self._total(payload)
+        if total is None:
+            return
+        if self._last_total is not None and total != self._last_total:
+            logging.warning(f"data.total changed from {self._last_total} to {total} at offset {offset}: "
+                            "the collection changed during the crawl")
+            self.shifts.append([offset, self._last_total, total])
+        self._last_total = total
+
+    def _drop_duplicates(self, rows):
+        """Drop rows whose id was already written; possible duplicates flagged by a bloom filter are held back."""
+        if self.seen is None:
+            return rows
+        lines = getattr(rows, "lines", None)
+        kept_rows, kept_lines, dropped = [], [], 0
+        for i, row in enumerate(rows):
+            value = row_id(row)
+            if value is not None and not self.seen.add(value):
+                if isinstance(self.seen, BloomFilter) and value not in self.held:
+                    self.held[value] = lines[i] if lines is not None else self.codec.dumps(row)
+                else:
+                    dropped += 1
+                continue
+            kept_rows.append(row)
+            if lines is not None:
+                kept_lines.append(lines[i])
+
+        if dropped:
+            self.metrics.increment("duplicates_dropped", dropped)
+            logging.info(f"Dropped {dropped} rows whose id was already extracted")
+        if len(kept_rows) == len(rows):
+            return rows
+        return JsonRows(kept_rows, kept_lines) if lines is not None else kept_rows
+
+    def _scan_ids(self, path):
+        """Yield the id of every row of an uncompressed raw JSONL file."""
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    value = row_id(self.codec.loads(line))
+                    if value is not None:
+                        yield value
+
+    def _release_held(self, tmp_path, writer):
+        """Return the held rows whose id is not in the raw file after all: the bloom filter's false positives."""
+        writer.flush()
+        written = {value for value in self._scan_ids(tmp_path) if value in self.held}
+        released = [line for value, line in self.held.items() if value not in written]
+        if written:
+            self.metrics.increment("duplicates_dropped", len(written))
+        logging.info(f"Verified {len(self.held)} possible duplicates against {tmp_path}: "
+                     f"{len(written)} dropped, {len(released)} false positives kept")
+        self.held = {}
+        rows = [self.codec.loads(line) for line in released]
+        return JsonRows(rows, released) if self.passthrough else rows
+
+    def _reconcile_windows(self):
+        """Offsets of the pages to read again around every place data.total changed.
+
+        A change of d rows moves the rows after it by up to d positions, so pages already read can miss
+        rows (deletions) or repeat them (insertions) within ceil(d / page_size) pages of that offset. Rows pushed
+        past the first reported total are not part of these windows: iter_pages reads up to the last total.
+        """
+        offsets = set()
+        for offset, previous, total in self.shifts:
+            span = max(1, math.ceil(abs(total - previous) / self.limit)) * self.limit
+            offsets.update(range(max(0, offset - span), offset + span, self.limit))
+        return sorted(offsets)
+
+    def _reconcile(self):
+        """Yield (offset, rows not extracted yet) for the pages read again where data.total shifted."""
+        offsets = self._reconcile_windows()
+        logging.info(f"Re-reading {len(offsets)} pages where data.total changed during the crawl")
+        reconciled = 0
+        for offset in offsets:
+            rows = self._drop_duplicates(self._results(self._fetch_page(offset)))
+            reconciled += len(rows)
+            if rows:
+                yield offset, rows
+        self.metrics.increment("reconciled_rows", reconciled)
+        logging.info(f"Reconciliation recovered {reconciled} rows missed by the crawl")
+
+    def _write_rows(self, writer, rows, offset):
+        if writer is not None:
+            writer.write_rows(rows)
+        for row in rows:
+            self._track_watermark(row)
+        logging.info(f"Fetched {len(rows)} rows at offset {offset}")
+        return len(rows)
+
+    def _track_watermark(self, row):
+        modified = parse_modified(row.get("modified"))
+        if modified and (self.watermark is None or modified > parse_modified(self.watermark)):
+            self.watermark = row["modified"]
+
+    def commit_watermark(self):
+        """Persist the max `modified` seen so the next incremental run only asks for newer rows."""
+        if not self.incremental or self.watermark is None:
+            return
+        save_watermark(self.state_path, self.api_path, self.watermark)
+        discard(pending_watermark_path(os.path.join(self.data_dir, self.raw_filename)))
+        logging.info(f"Saved modifiedSince watermark {self.watermark} for {self.api_path}")
+
+    def _save_pending_watermark(self, raw_path):
+        """Keep the watermark next to the raw file until its delta is transformed.
+
+        `run` commits it right away, a separate `transform` through state.commit_pending_watermark.
+        """
+        path = pending_watermark_path(raw_path)
+        if not self.incremental or self.watermark is None:
+            discard(path)  # never commit an older extraction's watermark for this raw file
+            return
+        save_state(path, {"api_path": self.api_path, "watermark": self.watermark, "state_file": self.state_path})
+
+    def _load_checkpoint(self, tmp_path):
+        """Return the checkpoint of an interrupted run of this same extraction, or None."""
+        checkpoint = load_state(self.checkpoint_path)
+        if not checkpoint:
+            return None
+        expected = {"api_path": self.api_path, "limit": self.limit}
+        if self.incremental and checkpoint.get("since") != self.since:
+            logging.info("Ignoring extraction checkpoint: the incremental watermark moved since it was written")
+            return None
+        if any(checkpoint.get(key) != value for key, value in expected.items()):
+            logging.info("Ignoring extraction checkpoint written for a different api_path or page_size")
+            return None
+        if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) < checkpoint["bytes"]:
+            logging.info(f"Ignoring extraction checkpoint: {tmp_path} is missing or shorter than checkpointed")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, offset, rows, position):
+        save_state(self.checkpoint_path, {
+            "api_path": self.api_path,
+            "limit": self.limit,
+            "offset": offset,  # next offset to fetch
+            "rows": rows,
+            "bytes": position,  # size of the partial raw file after the last committed page
+            "since": self.since,
+            "watermark": self.watermark,
+            "last_total": self._last_total,
+            "shifts": self.shifts,
+            "held": list(self.held.values()),
+        })
+
+    def iter_pages(self, start=0):
+        """Yield (offset, rows) for every non-empty page from offset `start`, in offset order."""
+        # First page tells us how many rows the collection has
+        payload = self._fetch_page(start)
+        self._observe_total(start, payload)
+        rows = self._results(payload)
+        total = self._total(payload)
+
+        # Handle no data returned
+        if not rows:
+            return
+        yield start, rows
+
+        offset = start + self.limit
+        if self.concurrency > 1 and total is not None:
+            # Every remaining offset is known up front, fetch them in parallel. Pages are yielded in offset
+            # order and at most PREFETCH_PER_WORKER pages per worker are in flight or waiting for the consumer,
+            # so a slow consumer (fused transformation) does not buffer the whole collection.
+            offsets = range(offset, total, self.limit)
+            logging.info(f"Fetching {len(offsets)} remaining pages with {self.concurrency} workers")
+            pool = ThreadPoolExecutor(max_workers=self.concurrency)
+            pending = deque()
+            remaining = iter(offsets)
+            try:
+                while True:
+                    while len(pending) < self.concurrency * PREFETCH_PER_WORKER:
+                        page_offset = next(remaining, None)
+                        if page_offset is None:
+                            break
+                        pending.append((page_offset, pool.submit(self._fetch_page, page_offset)))
+                    if not pending:
+                        break
+                    page_offset, future = pending.popleft()
+                    page = future.result()
+                    self._observe_total(page_offset, page)
+                    yield page_offset, self._results(page)
+            finally:
+                # When the consumer stops early (error, interruption), do not fetch the pages still queued
+                pool.shutdown(wait=True, cancel_futures=True)
+
+            offset += len(offsets) * self.limit
+            if self._last_total is None or self._last_total <= offset:
+                return
+            # The collection grew during the crawl: its tail lies past the offsets planned from the first page
+            logging.info(f"data.total grew to {self._last_total}, fetching the pages from offset {offset} on")
+
+        while True:
+            payload = self._fetch_page(offset)
+            self._observe_total(offset, payload)
+            rows = self._results(payload)
+            if not rows:
+                break
+            yield offset, rows
+            offset += self.limit # next offset
+
+    def run(self, on_page=None, write_raw=True):
+            """Extract data from API with limit+offset pagination, write JSONL file, and return file path + row count.
+
+            on_page, when given, receives each page's rows as soon as they arrive; with write_raw=False
+            no JSONL file is written and the returned path is None.
+            """
             raw_path = os.path.join(self.data_dir, self.raw_filename)
+            tmp_path = partial_path(raw_path)  # published under raw_path only once extraction completes
             os.makedirs(self.data_dir, exist_ok=True)
 
-            offset = 0
             total_rows = 0
-            retries = 0
 
-            with open(raw_path, "w", encoding="utf-8") as f:
-                while True:
-                    try:
-                        url = self.base_url + self.api_path                        
-                        params = {"ts": self.ts, "apikey": self.apikey, "hash": self.hash, "limit": self.limit, "offset": offset}
-                        response = requests.get(url, params=params, timeout=30)
-                        response.raise_for_status()
-                        payload  = response.json()
-
-                        # Navigate to data.results
-                        rows = (
-                            payload.get("data", {}).get("results", [])
-                            if isinstance(payload.get("data"), dict)
-                            else []
-                        )
-
-                        # Handle no data returned
-                        if not rows:
-                            break
+            if self.incremental:
+                self.since = load_state(self.state_path).get("watermarks", {}).get(self.api_path)
+                self.watermark = self.since
+                logging.info(f"Incremental extraction since {self.since}" if self.since else "Incremental extraction: no watermark yet, full crawl")
+
+            # Resuming needs the raw file to be the only consumer of the pages, and a format that can be appended to
+            checkpointing = (self.resume and write_raw and on_page is None
+                             and self.raw_format == "jsonl" and self.raw_compression is None)
+            checkpoint = self._load_checkpoint(tmp_path) if checkpointing else None
 
-                        # Write each row as JSON line
-                        for row in rows:
-                            f.write(json.dumps(row) + "\n")
+            self.seen = build_id_filter(self.dedup_config)
+            if isinstance(self.seen, BloomFilter) and not (write_raw and self.raw_format == "jsonl"
+                                                           and self.raw_compression is None):
+                logging.info("The bloom filter is verified against an uncompressed raw JSONL file, using exact ids instead")
+                self.seen = IdSet()
+            self.held, self.shifts, self._last_total = {}, [], None
+
+            start = 0
+            if checkpoint is not None:
+                start, total_rows = checkpoint["offset"], checkpoint["rows"]
+                self.since, self.watermark = checkpoint["since"], checkpoint["watermark"]
+                self._last_total, self.shifts = checkpoint.get("last_total"), checkpoint.get("shifts", [])
+                # Drop anything written after the last checkpointed page
+                os.truncate(tmp_path, checkpoint["bytes"])
+                if self.seen is not None:
+                    for value in self._scan_ids(tmp_path):
+                        self.seen.add(value)
+                    self.held = {row_id(self.codec.loads(line)): line for line in checkpoint.get("held", [])}
+                logging.info(f"Resuming extraction at offset {start} after {total_rows} rows from {self.checkpoint_path}")
+            else:
+                discard(self.checkpoint_path)
 
-                        total_rows += len(rows)
-                        logging.info(f"Fetched {len(rows)} rows at offset {offset}")
+            writer = None
+            if write_raw:
+                writer = RawWriter(tmp_path, self.raw_format, self.raw_compression, self.nested_fields, self.name_field,
+                                   append=checkpoint is not None, codec=self.codec)
+            completed = False
+            try:
+                for offset, rows in self.iter_pages(start):
+                    rows = self._drop_duplicates(rows)
+                    total_rows += self._write_rows(writer, rows, offset)
+                    if checkpointing:
+                        self._save_checkpoint(offset + self.limit, total_rows, writer.flush())
+                    if on_page:
+                        on_page(rows)
+                    if self.stop_event is not None and self.stop_event.is_set():
+                        raise ExtractionInterrupted(f"stop requested, extraction interrupted after offset {offset}")
 
-                        offset += self.limit # next offset
-                        retries = 0  # reset after success
+                if self.reconcile and self.shifts:
+                    for offset, rows in self._reconcile():
+                        total_rows += self._write_rows(writer, rows, offset)
+                        if on_page:
+                            on_page(rows)
+                if self.held:
+                    rows = self._release_held(tmp_path, writer)
+                    total_rows += self._write_rows(writer, rows, "end (held back as possible duplicates)")
+                    if on_page and rows:
+                        on_page(rows)
+                if self.seen is not None and self._last_total is not None and self._last_total != total_rows:
+                    logging.warning(f"Extracted {total_rows} distinct rows, the API last reported data.total={self._last_total}")
+                completed = True
+            finally:
+                if writer is not None:
+                    writer.close()
+                    # a partial file without checkpoint can never be resumed
+                    if not completed and not checkpointing:
+                        discard(tmp_path)
+                if self.cache is not None:
+                    # pages cached before a failure are reused by the next run
+                    self.cache.flush()
 
-                    except Exception as e:
-                        retries += 1
-                        if retries > self.max_retries:
-                            logging.error(f"Extractor failed after {self.max_retries} retries: {e}")
-                            raise
-                        logging.warning(f"Retry {retries}/{self.max_retries} after error: {e}")
-                        time.sleep(2 ** retries)
+            if write_raw:
+                publish(tmp_path, raw_path)
+                discard(self.checkpoint_path)
+                self._save_pending_watermark(raw_path)
 
             if total_rows == 0:
                 logging.warning("Extraction finished but no data was retrieved.")
             else:
                 logging.info(f"Extraction finished: {total_rows} records saved.")
-            
-            return str(raw_path), total_rows
+
+            if write_raw:
+                self.metrics.add_bytes("extract", written=os.path.getsize(raw_path))
+            if self.cache is not None:
+                self.cache.log_summary()
+                for name in ("hits", "revalidated", "misses"):
+                    self.metrics.increment(f"cache_{name}", self.cache.stats[name])
+
+            stats = pool_stats(self.session)
+            logging.info(
+                f"HTTP pool: {stats['requests']} requests, {stats['connections_opened']} connections opened, "
+                f"{stats['connections_reused']} reused"
+            )
+
+            return (str(raw_path) if write_raw else None), total_rows
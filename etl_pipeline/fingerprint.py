@@ -0,0 +1,80 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+
+from etl_pipeline.state import load_state, save_state
+
+CHUNK_BYTES = 1024 * 1024
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, or of every file under a directory (relative paths included)."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), path)
+            for root, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [None]
+    for relative in files:
+        if relative is not None:
+            digest.update(relative.replace(os.sep, "/").encode("utf-8") + b"\0")
+        with open(path if relative is None else os.path.join(path, relative), "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Digest of the package's source files: any code change invalidates every stage fingerprint."""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def stage_fingerprint(inputs):
+    """Combine a stage's inputs (digests, config sections, code version) into one fingerprint."""
+    canonical = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def sidecar_path(output_path):
+    return f"{output_path}.fingerprint.json"
+
+
+def _output_mtime(output_path):
+    return os.stat(output_path).st_mtime_ns
+
+
+def load_result(output_path, fingerprint):
+    """Return the (path, rows) recorded with `fingerprint`, or None when the stage has to run.
+
+    The recorded output mtime guards against the output having been replaced or edited since.
+    """
+    record = load_state(sidecar_path(output_path))
+    if record.get("fingerprint") != fingerprint or not os.path.exists(output_path):
+        return None
+    if record.get("output_mtime_ns") != _output_mtime(output_path):
+        logging.info(f"{output_path} changed since its fingerprint was recorded, running the stage again")
+        return None
+    return record["path"], record["rows"]
+
+
+def save_result(output_path, fingerprint, result):
+    path, rows = result
+    if not os.path.exists(output_path):
+        return  # nothing was written (empty dataset), nothing to reuse
+    save_state(sidecar_path(output_path), {
+        "fingerprint": fingerprint,
+        "path": path,
+        "rows": rows,
+        "output_mtime_ns": _output_mtime(output_path),
+    })
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+from etl_pipeline.state import save_state
+
+# auth params change per deployment (and ts per request), they must not split cache entries
+IGNORED_PARAMS = ("ts", "apikey", "hash")
+
+
+def cache_key(url, params):
+    """Key a response by its path and params, normalized (sorted, auth params dropped)."""
+    normalized = sorted((k, str(v)) for k, v in (params or {}).items() if k not in IGNORED_PARAMS)
+    return f"{url}?{urlencode(normalized)}"
+
+
+class ResponseCache:
+    """On-disk response cache with ETag revalidation, a freshness TTL and LRU eviction by total size."""
+
+    def __init__(self, cache_dir, ttl_seconds=3600, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0, "bytes_saved": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._index = {}
+        self._bytes = sum(entry["size"] for entry in self._index.values())  # running total of the cached bodies
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def lookup(self, key):
+        """Return (entry, body) for a cached response, or (None, None) when absent or unreadable."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None, None
+            try:
+                with open(self._body_path(key), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self._bytes -= self._index.pop(key)["size"]
+                return None, None
+            entry["last_access"] = time.time()
+            return dict(entry), body
+
+    def is_fresh(self, entry):
+        return time.time() - entry["stored_at"] < self.ttl_seconds
+
+    def record_hit(self, body):
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(body)
+
+    def record_revalidated(self, key, body):
+        """A 304 confirmed the cached body: count it and restart its TTL."""
+        with self._lock:
+            self.stats["revalidated"] += 1
+            self.stats["bytes_saved"] += len(body)
+            if key in self._index:
+                self._index[key]["stored_at"] = time.time()
+
+    def store(self, key, body, etag):
+        with self._lock:
+            self.stats["misses"] += 1
+            if len(body) > self.max_bytes:
+                return
+            with open(self._body_path(key), "wb") as f:
+                f.write(body)
+            now = time.time()
+            previous = self._index.get(key)
+            self._bytes += len(body) - (previous["size"] if previous else 0)
+            self._index[key] = {"etag": etag, "stored_at": now, "last_access": now, "size": len(body)}
+            self._evict()
+            # the index is written once per run by flush(), not on every miss of a cold crawl
+
+    def _evict(self):
+        # Drop least recently used entries until the cache fits max_bytes; under budget nothing is sorted
+        if self._bytes <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= entry["size"]
+            del self._index[key]
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            self.stats["evicted"] += 1
+
+    def flush(self):
+        """Persist the entries stored, access times and TTL refreshes gathered during the run."""
+        with self._lock:
+            save_state(self.index_path, self._index)
+
+    def log_summary(self):
+        s = self.stats
+        logging.info(
+            f"HTTP cache: {s['hits']} hits, {s['revalidated']} revalidated, {s['misses']} misses, "
+            f"{s['evicted']} evicted, {s['bytes_saved']} bytes saved"
+        )
@@ -0,0 +1,27 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def build_session(pool_size=10):
+    """Create a keep-alive session whose connection pool is reused across requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+def pool_stats(session):
+    """Return how many connections the session opened vs. how many requests reused one."""
+    opened = 0
+    sent = 0
+    for adapter in set(session.adapters.values()):
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            sent += pool.num_requests
+    return {"requests": sent, "connections_opened": opened, "connections_reused": max(sent - opened, 0)}
@@ -0,0 +1,117 @@
+import json
+import re
+
+# the array holding a page's rows; inside JSON strings quotes are escaped, so this cannot match there
+RESULTS_ARRAY = re.compile(r'"results"\s*:\s*\[')
+# JSON insignificant whitespace, as skipped by the stdlib scanner
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JsonCodec:
+    """The standard library json module."""
+
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson, several times faster than the standard library both ways, when installed."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj).decode("utf-8")
+
+
+CODECS = {"json": JsonCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name="auto"):
+    """Return the named codec; "auto" picks orjson when it is installed and the stdlib otherwise."""
+    if name == "auto":
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            return JsonCodec()
+    if name not in CODECS:
+        raise ValueError(f"Unsupported JSON codec: {name}")
+    return CODECS[name]()
+
+
+class JsonRows(list):
+    """A page's parsed rows, carrying each row's JSON text so it can be written without re-encoding."""
+
+    def __init__(self, rows, lines):
+        super().__init__(rows)
+        self.lines = lines
+
+
+def split_results(body, codec=None):
+    """Parse a page, keeping each data.results row's JSON text next to the parsed row.
+
+    With the stdlib codec the rows are decoded one by one straight out of the response text, and their
+    source slices become the JSONL lines, so nothing is re-encoded. Faster codecs parse the whole page and
+    re-encode the rows instead, which is still cheaper than the stdlib round trip. Pages that do not have
+    the expected shape fall back to a plain parse.
+    """
+    codec = codec or JsonCodec()
+    if type(codec) is JsonCodec:
+        text = body.decode("utf-8") if isinstance(body, (bytes, bytearray)) else body
+        try:
+            payload = _split_text(text, codec)
+        except (ValueError, IndexError):
+            payload = None
+        if payload is not None:
+            return payload
+        body = text
+
+    payload = codec.loads(body)
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        rows = data["results"]
+        data["results"] = JsonRows(rows, [codec.dumps(row) for row in rows])
+    return payload
+
+
+def _split_text(text, codec):
+    match = RESULTS_ARRAY.search(text)
+    if match is None:
+        return None
+
+    decoder = json.JSONDecoder()
+    rows, lines = [], []
+    position = WHITESPACE.match(text, match.end()).end()
+    if text[position] != "]":
+        while True:
+            row, end = decoder.raw_decode(text, position)
+            line = text[position:end]
+            rows.append(row)
+            # pretty-printed rows span several lines, only those are re-encoded
+            lines.append(codec.dumps(row) if "\n" in line or "\r" in line else line)
+            position = WHITESPACE.match(text, end).end()
+            if text[position] == "]":
+                break
+            if text[position] != ",":
+                return None
+            position = WHITESPACE.match(text, position + 1).end()
+
+    # The envelope is parsed with the array emptied out; it must be exactly where data.results is
+    payload = json.loads(text[:match.end()] + text[position:])
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(data, dict) or data.get("results") != []:
+        return None
+    data["results"] = JsonRows(rows, lines)
+    return payload
@@ -0,0 +1,153 @@
+import csv
+import logging
+import os
+import sqlite3
+import time
+from itertools import islice
+from pathlib import Path
+
+from etl_pipeline.metrics import MetricsCollector
+from etl_pipeline.raw_io import DEFAULT_NESTED_FIELDS
+
+# bound parameters per statement on SQLite builds older than 3.32 (newer ones allow 32766)
+DEFAULT_MAX_VARIABLES = 999
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class Loader:
+    """Bulk-load the transformed output into a SQLite table, upserting by id."""
+
+    def __init__(self, config, data_dir=Path(__file__).resolve().parents[1] / "data", metrics=None):
+        load = config.get("load", {})
+        self.database = data_dir / load.get("database", "etl.sqlite")
+        self.table = load.get("table") or config["output"]["transformed_file"]
+        self.batch_rows = load.get("batch_rows", 5000)
+        self.indexes = load.get("indexes", ["name"])  # secondary indexes, rebuilt after the load
+        self.timeout = load.get("timeout", 60)  # seconds to wait for another writer (resources sharing a database)
+
+        ## input properties - the Transformer's output
+        self.format = config["output"]["format"]
+        self.partition_by = (config["output"].get("parquet") or {}).get("partition_by")
+        nested_fields = config.get("transform", {}).get("nested_fields") or DEFAULT_NESTED_FIELDS
+        self.integer_columns = {"id", *nested_fields}
+
+        ## run metrics - Pipeline swaps in its shared collector
+        self.metrics = metrics or MetricsCollector()
+
+    def _read_batches(self, path):
+        """Yield (columns, rows) batches of the output; missing values are None, numbers are left to SQLite affinity."""
+        if self.format == "csv":
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                columns = next(reader, None)
+                if columns is None:
+                    return
+                integer_positions = [i for i, column in enumerate(columns) if column in self.integer_columns]
+                while True:
+                    rows = list(islice(reader, self.batch_rows))
+                    if not rows:
+                        return
+                    for row in rows:
+                        for i in integer_positions:
+                            if row[i] == "":
+                                row[i] = None
+                    yield columns, rows
+        elif self.format == "parquet":
+            import pyarrow.dataset as ds
+
+            dataset = ds.dataset(str(path), format="parquet", partitioning="hive" if self.partition_by else None)
+            columns = [name for name in dataset.schema.names if name != self.partition_by]
+            for batch in dataset.to_batches(columns=columns, batch_size=self.batch_rows):
+                if batch.num_rows:
+                    yield columns, list(zip(*(batch.column(i).to_pylist() for i in range(batch.num_columns))))
+        else:
+            raise ValueError(f"Unsupported format: {self.format}")
+
+    def _prepare_table(self, connection, columns):
+        if "id" not in columns:
+            raise ValueError("Transformed output has no id column to upsert by")
+        definitions = [
+            f"{_quote(column)} INTEGER PRIMARY KEY" if column == "id"
+            else f"{_quote(column)} {'INTEGER' if column in self.integer_columns else 'TEXT'}"
+            for column in columns
+        ]
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {_quote(self.table)} ({', '.join(definitions)})")
+
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({_quote(self.table)})")}
+        for column, definition in zip(columns, definitions):
+            if column not in existing:
+                connection.execute(f"ALTER TABLE {_quote(self.table)} ADD COLUMN {definition}")
+
+        # Maintaining secondary indexes row by row is slower than building them once at the end
+        for column in self.indexes:
+            connection.execute(f"DROP INDEX IF EXISTS {_quote(self._index_name(column))}")
+
+    def _index_name(self, column):
+        return f"idx_{self.table}_{column}"
+
+    def _upsert_statement(self, columns, rows):
+        placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+        updates = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c != "id")
+        return (
+            f"INSERT INTO {_quote(self.table)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES {', '.join([placeholders] * rows)} "
+            f"ON CONFLICT(id) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+        )
+
+    def run(self, transformed_path):
+        """Upsert every row of the transformed output in one transaction and return database path + row count."""
+        logging.info(f"Loading {transformed_path} into {self.database}:{self.table}...")
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(self.database), exist_ok=True)
+
+        connection = sqlite3.connect(self.database, timeout=self.timeout, isolation_level=None)
+        max_variables = DEFAULT_MAX_VARIABLES
+        if hasattr(connection, "getlimit"):  # Python 3.11+
+            max_variables = connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+
+        total_rows = 0
+        statements = {}
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            prepared = False
+            for columns, rows in self._read_batches(transformed_path):
+                if not prepared:
+                    self._prepare_table(connection, columns)
+                    rows_per_statement = max(1, min(self.batch_rows, max_variables // len(columns)))
+                    prepared = True
+                # Multi-row VALUES lists: one statement per rows_per_statement rows instead of one per row
+                for offset in range(0, len(rows), rows_per_statement):
+                    chunk = rows[offset:offset + rows_per_statement]
+                    if len(chunk) not in statements:
+                        statements[len(chunk)] = self._upsert_statement(columns, len(chunk))
+                    connection.execute(statements[len(chunk)], [value for row in chunk for value in row])
+                total_rows += len(rows)
+
+            if prepared:
+                for column in self.indexes:
+                    if column in columns:
+                        connection.execute(
+                            f"CREATE INDEX {_quote(self._index_name(column))} ON {_quote(self.table)} ({_quote(column)})"
+                        )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        elapsed = time.perf_counter() - start
+        rate = total_rows / elapsed if elapsed else 0.0
+        logging.info(f"Loaded {total_rows} rows into {self.table} in {elapsed:.2f}s ({rate:.0f} rows/s)")
+        self.metrics.add_bytes("load", read=_size(transformed_path), written=_size(self.database))
+        return str(self.database), total_rows
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
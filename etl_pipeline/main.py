@@ -1,11 +1,22 @@
+import argparse
+import json
+import os
 import yaml
 import logging
 import sys
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 
-from etl_pipeline.extractor import Extractor
-from etl_pipeline.transformer import Transformer
-from etl_pipeline.pipeline import Pipeline
+from etl_pipeline.scheduler import Scheduler, resource_configs
+
+# Stage modules are imported by the commands that run them: `extract` never loads pandas/pyarrow,
+# `inspect` and `--help` load neither the stages nor requests.
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "config.yaml"
+COMMANDS = ("run", "extract", "transform", "inspect", "query")
 
 def setup_logging():
     logging.basicConfig(
@@ -14,18 +25,255 @@ def setup_logging():
         handlers=[logging.StreamHandler(sys.stdout)],
     )
 
-def main():
-    setup_logging()
+def load_config(path=CONFIG_PATH):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+def shared_http(config, session=None):
+    """One HTTP session, request budget, rate limiter and circuit breaker shared by every resource."""
+    from etl_pipeline.http_session import build_session
+    from etl_pipeline.throttling import build_breaker, build_limiter
+
+    api = config["api"]
+    max_in_flight = api.get("max_in_flight") or api.get("pool_size", 10)
+    return {
+        "session": session or build_session(max(api.get("pool_size", 10), max_in_flight)),
+        "budget": threading.BoundedSemaphore(max_in_flight),
+        "limiter": build_limiter(api),
+        "breaker": build_breaker(api),
+    }
+
+def build_extractors(config, data_dir=DATA_DIR, session=None, stop_event=None):
+    """Build one Extractor per configured resource, sharing the HTTP session and request budget."""
+    from etl_pipeline.extractor import Extractor
+
+    resources = resource_configs(config)
+    http = shared_http(config, session) if config.get("resources") else {"session": session}
+    return {
+        name: Extractor(resource, data_dir=data_dir, stop_event=stop_event, **http)
+        for name, resource in resources
+    }
+
+def build_transformers(config, data_dir=DATA_DIR):
+    """Build one Transformer per configured resource."""
+    from etl_pipeline.transformer import Transformer
+
+    return {name: Transformer(resource, data_dir=data_dir) for name, resource in resource_configs(config)}
+
+def build_pipeline(config, data_dir=DATA_DIR, profiler=None, session=None, budget=None, limiter=None, breaker=None,
+                   name=None, force=False, stop_event=None):
+    """Wire the Extractor, Transformer and Pipeline from the parsed config."""
+    from etl_pipeline.extractor import Extractor
+    from etl_pipeline.pipeline import Pipeline
+    from etl_pipeline.transformer import Transformer
+
+    extractor = Extractor(config, data_dir=data_dir, session=session, budget=budget, limiter=limiter, breaker=breaker,
+                          stop_event=stop_event)
+    transformer = Transformer(config, data_dir=data_dir)
+    loader = None
+    if config.get("load", {}).get("enabled", False):
+        from etl_pipeline.loader import Loader
+
+        loader = Loader(config, data_dir=data_dir)
+
+    pipeline_config = config.get("pipeline", {})
+    metrics_config = config.get("metrics", {})
+    return Pipeline(
+        extractor,
+        transformer,
+        fused=pipeline_config.get("fused", False),
+        queue_size=pipeline_config.get("queue_size", 8),
+        tee_raw=pipeline_config.get("tee_raw", True),
+        report_path=data_dir / metrics_config["report_file"] if metrics_config.get("report_file") else None,
+        prometheus_path=metrics_config.get("prometheus_textfile"),
+        profiler=profiler,
+        name=name,
+        force=force,
+        loader=loader,
+    )
+
+def build_pipelines(config, data_dir=DATA_DIR, profiler=None, force=False, session=None, stop_event=None):
+    """Build one Pipeline per configured resource, all sharing one HTTP session, request budget and rate limit.
+
+    `session` reuses an existing HTTP session (daemon mode keeps one warm across runs).
+    """
+    resources = resource_configs(config)
+    if not config.get("resources"):
+        return {resources[0][0]: build_pipeline(config, data_dir=data_dir, profiler=profiler, force=force,
+                                                session=session, stop_event=stop_event)}
+
+    http = shared_http(config, session)
+    return {
+        name: build_pipeline(resource, data_dir=data_dir, profiler=profiler, name=name, force=force,
+                             stop_event=stop_event, **http)
+        for name, resource in resources
+    }
+
+def run_resources(stages, max_parallel=None):
+    """Run a single pipeline (or stage) directly, several through the Scheduler."""
+    if len(stages) == 1:
+        return next(iter(stages.values())).run()
+    return Scheduler(stages, max_parallel=max_parallel).run()
+
+def _describe_file(path):
+    if not os.path.exists(path):
+        return {"path": str(path), "exists": False}
+    if os.path.isdir(path):  # partitioned Parquet dataset
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    else:
+        size = os.path.getsize(path)
+    return {
+        "path": str(path),
+        "exists": True,
+        "bytes": size,
+        "modified": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds"),
+    }
+
+def transformed_output(resource, data_dir=DATA_DIR):
+    output = resource["output"]
+    return data_dir / f"{output['transformed_file']}.{output['format']}"
+
+def inspect_resources(config, data_dir=DATA_DIR):
+    """Describe what is on disk for every resource: raw and transformed outputs, checkpoint, fingerprint, watermark."""
+    from etl_pipeline.fingerprint import sidecar_path
+    from etl_pipeline.raw_io import detect_format
+    from etl_pipeline.state import load_state
 
-    config_path = Path(__file__).resolve().parents[1] / "config" / "config.yaml"
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    report = {}
+    for name, resource in resource_configs(config):
+        output = resource["output"]
+        raw_path = data_dir / output["raw_file"]
+        transformed_path = transformed_output(resource, data_dir)
+        incremental = resource.get("incremental", {})
 
-    extractor = Extractor(config)
-    transformer = Transformer(config)
-    pipeline = Pipeline(extractor, transformer)
+        raw = _describe_file(raw_path)
+        if raw["exists"]:
+            raw["format"], raw["compression"] = detect_format(raw_path)
+        transformed = _describe_file(transformed_path)
+        recorded = load_state(sidecar_path(transformed_path))
+        if recorded:
+            transformed["rows"] = recorded.get("rows")
+        state = load_state(data_dir / incremental.get("state_file", "extract_state.json"))
 
-    pipeline.run()
+        report[name] = {
+            "api_path": resource["api"]["api_path"],
+            "raw": raw,
+            "checkpoint": load_state(f"{raw_path}.checkpoint.json") or None,
+            "transformed": transformed,
+            "watermark": state.get("watermarks", {}).get(resource["api"]["api_path"]),
+        }
+    return report
+
+def run_command(args):
+    if args.daemon:
+        from etl_pipeline.daemon import Daemon
+
+        return Daemon(args.config, data_dir=args.data_dir, interval=args.interval, cron=args.cron,
+                      force=args.force).run_forever()
+
+    config = load_config(args.config)
+
+    profiler = None
+    if args.profile:
+        from etl_pipeline.profiling import StageProfiler
+
+        profiler = StageProfiler(Path(args.profile_dir) / time.strftime("%Y%m%d-%H%M%S"), top_n=args.profile_top)
+
+    pipelines = build_pipelines(config, data_dir=args.data_dir, profiler=profiler, force=args.force)
+    # profiling traces one stage at a time, so resources then run one after another
+    result = run_resources(pipelines, max_parallel=1 if profiler is not None else None)
+
+    if profiler is not None:
+        print(f"Profiles written to {profiler.run_dir}")
+        print(profiler.summary())
+    return result
+
+def extract_command(args):
+    return run_resources(build_extractors(load_config(args.config), data_dir=args.data_dir))
+
+def transform_command(args):
+    from etl_pipeline.state import commit_pending_watermark
+
+    transformers = build_transformers(load_config(args.config), data_dir=args.data_dir)
+    result = run_resources(transformers)
+    # an incremental `extract` leaves its watermark with the raw file, it only advances once the delta is transformed
+    results = result if len(transformers) > 1 else {next(iter(transformers)): result}
+    for name, transformer in transformers.items():
+        if results[name] is not None:
+            commit_pending_watermark(transformer.raw_file)
+    return result
+
+def inspect_command(args):
+    report = inspect_resources(load_config(args.config), data_dir=args.data_dir)
+    print(json.dumps(report, indent=2, default=str))
+    return report
+
+def query_command(args):
+    from etl_pipeline.query import OutputIndex
+
+    resources = dict(resource_configs(load_config(args.config)))
+    name = args.resource or next(iter(resources))
+    if name not in resources:
+        raise SystemExit(f"Unknown resource {name!r}, configured: {', '.join(resources)}")
+    resource = resources[name]
+    with OutputIndex(transformed_output(resource, args.data_dir), resource["output"]["format"]) as index:
+        result = index.get(args.id) if args.id is not None else index.top(args.top, args.limit)
+    print(json.dumps(result, indent=2, default=str))
+    return result
+
+def parse_args(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # without a command the full pipeline runs, as before the subcommands existed
+    if not any(arg in COMMANDS for arg in argv) and not {"-h", "--help"} & set(argv):
+        argv = ["run", *argv]
+
+    # accepted before or after the command; SUPPRESS keeps a subcommand from resetting a value given before it
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", type=Path, default=argparse.SUPPRESS, help=f"config file (default: {CONFIG_PATH})")
+    common.add_argument("--data-dir", type=Path, default=argparse.SUPPRESS,
+                        help=f"directory of raw, transformed and state files (default: {DATA_DIR})")
+
+    parser = argparse.ArgumentParser(prog="etl_pipeline.main", description="Extract, transform and load API collections.",
+                                     parents=[common])
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    run = commands.add_parser("run", parents=[common], help="run the full pipeline (the default)")
+    run.set_defaults(handler=run_command)
+    run.add_argument("--profile", action="store_true",
+                     help="profile each stage (cProfile + tracemalloc) and print a hot-spot table")
+    run.add_argument("--profile-dir", default=str(DATA_DIR / "profiles"),
+                     help="directory receiving one sub-directory of profiles per run")
+    run.add_argument("--profile-top", type=int, default=15, help="allocation sites listed per stage")
+    run.add_argument("--force", action="store_true",
+                     help="run the transformation even when its inputs are unchanged since the last run")
+    run.add_argument("--daemon", action="store_true",
+                     help="keep running, one pipeline run per interval or cron tick (see the daemon config section)")
+    run.add_argument("--interval", type=float, help="daemon mode: seconds between run starts")
+    run.add_argument("--cron", help='daemon mode: 5-field cron expression, e.g. "*/5 * * * *"')
+
+    commands.add_parser("extract", parents=[common], help="only extract the raw files").set_defaults(
+        handler=extract_command)
+    commands.add_parser("transform", parents=[common], help="only transform the existing raw files").set_defaults(
+        handler=transform_command)
+    commands.add_parser("inspect", parents=[common], help="print the state of every resource's files as JSON").set_defaults(
+        handler=inspect_command)
+
+    query = commands.add_parser("query", parents=[common], help="look up rows of a transformed output through its index")
+    query.set_defaults(handler=query_command)
+    lookup = query.add_mutually_exclusive_group(required=True)
+    lookup.add_argument("--id", type=int, help="print the row with this id")
+    lookup.add_argument("--top", metavar="COLUMN", help="print the rows with the highest COLUMN count")
+    query.add_argument("-n", "--limit", type=int, default=10, help="rows printed by --top (default: 10)")
+    query.add_argument("--resource", help="resource to query (default: the first configured one)")
+    args = parser.parse_args(argv)
+    args.config = getattr(args, "config", CONFIG_PATH)
+    args.data_dir = getattr(args, "data_dir", DATA_DIR)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+    return args.handler(args)
 
 if __name__ == "__main__":
     main()
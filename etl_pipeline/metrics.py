@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+# upper bounds (seconds) of the HTTP latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsCollector:
+    """Collects per-stage durations, row and byte counts, HTTP latency and retries for one pipeline run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = defaultdict(lambda: {"seconds": None, "rows": None, "bytes_read": 0, "bytes_written": 0})
+        self.counters = defaultdict(int)
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+    def record_stage(self, stage, seconds, rows=None):
+        with self._lock:
+            self.stages[stage]["seconds"] = seconds
+            self.stages[stage]["rows"] = rows
+
+    def add_bytes(self, stage, read=0, written=0):
+        with self._lock:
+            self.stages[stage]["bytes_read"] += read
+            self.stages[stage]["bytes_written"] += written
+
+    def observe_request(self, seconds):
+        with self._lock:
+            self.latency_sum += seconds
+            self.latency_count += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def to_dict(self):
+        with self._lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                seconds, rows = stage["seconds"], stage["rows"]
+                rows_per_sec = rows / seconds if rows is not None and seconds else None
+                stages[name] = {**stage, "rows_per_sec": rows_per_sec}
+
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+            return {
+                "stages": stages,
+                "http": {
+                    "requests": self.latency_count,
+                    "latency_seconds_sum": self.latency_sum,
+                    "latency_buckets": buckets,
+                    "retries": self.counters["http_retries"],
+                },
+                "counters": dict(self.counters),
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+
+    def write_json(self, path, extra=None):
+        """Write the run report as JSON, merged with `extra` fields (e.g. status, timestamp)."""
+        _atomic_write(path, json.dumps({**(extra or {}), **self.to_dict()}, indent=2))
+
+    def write_prometheus(self, path, success=True, labels=None):
+        """Write metrics in the Prometheus textfile-collector format (node_exporter picks up *.prom files).
+
+        `labels` (e.g. {"resource": "comics"}) are added to every sample, so several runs' files can coexist.
+        """
+        data = self.to_dict()
+        lines = []
+        constant = labels or {}
+
+        def label_text(sample_labels):
+            merged = {**constant, **sample_labels}
+            return "{" + ",".join(f'{k}="{v}"' for k, v in merged.items()) + "}" if merged else ""
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{name}{label_text(labels)} {value}")
+
+        stages = data["stages"]
+        metric("etl_stage_duration_seconds", "gauge", "Duration of the pipeline stage in the last run.",
+               [({"stage": s}, v["seconds"]) for s, v in stages.items()])
+        metric("etl_stage_rows", "gauge", "Rows produced by the pipeline stage in the last run.",
+               [({"stage": s}, v["rows"]) for s, v in stages.items()])
+        metric("etl_stage_rows_per_second", "gauge", "Throughput of the pipeline stage in the last run.",
+               [({"stage": s}, v["rows_per_sec"]) for s, v in stages.items()])
+        metric("etl_stage_bytes_read", "gauge", "Bytes read by the pipeline stage in the last run.",
+               [({"stage": s}, v["bytes_read"]) for s, v in stages.items()])
+        metric("etl_stage_bytes_written", "gauge", "Bytes written by the pipeline stage in the last run.",
+               [({"stage": s}, v["bytes_written"]) for s, v in stages.items()])
+
+        http = data["http"]
+        lines.append("# HELP etl_http_request_duration_seconds Latency of API requests in the last run.")
+        lines.append("# TYPE etl_http_request_duration_seconds histogram")
+        for le, count in http["latency_buckets"].items():
+            lines.append(f"etl_http_request_duration_seconds_bucket{label_text({'le': le})} {count}")
+        lines.append(f"etl_http_request_duration_seconds_sum{label_text({})} {http['latency_seconds_sum']}")
+        lines.append(f"etl_http_request_duration_seconds_count{label_text({})} {http['requests']}")
+        metric("etl_http_retries", "gauge", "API request retries in the last run.", [({}, http["retries"])])
+
+        metric("etl_peak_rss_bytes", "gauge", "Peak resident memory of the pipeline process.", [({}, data["peak_rss_bytes"])])
+        metric("etl_last_run_success", "gauge", "1 if the last run succeeded, 0 otherwise.", [({}, int(success))])
+        metric("etl_last_run_timestamp_seconds", "gauge", "Unix time the last run finished.", [({}, time.time())])
+
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def _atomic_write(path, text):
+    # textfile collectors may read at any moment, never expose a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -1,39 +1,276 @@
 import logging
+import queue
+import threading
 import time
 
+from etl_pipeline import fingerprint
+from etl_pipeline.metrics import MetricsCollector
+
+_END = object()  # marks the end of the page stream in fused mode
+
+
 class Pipeline:
-    def __init__(self, extractor, transformer):
+    def __init__(self, extractor, transformer, fused=False, queue_size=8, tee_raw=True,
+                 report_path=None, prometheus_path=None, profiler=None, name=None, force=False, loader=None):
         self.extractor = extractor
         self.transformer = transformer
+        self.loader = loader  # optional third stage loading the transformed output into a database
+        self.name = name  # resource name when several pipelines are scheduled together
+
+        ## metrics: collected per run, optionally exported as a JSON report / Prometheus textfile
+        self.metrics = MetricsCollector()
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
+
+        ## optional StageProfiler wrapped around each stage (None = no overhead)
+        self.profiler = profiler
+
+        ## stage caching: skip the transformation when its fingerprint matches the last run (force = always run)
+        self.force = force
+
+        ## fused mode: pages flow from extractor to transformer through a bounded queue
+        self.fused = fused
+        self.queue_size = queue_size
+        self.tee_raw = tee_raw
 
     def run(self):
+        # Fresh collector per run, shared with the stages that report metrics
+        self.metrics = MetricsCollector()
+        for stage in (self.extractor, self.transformer, self.loader):
+            if hasattr(stage, "metrics"):
+                stage.metrics = self.metrics
+
+        result = self._run()
+        if result is not None:
+            result["metrics"] = self.metrics.to_dict()
+        self._export(success=result is not None)
+        return result
+
+    def _export(self, success):
+        if self.report_path:
+            self.metrics.write_json(self.report_path, extra={"success": success, "finished_at": time.time()})
+            logging.info(f"Run report written to {self.report_path}")
+        if self.prometheus_path:
+            labels = {"resource": self.name} if self.name else None
+            self.metrics.write_prometheus(self.prometheus_path, success=success, labels=labels)
+
+    def _run(self):
         logging.info("Pipeline started.")
-        start_pipeline = time.time()
+        start_pipeline = time.perf_counter()
+
+        if self.fused and getattr(self.transformer, "incremental", False):
+            logging.info("Fused mode disabled: incremental runs merge into the existing output.")
+        elif self.fused and self.profiler is not None:
+            logging.info("Fused mode disabled: profiling runs the stages one after another to attribute them.")
+        elif self.fused:
+            return self._run_fused(start_pipeline)
+
+        if self.profiler is not None and getattr(self.extractor, "concurrency", 1) > 1:
+            # cProfile only traces the calling thread, the fetch workers' HTTP and JSON time would show as lock waits
+            logging.info("Concurrent extraction disabled: profiling fetches the pages on the profiled thread.")
+            self.extractor.concurrency = 1
 
         # Extraction
-        start = time.time()
+        start = time.perf_counter()
         try:
-            extract_path, extracted_count = self.extractor.run()
+            extract_path, extracted_count = self._call_stage("extract", self.extractor.run)
         except Exception as e:
             logging.error(f"Extraction failed: {e}")
             return None
-        elapsed = time.time() - start
-        logging.info(f"Extraction step completed in {elapsed:.2f}s, {extracted_count} rows at {extract_path}")
+        extract_elapsed = time.perf_counter() - start
+        logging.info(f"Extraction step completed in {extract_elapsed:.2f}s, {extracted_count} rows at {extract_path}")
+        self.metrics.record_stage("extract", extract_elapsed, extracted_count)
 
         if extracted_count == 0:
-            logging.warning("Pipeline aborted: no data extracted.")
-            return None
+            return self._nothing_extracted(extract_path, extract_elapsed, start_pipeline)
 
         # Transformation
-        start = time.time()
+        start = time.perf_counter()
         try:
-            transform_path, transformed_count = self.transformer.run()
+            transform_path, transformed_count = self._run_transform()
         except Exception as e:
             logging.error(f"Transformation failed: {e}")
             return None
-        elapsed = time.time() - start
-        logging.info(f"Transformation step completed in {elapsed:.2f}s, {transformed_count} rows at {transform_path}")
+        transform_elapsed = time.perf_counter() - start
+        logging.info(f"Transformation step completed in {transform_elapsed:.2f}s, {transformed_count} rows at {transform_path}")
+        self.metrics.record_stage("transform", transform_elapsed, transformed_count)
+
+        timings = {"extract": extract_elapsed, "transform": transform_elapsed}
+        loaded = self._run_load(transform_path, timings)
+        if loaded is False:
+            return None
+
+        self._commit_watermark()
 
-        total_elapsed = time.time() - start_pipeline
+        total_elapsed = time.perf_counter() - start_pipeline
         logging.info(f"Pipeline finished successfully in {total_elapsed:.2f}s.")
-        return {"raw": (extract_path, extracted_count), "transformed": (transform_path, transformed_count)}
+        self.metrics.record_stage("total", total_elapsed, transformed_count)
+        result = {
+            "raw": (extract_path, extracted_count),
+            "transformed": (transform_path, transformed_count),
+            "timings": {**timings, "total": total_elapsed},
+        }
+        if loaded is not None:
+            result["loaded"] = loaded
+        return result
+
+    def _run_fused(self, start_pipeline):
+        """Overlap extraction and transformation: pages are transformed while the next ones download."""
+        pages = queue.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        extract_result = {}
+
+        def hand_off(rows):
+            if cancelled.is_set():
+                raise RuntimeError("transformation stopped, aborting extraction")
+            pages.put(rows)  # blocks while the transformer is queue_size pages behind
+
+        def extract():
+            start = time.perf_counter()
+            try:
+                extract_result["raw"] = self.extractor.run(on_page=hand_off, write_raw=self.tee_raw)
+            except Exception as e:
+                extract_result["error"] = e
+            finally:
+                extract_result["elapsed"] = time.perf_counter() - start
+                pages.put(_END)
+
+        waited = 0.0
+        extraction_failed = False
+
+        def consume():
+            nonlocal waited, extraction_failed
+            while True:
+                start_wait = time.perf_counter()
+                rows = pages.get()
+                waited += time.perf_counter() - start_wait
+                if rows is _END:
+                    if "error" in extract_result:
+                        # fail the transformation so it discards its partial output instead of publishing it
+                        extraction_failed = True
+                        raise extract_result["error"]
+                    return
+                yield rows
+
+        producer = threading.Thread(target=extract, name="fused-extractor", daemon=True)
+        producer.start()
+
+        start = time.perf_counter()
+        try:
+            transform_path, transformed_count = self.transformer.run_pages(consume())
+        except Exception as e:
+            if extraction_failed:
+                # the end of the stream was already consumed, nothing left to drain
+                producer.join()
+                logging.error(f"Extraction failed: {extract_result['error']}")
+                return None
+            logging.error(f"Transformation failed: {e}")
+            cancelled.set()
+            # Unblock the producer so it can observe the cancellation and exit
+            while pages.get() is not _END:
+                pass
+            producer.join()
+            return None
+        transform_wall = time.perf_counter() - start
+        producer.join()
+
+        if "error" in extract_result:
+            logging.error(f"Extraction failed: {extract_result['error']}")
+            return None
+
+        extract_path, extracted_count = extract_result["raw"]
+        extract_elapsed = extract_result["elapsed"]
+        logging.info(f"Extraction step completed in {extract_elapsed:.2f}s, {extracted_count} rows at {extract_path}")
+        self.metrics.record_stage("extract", extract_elapsed, extracted_count)
+
+        if extracted_count == 0:
+            return self._nothing_extracted(extract_path, extract_elapsed, start_pipeline)
+
+        transform_busy = max(transform_wall - waited, 0.0)
+        logging.info(f"Transformation step completed in {transform_busy:.2f}s, {transformed_count} rows at {transform_path}")
+        self.metrics.record_stage("transform", transform_busy, transformed_count)
+
+        timings = {"extract": extract_elapsed, "transform": transform_busy}
+        loaded = self._run_load(transform_path, timings)
+        if loaded is False:
+            return None
+
+        self._commit_watermark()
+
+        total_elapsed = time.perf_counter() - start_pipeline
+        overlap = max(extract_elapsed + transform_busy - total_elapsed, 0.0)
+        self.metrics.record_stage("total", total_elapsed, transformed_count)
+        logging.info(
+            f"Pipeline finished successfully in {total_elapsed:.2f}s (fused, "
+            f"{overlap:.2f}s of transformation overlapped with extraction)."
+        )
+        result = {
+            "raw": (extract_path, extracted_count),
+            "transformed": (transform_path, transformed_count),
+            "timings": {**timings, "total": total_elapsed, "overlap": overlap},
+        }
+        if loaded is not None:
+            result["loaded"] = loaded
+        return result
+
+    def _nothing_extracted(self, extract_path, extract_elapsed, start_pipeline):
+        """An empty incremental delta is a successful run that leaves the output as it is; otherwise the run failed."""
+        if not getattr(self.extractor, "incremental", False):
+            logging.warning("Pipeline aborted: no data extracted.")
+            return None
+
+        logging.info("No rows changed since the last run, keeping the transformed output.")
+        self._commit_watermark()
+        total_elapsed = time.perf_counter() - start_pipeline
+        self.metrics.record_stage("total", total_elapsed, 0)
+        output_path = getattr(self.transformer, "output_path", None)
+        return {
+            "raw": (extract_path, 0),
+            "transformed": (str(output_path) if output_path is not None else None, 0),
+            "timings": {"extract": extract_elapsed, "total": total_elapsed},
+        }
+
+    def _run_load(self, transform_path, timings):
+        """Run the Loader when configured: (path, rows) on success, False on failure, None without loader."""
+        if self.loader is None:
+            return None
+        start = time.perf_counter()
+        try:
+            load_path, loaded_count = self._call_stage("load", self.loader.run, transform_path)
+        except Exception as e:
+            logging.error(f"Load failed: {e}")
+            return False
+        timings["load"] = time.perf_counter() - start
+        logging.info(f"Load step completed in {timings['load']:.2f}s, {loaded_count} rows at {load_path}")
+        self.metrics.record_stage("load", timings["load"], loaded_count)
+        return load_path, loaded_count
+
+    def _run_transform(self):
+        """Run the transformation, or reuse its last result when the transformer's inputs are unchanged."""
+        compute = getattr(self.transformer, "fingerprint", None)
+        if compute is None:
+            return self._call_stage("transform", self.transformer.run)
+
+        output_path = self.transformer.output_path
+        stage_fingerprint = compute()
+        if not self.force:
+            cached = fingerprint.load_result(output_path, stage_fingerprint)
+            if cached is not None:
+                logging.info(f"Transformation skipped: inputs unchanged since the run that wrote {cached[0]}")
+                self.metrics.increment("stages_skipped")
+                return cached
+
+        result = self._call_stage("transform", self.transformer.run)
+        fingerprint.save_result(output_path, stage_fingerprint, result)
+        return result
+
+    def _call_stage(self, name, run, *args):
+        if self.profiler is None:
+            return run(*args)
+        return self.profiler.profile(f"{self.name}_{name}" if self.name else name, run, *args)
+
+    def _commit_watermark(self):
+        # Only advance the incremental watermark once the delta is safely merged
+        commit_watermark = getattr(self.extractor, "commit_watermark", None)
+        if commit_watermark:
+            commit_watermark()
@@ -0,0 +1,70 @@
+import cProfile
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+
+from tabulate import tabulate
+
+
+class StageProfiler:
+    """Profile pipeline stages: a cProfile dump and a tracemalloc allocation summary per stage."""
+
+    def __init__(self, run_dir, top_n=15):
+        self.run_dir = run_dir
+        self.top_n = top_n
+        self.results = []
+        os.makedirs(run_dir, exist_ok=True)
+
+    def profile(self, stage, fn, *args, **kwargs):
+        """Call fn under the CPU profiler and allocation tracer, writing the stage's files to run_dir."""
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._write(stage, profiler, before, after, elapsed, peak)
+
+    def _write(self, stage, profiler, before, after, elapsed, peak):
+        prof_path = os.path.join(self.run_dir, f"{stage}.prof")
+        profiler.dump_stats(prof_path)
+
+        # Allocations still alive at the end of the stage, grouped by source line
+        alloc_path = os.path.join(self.run_dir, f"{stage}_allocations.txt")
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write(f"Top {self.top_n} allocation sites for stage '{stage}' (peak traced {peak / 2**20:.1f} MiB)\n")
+            for diff in after.compare_to(before, "lineno")[: self.top_n]:
+                f.write(f"{diff}\n")
+
+        stats = pstats.Stats(profiler)
+        hot = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:3]  # by own time
+        self.results.append({
+            "stage": stage,
+            "seconds": elapsed,
+            "peak_mib": peak / 2**20,
+            "hot_spots": [(pstats.func_std_string(func), tottime) for func, (_, _, tottime, _, _) in hot],
+        })
+        logging.info(f"Profile for stage '{stage}' written to {prof_path} and {alloc_path}")
+
+    def summary(self):
+        """Short hot-spot table: per stage, wall time, peak traced memory and the functions with most own time."""
+        rows = []
+        for result in self.results:
+            for i, (func, tottime) in enumerate(result["hot_spots"] or [("-", 0.0)]):
+                rows.append([
+                    result["stage"] if i == 0 else "",
+                    f"{result['seconds']:.2f}" if i == 0 else "",
+                    f"{result['peak_mib']:.1f}" if i == 0 else "",
+                    func[-70:],
+                    f"{tottime:.3f}",
+                ])
+        return tabulate(rows, headers=["stage", "wall s", "peak MiB", "hot spot (own time)", "s"], tablefmt="pipe")
@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import logging
+import mmap
+import os
+import time
+
+import numpy as np
+
+from etl_pipeline.atomic import atomic_output, discard
+
+MAGIC = b"ETLIDX01"
+BASE_COLUMNS = ("id", "name", "description")
+
+
+class StaleIndexError(Exception):
+    """The index was built for a different version of the output file."""
+
+
+def index_path(output_path):
+    return f"{output_path}.index"
+
+
+def _source_stamp(output_path):
+    stat = os.stat(output_path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def csv_record_offsets(path):
+    """Byte offset of every record after the header; quoted fields may span lines."""
+    offsets = []
+    with open(path, "rb") as f:
+        position, quotes, header = 0, 0, True
+        for line in f:
+            if quotes % 2 == 0:
+                if header:
+                    header = False
+                else:
+                    offsets.append(position)
+            # escaped quotes come in pairs, so an odd running count means the record continues
+            quotes += line.count(b'"')
+            position += len(line)
+    return np.array(offsets, dtype="<i8")
+
+
+def _read_columns(output_path, fmt, columns):
+    if fmt == "csv":
+        import pyarrow.csv as pa_csv
+
+        return pa_csv.read_csv(output_path, convert_options=pa_csv.ConvertOptions(include_columns=columns))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(output_path, columns=columns)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _ranking(counts, ids):
+    """Row numbers by count descending, missing counts last, ties by id."""
+    counts = counts.cast("int64")  # also covers all-empty CSV columns, inferred as null
+    missing = counts.is_null().to_numpy(zero_copy_only=False)
+    values = counts.fill_null(0).to_numpy()
+    return np.lexsort((ids, -values, missing)).astype("<i8")
+
+
+def build_index(output_path, fmt, rank_columns=None):
+    """Write the sidecar index of a transformed output: sorted ids with their rows, and one ranking per count column.
+
+    Returns the index path, or None for outputs that cannot be indexed (partitioned Parquet datasets).
+    """
+    if os.path.isdir(output_path):
+        logging.info(f"{output_path} is a partitioned dataset, no index built")
+        discard(index_path(output_path))
+        return None
+    start = time.perf_counter()
+    stamp = _source_stamp(output_path)
+
+    if rank_columns is None:
+        rank_columns = [name for name in _output_columns(output_path, fmt) if name not in BASE_COLUMNS]
+    table = _read_columns(output_path, fmt, ["id", *rank_columns])
+    ids = table["id"].to_numpy().astype("<i8")
+    order = np.argsort(ids, kind="stable").astype("<i8")
+
+    arrays = {"ids": ids[order], "id_rows": order}
+    for column in rank_columns:
+        arrays[f"rank:{column}"] = _ranking(table[column], ids)
+    if fmt == "csv":
+        arrays["offsets"] = csv_record_offsets(output_path)
+        if len(arrays["offsets"]) != len(ids):
+            raise ValueError(f"Found {len(arrays['offsets'])} CSV records in {output_path}, expected {len(ids)}")
+
+    layout, position = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [position, len(array)]
+        position += array.nbytes
+    header = json.dumps({"format": fmt, "rows": len(ids), "rank_columns": rank_columns, "arrays": layout, **stamp})
+    header = header.encode("utf-8")
+    header += b" " * (-len(header) % 8)  # keeps the arrays 8-byte aligned
+
+    path = index_path(output_path)
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for array in arrays.values():
+                f.write(array.tobytes())
+    logging.info(f"Indexed {len(ids)} rows of {output_path} in {time.perf_counter() - start:.2f}s "
+                 f"(rankings: {', '.join(rank_columns) or 'none'})")
+    return path
+
+
+def _csv_header(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _output_columns(output_path, fmt):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(output_path).names
+    return _csv_header(output_path)
+
+
+class OutputIndex:
+    """Point lookups by id and top-N by count over a transformed output, through its memory-mapped index.
+
+    Only the requested rows are read from the output. An index that no longer matches the output file is
+    rebuilt (or, with rebuild=False, StaleIndexError is raised).
+    """
+
+    def __init__(self, output_path, fmt=None, rebuild=True):
+        self.output_path = str(output_path)
+        self.format = fmt or os.path.splitext(self.output_path)[1].lstrip(".")
+        path = index_path(self.output_path)
+        if not self._matches(path):
+            if not rebuild:
+                raise StaleIndexError(f"{path} does not match {self.output_path}")
+            logging.info(f"Index of {self.output_path} is missing or stale, rebuilding it")
+            if build_index(self.output_path, self.format) is None:
+                raise ValueError(f"{self.output_path} cannot be indexed")
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = int.from_bytes(self._mmap[8:16], "little")
+        self.header = json.loads(self._mmap[16:16 + header_size])
+        data_start = 16 + header_size
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype="<i8", count=length, offset=data_start + offset)
+            for name, (offset, length) in self.header["arrays"].items()
+        }
+        self.rank_columns = self.header["rank_columns"]
+        self._columns = None
+        self._row_groups = None
+
+    def _matches(self, path):
+        if not os.path.exists(path) or not os.path.exists(self.output_path):
+            return False
+        with open(path, "rb") as f:
+            if f.read(8) != MAGIC:
+                return False
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+        stamp = _source_stamp(self.output_path)
+        return all(header.get(key) == value for key, value in stamp.items())
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def get(self, row_id):
+        """The row with this id as a dict, None when there is none."""
+        ids = self._arrays["ids"]
+        i = int(np.searchsorted(ids, row_id))
+        if i == len(ids) or ids[i] != row_id:
+            return None
+        return self._read_rows([int(self._arrays["id_rows"][i])])[0]
+
+    def top(self, column, n=10):
+        """The n rows with the highest `column` count, missing counts last and ties by id."""
+        if column not in self.rank_columns:
+            raise ValueError(f"No ranking for {column}, indexed: {', '.join(self.rank_columns)}")
+        return self._read_rows([int(row) for row in self._arrays[f"rank:{column}"][:n]])
+
+    def _read_rows(self, rows):
+        if self.format == "csv":
+            return [self._read_csv_row(int(self._arrays["offsets"][row])) for row in rows]
+        return self._read_parquet_rows(rows)
+
+    def _read_csv_row(self, offset):
+        if self._columns is None:
+            self._columns = _csv_header(self.output_path)
+        with open(self.output_path, "rb") as f:
+            f.seek(offset)
+            values = next(csv.reader(io.TextIOWrapper(f, encoding="utf-8", newline="")))
+        row = {}
+        for column, value in zip(self._columns, values):
+            if column in ("name", "description"):
+                row[column] = value
+            else:
+                row[column] = int(float(value)) if value != "" else None
+        return row
+
+    def _read_parquet_rows(self, rows):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(self.output_path)
+        if self._row_groups is None:
+            sizes = [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)]
+            self._row_groups = np.cumsum([0, *sizes])
+        result, cached = [], {}
+        for row in rows:
+            group = int(np.searchsorted(self._row_groups, row, side="right")) - 1
+            if group not in cached:
+                cached[group] = parquet.read_row_group(group)
+            result.append(cached[group].slice(row - int(self._row_groups[group]), 1).to_pylist()[0])
+        return result
+
+    def close(self):
+        self._arrays = {}
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
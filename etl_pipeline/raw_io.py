@@ -0,0 +1,163 @@
+import gzip
+import io
+import json
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ARROW_MAGIC = b"ARROW1"
+
+RAW_FORMATS = ("jsonl", "arrow")
+RAW_COMPRESSIONS = (None, "gzip", "zstd")
+
+# output column -> how its count is read from the nested raw field
+DEFAULT_NESTED_FIELDS = {"comics": "available", "series": "available", "stories": "available", "events": "available"}
+
+
+def detect_format(path):
+    """Sniff the raw landing format from the file's first bytes, returning (format, compression)."""
+    with open(path, "rb") as f:
+        head = f.read(len(ARROW_MAGIC))
+    if head.startswith(ARROW_MAGIC):
+        return "arrow", None
+    if head.startswith(GZIP_MAGIC):
+        return "jsonl", "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "jsonl", "zstd"
+    return "jsonl", None
+
+
+def open_jsonl(path, compression=None):
+    """Open a (possibly compressed) JSONL file as a binary stream."""
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        import pyarrow as pa
+
+        return pa.input_stream(str(path), compression="zstd")
+    return open(path, "rb")
+
+
+def read_arrow(path):
+    """Memory-map an Arrow IPC (Feather v2) raw file; uncompressed columns are not copied."""
+    import pyarrow as pa
+
+    # The table keeps the mapping alive, so the source is not closed here
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def read_frame(path):
+    """Read the whole raw file into a pandas DataFrame, whatever its landing format."""
+    import pandas as pd
+
+    fmt, compression = detect_format(path)
+    if fmt == "arrow":
+        return read_arrow(path).to_pandas()
+    with io.TextIOWrapper(open_jsonl(path, compression), encoding="utf-8") as f:
+        return pd.read_json(f, lines=True)
+
+
+def iter_frames(path, chunk_rows):
+    """Yield the raw file as pandas DataFrames of at most chunk_rows rows."""
+    import pandas as pd
+
+    fmt, compression = detect_format(path)
+    if fmt == "arrow":
+        table = read_arrow(path)
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield batch.to_pandas()
+        return
+    with io.TextIOWrapper(open_jsonl(path, compression), encoding="utf-8") as f:
+        with pd.read_json(f, lines=True, chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+def landing_schema(nested_fields, name_field="name"):
+    """Arrow schema of the typed raw landing: the fields the Transformer consumes plus `modified`."""
+    import pyarrow as pa
+    from etl_pipeline.arrow_engine import raw_schema
+
+    return raw_schema(nested_fields or DEFAULT_NESTED_FIELDS, name_field).append(pa.field("modified", pa.string()))
+
+
+def _coerce_row(row, schema):
+    """Null out values whose shape does not match the landing schema, as the pandas flattening does."""
+    import pyarrow as pa
+
+    coerced = {}
+    for field in schema:
+        value = row.get(field.name)
+        if pa.types.is_struct(field.type):
+            value = value if isinstance(value, dict) else None
+        elif pa.types.is_list(field.type):
+            value = value if isinstance(value, list) else None
+        elif pa.types.is_string(field.type) and value is not None and not isinstance(value, str):
+            value = str(value)
+        coerced[field.name] = value
+    return coerced
+
+
+class RawWriter:
+    """Write extracted rows as JSONL (optionally gzip/zstd compressed) or as an Arrow IPC file."""
+
+    def __init__(self, path, fmt="jsonl", compression=None, nested_fields=None, name_field="name", append=False,
+                 codec=None):
+        if fmt not in RAW_FORMATS:
+            raise ValueError(f"Unsupported raw format: {fmt}")
+        if compression not in RAW_COMPRESSIONS:
+            raise ValueError(f"Unsupported raw compression: {compression}")
+        if fmt == "arrow" and compression == "gzip":
+            raise ValueError("Arrow IPC raw files support zstd compression only")
+        if append and (fmt != "jsonl" or compression is not None):
+            raise ValueError("Only uncompressed JSONL raw files can be appended to")
+
+        self.format = fmt
+        self.dumps = codec.dumps if codec is not None else json.dumps
+        if fmt == "arrow":
+            import pyarrow as pa
+
+            self.schema = landing_schema(nested_fields, name_field)
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._ipc = pa.ipc.new_file(str(path), self.schema, options=options)
+        elif compression == "gzip":
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        elif compression == "zstd":
+            import pyarrow as pa
+
+            self._file = io.TextIOWrapper(pa.output_stream(str(path), compression="zstd"), encoding="utf-8")
+        else:
+            self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        if self.format == "arrow":
+            import pyarrow as pa
+
+            try:
+                table = pa.Table.from_pylist(rows, schema=self.schema)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                table = pa.Table.from_pylist([_coerce_row(row, self.schema) for row in rows], schema=self.schema)
+            self._ipc.write_table(table)
+            return
+
+        if not rows:
+            return
+        # Passthrough pages (json_codec.JsonRows) carry their rows' JSON text, others are encoded here;
+        # either way the page goes out in a single write
+        lines = getattr(rows, "lines", None) or [self.dumps(row) for row in rows]
+        self._file.write("\n".join(lines) + "\n")
+
+    def flush(self):
+        """Flush buffered rows to disk and return the file's byte size (uncompressed JSONL only)."""
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        if self.format == "arrow":
+            self._ipc.close()
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
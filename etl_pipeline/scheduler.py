@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# config sections a resource entry may override, each merged one level deep over the top-level section
+RESOURCE_SECTIONS = ("api", "output", "incremental", "dedup", "cache", "transform", "load", "pipeline", "metrics")
+
+
+def _prefixed(name, filename):
+    return f"{name}_{filename}" if filename else filename
+
+
+def resource_configs(config):
+    """Return [(name, config)] for every resource to extract.
+
+    Without a `resources` list the top-level config is the only resource. Otherwise each entry's sections
+    replace keys of the top-level ones (so a resource's nested_fields replace the default mapping), and files
+    the entry does not name itself are prefixed with the resource name to keep resources from clobbering
+    each other.
+    """
+    resources = config.get("resources") or []
+    if not resources:
+        return [(config["api"]["api_path"].rstrip("/").rsplit("/", 1)[-1], config)]
+
+    configs = []
+    for entry in resources:
+        name = entry.get("name") or entry["api"]["api_path"].rstrip("/").rsplit("/", 1)[-1]
+        resource = {key: value for key, value in config.items() if key != "resources"}
+        for section in RESOURCE_SECTIONS:
+            resource[section] = {**config.get(section, {}), **entry.get(section, {})}
+
+        own = {section: entry.get(section, {}) for section in RESOURCE_SECTIONS}
+        for section, key in (("output", "raw_file"), ("output", "transformed_file"),
+                             ("incremental", "state_file"), ("metrics", "report_file")):
+            if key not in own[section] and key in resource[section]:
+                resource[section][key] = _prefixed(name, resource[section][key])
+        if "dir" not in own["cache"]:
+            # one ResponseCache per directory, its index is not shared between instances
+            resource["cache"]["dir"] = f"{resource['cache'].get('dir', 'http_cache')}/{name}"
+        prometheus = resource["metrics"].get("prometheus_textfile")
+        if prometheus and "prometheus_textfile" not in own["metrics"]:
+            head, dot, ext = prometheus.rpartition(".")
+            resource["metrics"]["prometheus_textfile"] = f"{head}_{name}.{ext}" if dot else f"{prometheus}_{name}"
+        configs.append((name, resource))
+
+    names = [name for name, _ in configs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate resource names: {', '.join(duplicates)}")
+    return configs
+
+
+class Scheduler:
+    """Run one Pipeline (or single stage) per resource concurrently and collect their results by resource name.
+
+    Anything with a run() method can be scheduled. The pipelines are expected to share one HTTP session
+    and request budget (see main.build_pipelines), so the wall clock approaches the slowest resource
+    instead of the sum of all of them.
+    """
+
+    def __init__(self, pipelines, max_parallel=None):
+        self.pipelines = pipelines
+        self.max_parallel = max_parallel or max(len(pipelines), 1)
+
+    def run(self):
+        logging.info(f"Scheduling {len(self.pipelines)} resources, {self.max_parallel} at a time.")
+        start = time.perf_counter()
+
+        elapsed_by_resource = {}
+
+        def run_resource(name):
+            threading.current_thread().name = f"resource-{name}"
+            resource_start = time.perf_counter()
+            try:
+                result = self.pipelines[name].run()
+            except Exception as e:
+                logging.error(f"Resource '{name}' failed: {e}")
+                result = None
+            elapsed_by_resource[name] = time.perf_counter() - resource_start
+            logging.info(f"Resource '{name}' {'finished' if result else 'failed'} in {elapsed_by_resource[name]:.2f}s")
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            results = dict(zip(self.pipelines, pool.map(run_resource, self.pipelines)))
+
+        elapsed = time.perf_counter() - start
+        stage_sum = sum(elapsed_by_resource.values())
+        failed = [name for name, result in results.items() if result is None]
+        logging.info(
+            f"All resources done in {elapsed:.2f}s ({stage_sum:.2f}s if run one after another), "
+            f"{len(results) - len(failed)} succeeded" + (f", failed: {', '.join(failed)}" if failed else "")
+        )
+        return results
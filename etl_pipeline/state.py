@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# extractors of several resources may share one state file
+_STATE_LOCK = threading.Lock()
+
+
+def load_state(path):
+    """Read the JSON state file, returning an empty dict when it does not exist yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    """Write the JSON state file via a temp file + rename so a crash never leaves it half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def save_watermark(state_path, api_path, watermark):
+    """Record the modifiedSince watermark of `api_path` in the state file."""
+    with _STATE_LOCK:
+        state = load_state(state_path)
+        state.setdefault("watermarks", {})[api_path] = watermark
+        save_state(state_path, state)
+
+
+def pending_watermark_path(raw_path):
+    """Watermark of a raw file that is not transformed yet, committed once it is (see commit_pending_watermark)."""
+    return f"{raw_path}.watermark.json"
+
+
+def commit_pending_watermark(raw_path):
+    """Commit the watermark left next to `raw_path` by its extraction; returns it, or None when there is none."""
+    path = pending_watermark_path(raw_path)
+    pending = load_state(path)
+    if not pending:
+        return None
+    save_watermark(pending["state_file"], pending["api_path"], pending["watermark"])
+    os.remove(path)
+    return pending["watermark"]
+
+
+def parse_modified(value):
+    """Parse the API's `modified` timestamp (e.g. 2014-04-29T14:18:17-0400), None if invalid."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,187 @@
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# fraction of the configured rate given back per successful request after a 429 halved it
+RECOVERY_STEP = 0.05
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every worker (and resource) hitting the same API quota.
+
+    Adaptive: a 429 halves the refill rate (down to min_rate) and pauses all callers for Retry-After,
+    each success then raises it again by RECOVERY_STEP of the configured rate.
+    """
+
+    def __init__(self, rate=None, burst=None, min_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate  # None = unlimited, only Retry-After pauses apply
+        self.rate = rate
+        self.min_rate = min(min_rate or 1.0, rate) if rate else None
+        self.burst = burst or max(rate or 1, 1)
+        self.tokens = float(self.burst)
+        self.paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif not self.rate:
+                    return
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def throttle(self, retry_after=None):
+        """The API answered 429: slow down, and stop everyone for `retry_after` seconds when given."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.tokens = 0.0
+            if self.rate:
+                self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            logging.warning(
+                f"Rate limited by the API, request rate lowered to {self.rate or 'unlimited'}/s"
+                + (f", pausing {retry_after:.1f}s" if retry_after else "")
+            )
+
+    def record_success(self):
+        if not self.max_rate or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+
+
+class CircuitBreaker:
+    """Stop calling the API after `failure_threshold` consecutive failures, for `reset_seconds`.
+
+    Once the cool-down is over the circuit is half-open: the first caller sends the one trial request
+    and every other caller keeps getting CircuitOpenError until it is recorded. A success closes the
+    circuit, a failure opens it again straight away. A trial that records nothing (a non-retryable
+    error) lets another caller try after a further `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold=10, reset_seconds=60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None  # half-open: when the trial request was let through
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            now = self._clock()
+            if now - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError(
+                    f"Circuit open after {self.failures} consecutive failures, retrying in "
+                    f"{self.reset_seconds - (now - self.opened_at):.0f}s"
+                )
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_seconds:
+                raise CircuitOpenError("Circuit half-open, waiting for the trial request")
+            self.probe_started_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.error(f"Circuit breaker opened after {self.failures} consecutive failures")
+                self.opened_at = self._clock()
+                self.probe_started_at = None
+
+
+def status_code(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(exc):
+    """Transient errors (5xx, 429, timeouts, dropped connections, truncated bodies) are retried; the rest are fatal."""
+    if isinstance(exc, (requests.exceptions.InvalidURL, requests.exceptions.InvalidSchema,
+                        requests.exceptions.MissingSchema)):
+        return False  # a misconfigured base_url fails the same way on every attempt
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status = status_code(exc)
+        return status is not None and (status == 429 or status >= 500)
+    if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                        requests.exceptions.ChunkedEncodingError)):
+        return True
+    # a body cut off mid-transfer fails to parse (requests' and orjson's decode errors subclass JSONDecodeError)
+    return isinstance(exc, (json.JSONDecodeError, UnicodeDecodeError))
+
+
+def retry_after_seconds(exc):
+    """Seconds the server asked us to wait (Retry-After as delta-seconds or HTTP date), None when absent."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base, cap, rng=random):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def build_limiter(api_config):
+    """TokenBucket from the `api.rate_limit` config section (no section = unlimited)."""
+    section = api_config.get("rate_limit") or {}
+    return TokenBucket(
+        rate=section.get("requests_per_second"),
+        burst=section.get("burst"),
+        min_rate=section.get("min_requests_per_second"),
+    )
+
+
+def build_breaker(api_config):
+    """CircuitBreaker from the `api.circuit_breaker` config section."""
+    section = api_config.get("circuit_breaker") or {}
+    return CircuitBreaker(
+        failure_threshold=section.get("failure_threshold", 10),
+        reset_seconds=section.get("reset_seconds", 60),
+    )
@@ -1,71 +1,553 @@
+import numpy as np
 import pandas as pd
+import io
 import logging
-import re
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from tabulate import tabulate
+
+from etl_pipeline import raw_io
+from etl_pipeline.atomic import atomic_output, discard, partial_path, publish
+from etl_pipeline.fingerprint import code_version, file_digest, stage_fingerprint
+from etl_pipeline.metrics import MetricsCollector
+from etl_pipeline.raw_io import DEFAULT_NESTED_FIELDS
+
+# output columns besides the nested_fields counts
+BASE_COLUMNS = ("id", "name", "description")
+
+
+def output_dtypes(schema, count_columns):
+    """Expand the declared `transform.schema` into {output column: dtype}, None when types are inferred.
+
+    The "counts" key applies to every count column; a count column named explicitly takes precedence.
+    """
+    if not schema:
+        return None
+    schema = dict(schema)
+    counts = schema.pop("counts", None)
+    if counts is not None:
+        schema = {**{column: counts for column in count_columns}, **schema}
+    unknown = set(schema) - {*BASE_COLUMNS, *count_columns}
+    if unknown:
+        raise ValueError(f"transform.schema names columns the output does not have: {', '.join(sorted(unknown))}")
+    return {column: pd.api.types.pandas_dtype(dtype) for column, dtype in schema.items()}
+
+
+def deep_memory_mib(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def extract_nested(values, kind, index):
+    """Extract a count from a nested raw column with vectorized accessors.
+
+    "available" reads the `available` key of collection dicts, "length" counts list items (e.g. `urls`).
+    Rows where the value has the wrong shape become null, matching the row-by-row lambdas this replaces.
+    """
+    if values is None or values.dtype != object:
+        # Missing or all-null column: nothing nested to read
+        return pd.Series([None] * len(index), index=index, dtype=object)
+
+    if kind == "available":
+        counts = values.str.get("available")
+    elif kind == "length":
+        # Arrow IPC landings hand lists over as numpy arrays
+        counts = values.str.len().where(values.map(type).isin([list, np.ndarray]))
+    else:
+        raise ValueError(f"Unsupported nested field extraction: {kind}")
+
+    if counts.isna().all():
+        # Keep all-null columns as object so CSV/Parquet output does not change type
+        return pd.Series([None] * len(index), index=index, dtype=object)
+    return counts
+
+
+def preview_markdown(df, max_rows=10, max_colwidth=20):
+    df_preview = df.head(max_rows).copy()
+    for col in df_preview.select_dtypes(exclude=["number"]):  # string columns, also the declared string[pyarrow]
+        # pd.NA cannot reach tabulate, it is ambiguous as a boolean
+        values = df_preview[col].astype(object).where(df_preview[col].notna(), None)
+        df_preview[col] = values.astype(str).apply(
+            lambda x: x[:max_colwidth] + "..." if len(x) > max_colwidth else x
+        )
+    print(df_preview.to_markdown(index=False))
+
+
+def shard_ranges(path, shards):
+    """Split a JSONL file into at most `shards` byte ranges, each starting and ending on a line boundary."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, bounds[-1]))
+            f.readline()  # finish the line the cut landed in
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _transform_shard(config, data_dir, start, end, part_path, preview):
+    """Worker process: transform one byte range of the raw JSONL file.
+
+    CSV shards are written headerless to part_path and the row count is returned; Parquet shards are
+    returned as an Arrow table for the parent to write with the configured layout.
+    """
+    transformer = Transformer(config, data_dir=data_dir)
+    with open(transformer.raw_file, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = transformer._flatten(transformer._read_frame(data))
+    if transformer.dtypes is None:
+        # Pin counts to nullable ints so every shard has the same column types
+        df[transformer.count_columns] = df[transformer.count_columns].astype("Int64")
+
+    head = df.head(10) if preview else None
+    if part_path is not None:
+        df.to_csv(part_path, index=False, header=False)
+        return len(df), head, None
+    return len(df), head, pa_table_from_pandas(df)
+
+
+def pa_table_from_pandas(df):
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a single CSV file or Parquet file (one row group per chunk)."""
+
+    def __init__(self, path, fmt, parquet_options=None):
+        self.path = path
+        self.format = fmt
+        self.parquet_options = parquet_options or {}
+        self._csv = None
+        self._parquet = None
+
+    def write(self, df):
+        if self.format == "csv":
+            if self._csv is None:
+                self._csv = open(self.path, "w", encoding="utf-8", newline="")
+                df.to_csv(self._csv, index=False)
+            else:
+                df.to_csv(self._csv, index=False, header=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._parquet = pq.ParquetWriter(
+                    self.path,
+                    table.schema,
+                    compression=self.parquet_options.get("compression", "snappy"),
+                    use_dictionary=self.parquet_options.get("use_dictionary", True),
+                )
+            else:
+                table = pa.Table.from_pandas(df, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(table, row_group_size=self.parquet_options.get("row_group_size"))
+
+    def close(self):
+        if self._csv is not None:
+            self._csv.close()
+        if self._parquet is not None:
+            self._parquet.close()
 
 
 class Transformer:
-    def __init__(self, config, data_dir=Path(__file__).resolve().parents[1] / "data"):
+    def __init__(self, config, data_dir=Path(__file__).resolve().parents[1] / "data", metrics=None):
         self.raw_file = data_dir / config["output"]["raw_file"]
         self.format = config["output"]["format"]
         self.base_name = config["output"]["transformed_file"]
+        self.parquet_config = config["output"].get("parquet")
         self.data_dir = data_dir
+        self.incremental = config.get("incremental", {}).get("enabled", False)
 
-    def run(self):
-        logging.info("Starting transformation...")
+        ## transform properties
+        transform = config.get("transform", {})
+        self.mode = transform.get("mode", "batch")  # options: batch, stream, parallel
+        self.engine = transform.get("engine", "pandas")  # options: pandas, arrow (batch mode)
+        self.chunk_rows = transform.get("chunk_rows", 10000)
+        self.workers = transform.get("workers") or os.cpu_count() or 1  # parallel mode
+        self.parallel_min_bytes = transform.get("parallel_min_bytes", 64 * 1024 * 1024)
+        self.config = config  # handed to the parallel mode's worker processes
+        self.nested_fields = transform.get("nested_fields") or DEFAULT_NESTED_FIELDS
+        self.name_field = transform.get("name_field", "name")  # raw field written to the name column (comics: title)
+        self.count_columns = list(self.nested_fields)
+        # declared output dtypes, applied when the raw rows are read (None = inferred from the raw payload)
+        self.dtypes = output_dtypes(transform.get("schema"), self.count_columns)
 
-        def preview_markdown(df, max_rows=10, max_colwidth=20):
-            df_preview = df.copy()
-            for col in df_preview.select_dtypes(include=["object"]):  # only string columns
-                df_preview[col] = df_preview[col].astype(str).apply(
-                    lambda x: x[:max_colwidth] + "..." if len(x) > max_colwidth else x
-                )
-            print(df_preview.head(max_rows).to_markdown(index=False))
+        ## query index - sidecar of id lookups and count rankings, rebuilt whenever the output is rewritten
+        self.index = config["output"].get("index", False)
 
-        try:
-            df_raw = pd.read_json(path_or_buf=self.raw_file, lines=True)
-        except ValueError:
-            logging.error("No valid JSON data to transform.")
-            raise
+        ## fingerprint inputs - the config sections that shape the output
+        self.fingerprint_config = {key: config.get(key, {}) for key in ("output", "transform", "incremental")}
 
-        if df_raw.empty:
-            logging.warning("Transformation aborted: empty dataset.")
-            return str(self.data_dir / f"{self.base_name}.{self.format}"), 0
-        
-        pd.set_option("display.max_colwidth", 20)  # show only 20 chars
+        ## run metrics - Pipeline swaps in its shared collector
+        self.metrics = metrics or MetricsCollector()
 
-        # flatten the nested fields into clean columns      
+    @property
+    def output_path(self):
+        return self.data_dir / f"{self.base_name}.{self.format}"
+
+    def fingerprint(self):
+        """Fingerprint of everything the output depends on: raw file content, config and code version."""
+        return stage_fingerprint({
+            "raw": file_digest(self.raw_file),
+            "config": self.fingerprint_config,
+            "code": code_version(),
+        })
+
+    def _read_output(self, path):
+        if self.format == "csv":
+            return pd.read_csv(path)
+        if self.format == "parquet":
+            # a partitioned dataset reads back with its hive partition column, which is not part of the output
+            partition_by = (self.parquet_config or {}).get("partition_by")
+            return pd.read_parquet(path).drop(columns=[partition_by] if partition_by else [])
+        raise ValueError(f"Unsupported format: {self.format}")
+
+    def _merge_existing(self, df, output_path):
+        """Upsert the delta into the existing output by id: changed rows are replaced, new ones appended."""
+        existing = self._read_output(output_path)
+        replaced = existing["id"].isin(df["id"])
+        merged = self._apply_schema(pd.concat([existing[~replaced], df], ignore_index=True))
+        logging.info(
+            f"Merged delta into {output_path}: {int(replaced.sum())} updated, "
+            f"{len(df) - int(replaced.sum())} new, {len(merged)} total rows"
+        )
+        return merged
+
+    def _flatten(self, df_raw):
+        """Flatten the nested fields of raw rows into clean output columns."""
         df = pd.DataFrame({
             "id": df_raw["id"],
-            "name": df_raw["name"],
+            "name": df_raw[self.name_field],
             "description": df_raw["description"],
-            "comics": df_raw["comics"].apply(lambda x: x.get("available") if isinstance(x, dict) else None),
-            "series": df_raw["series"].apply(lambda x: x.get("available") if isinstance(x, dict) else None),
-            "stories": df_raw["stories"].apply(lambda x: x.get("available") if isinstance(x, dict) else None),
-            "events": df_raw["events"].apply(lambda x: x.get("available") if isinstance(x, dict) else None),
         })
+        for column, kind in self.nested_fields.items():
+            df[column] = extract_nested(df_raw.get(column), kind, df_raw.index)
 
         # Clean description: remove/collapse whitespace/newlines
         if "description" in df.columns:
             df["description"] = (
                 df["description"]
                 .fillna("")
-                .apply(lambda x: re.sub(r"\s+", " ", str(x)))       
+                .astype(str)
+                .str.replace(r"\s+", " ", regex=True)
                 .str.strip()
             )
+        return self._apply_schema(df)
+
+    def _apply_schema(self, df):
+        return df.astype(self.dtypes) if self.dtypes else df
+
+    def _read_frame(self, data=None):
+        """Read raw rows, the whole raw file or `data` bytes of it, into a DataFrame.
+
+        With a declared schema the Arrow JSON reader parses only the fields the output needs, skipping the
+        large nested structures; rows it cannot parse fall back to pandas inferring every field.
+        """
+        if self.dtypes is not None:
+            from pyarrow import ArrowInvalid
+            from etl_pipeline import arrow_engine
+
+            try:
+                if data is None:
+                    table = arrow_engine.read_raw(self.raw_file, self.nested_fields, self.name_field)
+                else:
+                    table = arrow_engine.read_jsonl(io.BytesIO(data), self.nested_fields, self.name_field)
+                return table.to_pandas()
+            except ArrowInvalid as e:
+                logging.warning(f"Could not parse the raw rows with the declared schema ({e}), inferring every field.")
+        if data is None:
+            return raw_io.read_frame(self.raw_file)
+        return pd.read_json(io.BytesIO(data), lines=True)
+
+    def _cast_table(self, table):
+        """Cast an Arrow table to the declared dtypes, converted to Arrow types the way pandas converts them."""
+        import pyarrow as pa
+
+        empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in self.dtypes.items()})
+        declared = pa.Schema.from_pandas(empty, preserve_index=False)
+        return table.cast(pa.schema([
+            declared.field(name) if name in declared.names else table.schema.field(name) for name in table.column_names
+        ]))
+
+    def run(self):
+        logging.info("Starting transformation...")
+        previous = self._output_stamp()
+        output_path, count = self._run()
+        self._record_io(output_path, read_raw=True)
+        self._refresh_index(output_path, count, previous)
+        return output_path, count
+
+    def _output_stamp(self):
+        # publishing renames a new file into place, so a rewritten output always gets a new inode
+        try:
+            stat = os.stat(self.output_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _refresh_index(self, output_path, count, previous):
+        """Rebuild the query index when the run published a new output; an output left in place keeps its index."""
+        if not self.index or self._output_stamp() == previous:
+            return
+        from etl_pipeline import query
+
+        if count and os.path.exists(output_path):
+            query.build_index(output_path, self.format, self.count_columns)
+        else:
+            discard(query.index_path(output_path))
+
+    def _record_io(self, output_path, read_raw):
+        read = self.raw_file.stat().st_size if read_raw and self.raw_file.exists() else 0
+        written = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        self.metrics.add_bytes("transform", read=read, written=written)
+
+    def _run(self):
+        if self.mode == "stream" and not self.incremental:
+            return self._run_streaming()
+
+        if self.mode == "parallel" and not self.incremental:
+            result = self._run_parallel()
+            if result is not None:
+                return result
+
+        if self.engine == "arrow" and not self.incremental:
+            from pyarrow import ArrowInvalid
+
+            try:
+                return self._run_arrow()
+            except ArrowInvalid as e:
+                logging.warning(f"Arrow engine could not parse the raw file ({e}), falling back to pandas.")
+
+        try:
+            df_raw = self._read_frame()
+        except ValueError:
+            logging.error("No valid JSON data to transform.")
+            raise
+
+        if df_raw.empty:
+            logging.warning("Transformation aborted: empty dataset.")
+            return str(self.data_dir / f"{self.base_name}.{self.format}"), 0
+
+        pd.set_option("display.max_colwidth", 20)  # show only 20 chars
+
+        df = self._flatten(df_raw)
+        logging.info(
+            f"DataFrame memory (deep): {deep_memory_mib(df_raw):.1f} MiB raw, {deep_memory_mib(df):.1f} MiB output"
+            + (" with the declared schema" if self.dtypes else "")
+        )
 
         print(f"Sample output:")
         preview_markdown(df)
         print(f"Dataframe shape: {df.shape}")
 
         output_path = self.data_dir / f"{self.base_name}.{self.format}"
-        if self.format == "csv":
-            df.to_csv(output_path, index=False)
-        elif self.format == "parquet":
-            df.to_parquet(output_path, index=False)
-        else:
+        if self.incremental and output_path.exists():
+            df = self._merge_existing(df, output_path)
+
+        if self.format not in ("csv", "parquet"):
             raise ValueError(f"Unsupported format: {self.format}")
 
+        # Readers never see a half-written output: it is renamed into place once complete
+        with atomic_output(output_path) as tmp_path:
+            if self.format == "csv":
+                df.to_csv(tmp_path, index=False)
+            else:
+                self._write_parquet(pa_table_from_pandas(df), tmp_path)
+
         logging.info(f"Transformed data saved to {output_path}")
         return str(output_path), len(df)
+
+    def _write_parquet(self, table, output_path):
+        from etl_pipeline import parquet_output
+
+        options = parquet_output.parquet_options(self.parquet_config)
+        files = parquet_output.write_parquet(table, output_path, options)
+        if options["partition_by"]:
+            logging.info(f"Wrote {files} partitions by {options['partition_by']} with _metadata summary")
+
+    def _streaming_parquet_options(self):
+        if self.format != "parquet":
+            return None
+        from etl_pipeline import parquet_output
+
+        options = parquet_output.parquet_options(self.parquet_config)
+        if options["partition_by"] or options["sort_by_id"]:
+            logging.warning("Streaming output is written as one file in arrival order: partition_by/sort_by_id ignored.")
+        return options
+
+    def _run_arrow(self):
+        """Transform with Arrow end to end: multithreaded JSON read, compute kernels, direct write."""
+        from etl_pipeline import arrow_engine
+
+        output_path = self.data_dir / f"{self.base_name}.{self.format}"
+        if self.format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported format: {self.format}")
+
+        if self.raw_file.stat().st_size == 0:
+            logging.warning("Transformation aborted: empty dataset.")
+            return str(output_path), 0
+
+        table = arrow_engine.flatten(
+            arrow_engine.read_raw(self.raw_file, self.nested_fields, self.name_field), self.nested_fields, self.name_field
+        )
+        if self.dtypes:
+            table = self._cast_table(table)
+
+        print("Sample output:")
+        arrow_engine.preview_markdown(table)
+        print(f"Table shape: ({table.num_rows}, {table.num_columns})")
+
+        with atomic_output(output_path) as tmp_path:
+            if self.format == "csv":
+                arrow_engine.write_csv(table, tmp_path, self.dtypes)
+            else:
+                self._write_parquet(table, tmp_path)
+
+        logging.info(f"Transformed data saved to {output_path} (arrow engine)")
+        return str(output_path), table.num_rows
+
+    def _run_parallel(self):
+        """Transform newline-aligned byte ranges of the raw file in worker processes, merged in input order.
+
+        Returns None, to fall back to the single-process path, for small or non byte-splittable raw files.
+        """
+        if self.format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported format: {self.format}")
+
+        fmt, compression = raw_io.detect_format(self.raw_file)
+        size = self.raw_file.stat().st_size
+        if fmt != "jsonl" or compression is not None:
+            logging.info("Parallel mode needs an uncompressed JSONL raw file, transforming in a single process.")
+            return None
+        if size < self.parallel_min_bytes or self.workers < 2:
+            logging.info(f"Raw file is {size} bytes, transforming in a single process.")
+            return None
+
+        ranges = shard_ranges(self.raw_file, self.workers)
+        output_path = self.output_path
+        part_paths = [f"{output_path}.part-{i}" if self.format == "csv" else None for i in range(len(ranges))]
+        logging.info(f"Transforming {len(ranges)} shards of {self.raw_file} with {self.workers} worker processes")
+
+        # spawn: the Pipeline may be running other threads, which fork() would not copy safely
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges)), mp_context=context) as pool:
+                futures = [
+                    pool.submit(_transform_shard, self.config, self.data_dir, start, end, part_path, i == 0)
+                    for i, ((start, end), part_path) in enumerate(zip(ranges, part_paths))
+                ]
+                shards = [future.result() for future in futures]
+            total_rows = sum(rows for rows, _, _ in shards)
+
+            print("Sample output:")
+            preview_markdown(shards[0][1])
+            print(f"Dataframe shape: ({total_rows}, {3 + len(self.count_columns)})")
+
+            with atomic_output(output_path) as tmp_path:
+                if self.format == "csv":
+                    with open(tmp_path, "wb") as out:
+                        out.write((",".join(shards[0][1].columns) + "\n").encode("utf-8"))
+                        for part_path in part_paths:
+                            with open(part_path, "rb") as part:
+                                shutil.copyfileobj(part, out, 1024 * 1024)
+                else:
+                    import pyarrow as pa
+
+                    # shards where a text column is all null carry a null type, promoted to string here
+                    table = pa.concat_tables([table for _, _, table in shards], promote_options="default")
+                    self._write_parquet(table, tmp_path)
+        except ValueError:
+            logging.error("No valid JSON data to transform.")
+            raise
+        finally:
+            for part_path in part_paths:
+                if part_path is not None:
+                    discard(part_path)
+
+        logging.info(f"Transformed data saved to {output_path} from {len(ranges)} shards")
+        return str(output_path), total_rows
+
+    def _run_streaming(self):
+        """Transform the raw file chunk by chunk so peak memory is bounded by chunk_rows."""
+        try:
+            return self._write_chunks(raw_io.iter_frames(self.raw_file, self.chunk_rows))
+        except ValueError:
+            logging.error("No valid JSON data to transform.")
+            raise
+
+    def run_pages(self, pages):
+        """Transform pages of raw rows as they arrive (fused mode), without reading the raw file."""
+        logging.info("Starting transformation of streamed pages...")
+        previous = self._output_stamp()
+
+        def batches():
+            buffer = []
+            for rows in pages:
+                buffer.extend(rows)
+                if len(buffer) >= self.chunk_rows:
+                    yield pd.DataFrame(buffer)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer)
+
+        output_path, count = self._write_chunks(batches())
+        self._record_io(output_path, read_raw=False)
+        self._refresh_index(output_path, count, previous)
+        return output_path, count
+
+    def _write_chunks(self, chunks):
+        """Flatten each raw DataFrame chunk and append it to the output file."""
+        if self.format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported format: {self.format}")
+
+        output_path = self.data_dir / f"{self.base_name}.{self.format}"
+        tmp_path = partial_path(output_path)
+        writer = None
+        total_rows = 0
+        count = 0
+
+        try:
+            for df_raw in chunks:
+                if df_raw.empty:
+                    continue
+
+                df = self._flatten(df_raw)
+                if self.dtypes is None:
+                    # Pin counts to nullable ints so every chunk has the same column types
+                    df[self.count_columns] = df[self.count_columns].astype("Int64")
+
+                if writer is None:
+                    print("Sample output:")
+                    preview_markdown(df)
+                    writer = ChunkWriter(tmp_path, self.format, self._streaming_parquet_options())
+                writer.write(df)
+
+                total_rows += len(df)
+                count += 1
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                discard(tmp_path)
+            raise
+
+        if writer is not None:
+            writer.close()
+            publish(tmp_path, output_path)
+
+        if total_rows == 0:
+            logging.warning("Transformation aborted: empty dataset.")
+            return str(output_path), 0
+
+        print(f"Dataframe shape: ({total_rows}, {3 + len(self.count_columns)})")
+        logging.info(f"Transformed data saved to {output_path} in {count} chunks of up to {self.chunk_rows} rows")
+        return str(output_path), total_rows
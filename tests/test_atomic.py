@@ -0,0 +1,40 @@
+import pytest
+
+from etl_pipeline.atomic import atomic_output, partial_path, publish
+
+def test_atomic_output_publishes_on_success(tmp_path):
+    target = tmp_path / "out.csv"
+    target.write_text("old")
+
+    with atomic_output(target) as tmp_path_:
+        assert tmp_path_ == partial_path(target)
+        with open(tmp_path_, "w") as f:
+            f.write("new")
+        assert target.read_text() == "old"
+
+    assert target.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.csv"]
+
+def test_atomic_output_discards_on_failure(tmp_path):
+    target = tmp_path / "out.csv"
+    target.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(target) as tmp_path_:
+            with open(tmp_path_, "w") as f:
+                f.write("half")
+            raise RuntimeError("boom")
+
+    assert target.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.csv"]
+
+def test_publish_swaps_directories(tmp_path):
+    target = tmp_path / "out.parquet"
+    (target / "id_bucket=0").mkdir(parents=True)
+    new = tmp_path / "new"
+    (new / "id_bucket=1").mkdir(parents=True)
+
+    publish(str(new), str(target))
+
+    assert [p.name for p in target.iterdir()] == ["id_bucket=1"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.parquet"]
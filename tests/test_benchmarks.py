@@ -0,0 +1,45 @@
+import json
+import requests
+from benchmarks.run import compare
+from benchmarks.server import StandInAPI
+from benchmarks.synthetic import make_character, write_jsonl
+from etl_pipeline.extractor import Extractor
+
+def test_synthetic_characters_are_deterministic(tmp_path):
+    assert make_character(7) == make_character(7)
+    path = write_jsonl(tmp_path / "raw.jsonl", 5)
+    rows = [json.loads(line) for line in open(path)]
+    assert [row["id"] for row in rows] == [1000000 + i for i in range(5)]
+
+def test_stand_in_api_envelope():
+    with StandInAPI(rows=5) as api:
+        payload = requests.get(f"{api.base_url}/v1/public/characters", params={"limit": 2, "offset": 4}).json()
+        assert requests.get(f"{api.base_url}/other").status_code == 404
+
+    assert payload["data"]["total"] == 5
+    assert payload["data"]["offset"] == 4
+    assert [row["id"] for row in payload["data"]["results"]] == [1000004]
+
+def test_extractor_against_stand_in_api(tmp_path):
+    config = {
+        "api": {"api_path": "/v1/public/characters", "retries": 3, "timeout": 10, "page_size": 7, "concurrency": 3},
+        "output": {"raw_file": "raw.jsonl"},
+    }
+    with StandInAPI(rows=30) as api:
+        config["api"]["base_url"] = api.base_url
+        path, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert count == 30
+    assert [json.loads(line)["id"] for line in open(path)] == [1000000 + i for i in range(30)]
+
+def test_compare_flags_regressions():
+    baseline = {"scenarios": {"extract": {"rows_per_sec": 1000, "peak_rss_mb": 100}}}
+    results = {"scenarios": {
+        "extract": {"rows_per_sec": 700, "peak_rss_mb": 130},
+        "pipeline": {"rows_per_sec": 1, "peak_rss_mb": 1},
+    }}
+
+    assert compare(results, baseline, threshold=0.4) == []
+    regressions = compare(results, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("extract: 700")
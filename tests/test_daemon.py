@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+import pytest
+import yaml
+
+from etl_pipeline import daemon as daemon_module
+from etl_pipeline.daemon import CronSchedule, Daemon
+
+
+def base_config(**daemon):
+    return {
+        "api": {"base_url": "https://gateway.marvel.com", "api_path": "/v1/public/characters", "page_size": 2},
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "final", "format": "csv"},
+        "daemon": {"interval_seconds": 0.01, "history_size": 10, **daemon},
+    }
+
+def write_config(path, config, bump=0):
+    path.write_text(yaml.safe_dump(config))
+    # explicit mtimes, file systems with coarse timestamps would otherwise hide quick rewrites
+    stamp = 1_700_000_000_000_000_000 + bump
+    os.utime(path, ns=(stamp, stamp))
+
+class FakePipeline:
+    def __init__(self, on_run=None, fail=False):
+        self.on_run = on_run
+        self.fail = fail
+
+    def run(self):
+        if self.on_run:
+            self.on_run()
+        if self.fail:
+            return None
+        return {"raw": ("raw.jsonl", 4), "transformed": ("final.csv", 4), "timings": {"total": 0.1}}
+
+@pytest.fixture
+def built(monkeypatch):
+    """Replace build_pipelines, recording the arguments of every build."""
+    calls = []
+    pipelines = {"characters": FakePipeline()}
+
+    def fake_build(config, **kwargs):
+        calls.append({"config": config, **kwargs})
+        return pipelines
+
+    monkeypatch.setattr(daemon_module, "build_pipelines", fake_build)
+    return calls, pipelines
+
+def test_cron_next_after():
+    assert CronSchedule("*/15 * * * *").next_after(datetime(2024, 5, 3, 10, 7, 30)) == datetime(2024, 5, 3, 10, 15)
+    assert CronSchedule("*/15 * * * *").next_after(datetime(2024, 5, 3, 10, 15)) == datetime(2024, 5, 3, 10, 30)
+    # weekdays at 9:00, asked on a Friday after 9 -> Monday
+    assert CronSchedule("0 9 * * 1-5").next_after(datetime(2024, 5, 3, 10, 0)) == datetime(2024, 5, 6, 9, 0)
+    assert CronSchedule("30 2 1 1,7 *").next_after(datetime(2024, 5, 3)) == datetime(2024, 7, 1, 2, 30)
+    assert CronSchedule("0 0 * * 7").next_after(datetime(2024, 5, 3)) == datetime(2024, 5, 5, 0, 0)
+
+def test_cron_day_fields_match_either():
+    schedule = CronSchedule("0 0 13 * 5")  # the 13th or any Friday
+    assert schedule.next_after(datetime(2024, 5, 4)) == datetime(2024, 5, 10)
+    assert schedule.next_after(datetime(2024, 5, 10)) == datetime(2024, 5, 13)
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "0 0 31 2 *"])
+def test_cron_rejects_invalid(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+def test_runs_on_interval_reusing_session(tmp_path, built):
+    calls, _ = built
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config())
+
+    history = Daemon(config_path, data_dir=tmp_path).run_forever(max_runs=3)
+
+    assert [entry["run"] for entry in history] == [1, 2, 3]
+    assert all(entry["success"] and not entry["interrupted"] for entry in history)
+    assert history[0]["resources"]["characters"] == {
+        "success": True, "raw_rows": 4, "transformed_rows": 4, "timings": {"total": 0.1}
+    }
+    assert len({id(call["session"]) for call in calls}) == 1
+    # runs never overlap: each one starts after the previous finished
+    for previous, entry in zip(history, history[1:]):
+        assert entry["started_at"] >= previous["finished_at"]
+
+def test_history_is_bounded_and_dumped(tmp_path, built):
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config(history_size=2, history_file="history.json"))
+
+    daemon = Daemon(config_path, data_dir=tmp_path)
+    daemon.run_forever(max_runs=3)
+
+    assert [entry["run"] for entry in daemon.history] == [2, 3]
+    path = daemon.dump_history()
+    assert path == tmp_path / "history.json"
+    assert [entry["run"] for entry in json.loads(path.read_text())["runs"]] == [2, 3]
+
+def test_reloads_changed_config(tmp_path, built, caplog):
+    calls, pipelines = built
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config())
+    updated = base_config()
+    updated["api"]["page_size"] = 50
+
+    edits = iter([
+        lambda: write_config(config_path, updated, bump=1),
+        lambda: config_path.write_text("api: [unclosed") or os.utime(config_path, ns=(2, 2)),
+        lambda: None,
+    ])
+    pipelines["characters"] = FakePipeline(on_run=lambda: next(edits)())
+
+    caplog.set_level(logging.INFO)
+    Daemon(config_path, data_dir=tmp_path).run_forever(max_runs=3)
+
+    assert [call["config"]["api"]["page_size"] for call in calls] == [2, 50, 50]
+    assert "changed, reloaded" in caplog.text
+    assert "not reloaded, keeping the running one" in caplog.text
+
+def test_invalid_initial_config_raises(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config(interval_seconds=0))
+    with pytest.raises(ValueError):
+        Daemon(config_path, data_dir=tmp_path)
+
+def test_stop_ends_after_current_run(tmp_path, built):
+    calls, pipelines = built
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config(interval_seconds=3600))
+    daemon = Daemon(config_path, data_dir=tmp_path)
+    pipelines["characters"] = FakePipeline(on_run=daemon.stop, fail=True)
+
+    history = daemon.run_forever()
+
+    assert len(history) == 1
+    assert history[0]["interrupted"] and not history[0]["success"]
+    assert calls[0]["stop_event"] is daemon.stop_event
+    assert daemon.session is None  # closed on shutdown
+
+def test_next_run_skips_missed_ticks(tmp_path, caplog):
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path, base_config(interval_seconds=10))
+    daemon = Daemon(config_path, data_dir=tmp_path)
+
+    assert daemon.next_run(started=100, now=104) == 110
+    assert daemon.next_run(started=100, now=125) == 130
+    assert "skipping 2 tick(s)" in caplog.text
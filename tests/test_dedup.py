@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from etl_pipeline.dedup import BloomFilter, IdSet, build_id_filter, row_id
+
+def test_id_set_is_exact_across_merges():
+    ids = random.Random(7).sample(range(-10**12, 10**12), 30000)
+    seen = IdSet()
+
+    assert all(seen.add(value) for value in ids)
+    assert not any(seen.add(value) for value in ids[::7])
+    assert len(seen) == 30000
+    assert all(value in seen for value in ids)
+    absent = set(random.Random(8).sample(range(-10**12, 10**12), 1000)) - set(ids)
+    assert not any(value in seen for value in absent)
+    assert seen.nbytes < 30000 * 16
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for value in range(10000):
+        bloom.add(value)
+
+    assert all(value in bloom for value in range(10000))
+    false_positives = sum(value in bloom for value in range(10**6, 10**6 + 10000))
+    assert false_positives < 300  # about 1% expected
+    assert bloom.nbytes < 10000 * 2
+
+def test_bloom_filter_rejects_invalid_sizing():
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=0)
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, error_rate=1)
+
+def test_build_id_filter():
+    assert build_id_filter(None) is None
+    assert build_id_filter({"enabled": False}) is None
+    assert isinstance(build_id_filter({"enabled": True}), IdSet)
+    assert isinstance(build_id_filter({"enabled": True, "method": "bloom", "expected_rows": 100}), BloomFilter)
+    with pytest.raises(ValueError):
+        build_id_filter({"enabled": True, "method": "hash"})
+
+def test_row_id():
+    assert row_id({"id": 5}) == 5
+    assert row_id({"id": "5"}) is None
+    assert row_id({"id": True}) is None
+    assert row_id({"id": 2**70}) is None
+    assert row_id({"name": "x"}) is None
+    assert row_id(None) is None
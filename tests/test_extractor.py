@@ -2,7 +2,9 @@ import pytest
 import json
 import requests
 from unittest.mock import Mock
-from etl_pipeline.extractor import Extractor
+import threading
+from etl_pipeline.extractor import ExtractionInterrupted, Extractor
+from etl_pipeline.throttling import CircuitOpenError, TokenBucket
 
 @pytest.fixture
 def config():
@@ -32,7 +34,7 @@ def marvel_character_data():
 def test_extractor_success(monkeypatch, tmp_path, config, marvel_character_data):
     call_count = 0
     
-    def mock_get(url, params=None, timeout=None):
+    def mock_get(session, url, params=None, timeout=None):
         nonlocal call_count
         response = Mock()
         
@@ -49,7 +51,7 @@ def test_extractor_success(monkeypatch, tmp_path, config, marvel_character_data)
         call_count += 1
         return response
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     extractor = Extractor(config, data_dir=tmp_path)
     path, count = extractor.run()
     
@@ -64,13 +66,13 @@ def test_extractor_success(monkeypatch, tmp_path, config, marvel_character_data)
         assert data["name"] == "3-D Man"
 
 def test_extractor_empty_response(monkeypatch, tmp_path, config):
-    def mock_get(url, params=None, timeout=None):
+    def mock_get(session, url, params=None, timeout=None):
         response = Mock()
         response.json.return_value = {"data": {"results": []}}
         response.raise_for_status.return_value = None
         return response
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     extractor = Extractor(config, data_dir=tmp_path)
     path, count = extractor.run()
     
@@ -78,34 +80,145 @@ def test_extractor_empty_response(monkeypatch, tmp_path, config):
     assert tmp_path.joinpath("raw.jsonl").exists()
 
 def test_extractor_malformed_response(monkeypatch, tmp_path, config):
-    def mock_get(url, params=None, timeout=None):
+    def mock_get(session, url, params=None, timeout=None):
         response = Mock()
         response.json.return_value = {"invalid": "structure"}
         response.raise_for_status.return_value = None
         return response
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     extractor = Extractor(config, data_dir=tmp_path)
     path, count = extractor.run()
     
     assert count == 0
 
+def http_error(status, headers=None):
+    response = Mock(status_code=status, headers=headers or {})
+    return requests.exceptions.HTTPError(f"{status} Error", response=response)
+
 def test_extractor_http_error(monkeypatch, tmp_path, config):
-    def mock_get(url, params=None, timeout=None):
+    calls = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        calls.append(params["offset"])
         response = Mock()
-        response.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Not Found")
+        response.raise_for_status.side_effect = http_error(401)
         return response
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     extractor = Extractor(config, data_dir=tmp_path)
-    
-    with pytest.raises(AttributeError):  # max_retries not defined in original code
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        extractor.run()
+    assert calls == [0]  # auth errors are fatal, never retried
+
+def test_extractor_retries_transient_errors_with_jittered_backoff(monkeypatch, tmp_path, config, marvel_character_data):
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    config["api"]["backoff_base"] = 0.5
+    config["api"]["backoff_cap"] = 1.5
+    errors = [requests.exceptions.ConnectionError("reset"), http_error(503), requests.exceptions.ReadTimeout("slow")]
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        if errors:
+            response.raise_for_status.side_effect = errors.pop(0)
+            return response
+        rows = [marvel_character_data] if params["offset"] == 0 else []
+        response.json.return_value = {"data": {"results": rows}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path)
+    _, count = extractor.run()
+
+    assert count == 1
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= bound for delay, bound in zip(sleeps, [1.0, 1.5, 1.5]))
+    assert extractor.metrics.counters["http_retries"] == 3
+
+def test_extractor_gives_up_after_configured_retries(monkeypatch, tmp_path, config):
+    monkeypatch.setattr("time.sleep", lambda s: None)
+    calls = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        calls.append(params["offset"])
+        response = Mock()
+        response.raise_for_status.side_effect = http_error(500)
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        Extractor(config, data_dir=tmp_path).run()
+    assert len(calls) == 4  # first attempt + api.retries
+
+def test_extractor_fails_fast_on_invalid_base_url(monkeypatch, tmp_path, config):
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    config["api"]["base_url"] = "gateway.marvel.com"
+
+    extractor = Extractor(config, data_dir=tmp_path)
+    with pytest.raises(requests.exceptions.MissingSchema):
         extractor.run()
+    assert sleeps == []
+    assert "http_retries" not in extractor.metrics.counters
+
+def test_extractor_honors_retry_after(monkeypatch, tmp_path, config, marvel_character_data):
+    backoffs = []
+    monkeypatch.setattr("time.sleep", backoffs.append)
+    now = [0.0]
+    pauses = []
+
+    def fake_sleep(seconds):
+        pauses.append(seconds)
+        now[0] += seconds
+
+    limiter = TokenBucket(rate=100, min_rate=10, clock=lambda: now[0], sleep=fake_sleep)
+    throttled = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        if not throttled:
+            throttled.append(True)
+            response.raise_for_status.side_effect = http_error(429, {"Retry-After": "7"})
+            return response
+        rows = [marvel_character_data] if params["offset"] == 0 else []
+        response.json.return_value = {"data": {"results": rows}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path, limiter=limiter)
+    _, count = extractor.run()
+
+    assert count == 1
+    assert backoffs == [0]  # no extra backoff, the limiter pause replaces it
+    assert pauses == [7]
+    assert extractor.metrics.counters["http_throttled"] == 1
+    assert extractor.limiter.rate > 50  # halved on the 429, recovering on the successes
+
+def test_extractor_circuit_breaker_stops_requests(monkeypatch, tmp_path, config):
+    monkeypatch.setattr("time.sleep", lambda s: None)
+    config["api"]["retries"] = 10
+    config["api"]["circuit_breaker"] = {"failure_threshold": 3, "reset_seconds": 60}
+    calls = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        calls.append(params["offset"])
+        raise requests.exceptions.ConnectionError("refused")
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+
+    with pytest.raises(CircuitOpenError):
+        Extractor(config, data_dir=tmp_path).run()
+    assert len(calls) == 3
 
 def test_extractor_pagination(monkeypatch, tmp_path, config, marvel_character_data):
     call_count = 0
     
-    def mock_get(url, params=None, timeout=None):
+    def mock_get(session, url, params=None, timeout=None):
         nonlocal call_count
         response = Mock()
         
@@ -124,9 +237,507 @@ def test_extractor_pagination(monkeypatch, tmp_path, config, marvel_character_da
         call_count += 1
         return response
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     extractor = Extractor(config, data_dir=tmp_path)
     path, count = extractor.run()
     
     assert count == 3
     assert call_count == 3
+
+def test_extractor_concurrent_pages_in_offset_order(monkeypatch, tmp_path, config, marvel_character_data):
+    config["api"]["concurrency"] = 4
+    total = 9
+    requested = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        offset = params["offset"]
+        requested.append(offset)
+        response = Mock()
+        ids = range(offset, min(offset + params["limit"], total))
+        response.json.return_value = {
+            "data": {
+                "total": total,
+                "offset": offset,
+                "results": [{**marvel_character_data, "id": i} for i in ids],
+            }
+        }
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    assert count == total
+    assert sorted(requested) == [0, 2, 4, 6, 8]  # no trailing empty-page probe
+
+    with open(path, 'r') as f:
+        ids = [json.loads(line)["id"] for line in f]
+    assert ids == list(range(total))
+
+def test_extractor_concurrent_retries_single_page(monkeypatch, tmp_path, config, marvel_character_data):
+    config["api"]["concurrency"] = 2
+    monkeypatch.setattr("time.sleep", lambda s: None)
+    requested = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        offset = params["offset"]
+        requested.append(offset)
+        response = Mock()
+        if offset == 2 and requested.count(2) == 1:
+            response.raise_for_status.side_effect = requests.exceptions.ConnectionError("reset")
+            return response
+        response.json.return_value = {
+            "data": {"total": 4, "results": [{**marvel_character_data, "id": offset}] * 2}
+        }
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    assert count == 4
+    assert requested.count(0) == 1
+    assert requested.count(2) == 2
+
+def test_extractor_uses_configured_timeouts(monkeypatch, tmp_path, config):
+    config["api"]["connect_timeout"] = 3
+    seen = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        seen.append(timeout)
+        response = Mock()
+        response.json.return_value = {"data": {"results": []}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path)
+    extractor.run()
+
+    assert seen == [(3, 10)]
+
+def test_extractor_incremental_watermark(monkeypatch, tmp_path, config, marvel_character_data):
+    config["incremental"] = {"enabled": True, "state_file": "state.json"}
+    sent = []
+    pages = [
+        [
+            {**marvel_character_data, "modified": "2014-04-29T14:18:17-0400"},
+            {**marvel_character_data, "id": 1011335, "modified": "2020-01-02T10:00:00-0500"},
+        ],
+        [{**marvel_character_data, "id": 1011336, "modified": "-0001-11-30T00:00:00-0500"}],
+        [],
+    ]
+
+    def mock_get(session, url, params=None, timeout=None):
+        sent.append(dict(params))
+        response = Mock()
+        response.json.return_value = {"data": {"results": pages[params["offset"] // params["limit"]]}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+
+    # First run has no watermark and crawls everything
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+    assert count == 3
+    assert "modifiedSince" not in sent[0]
+    assert not tmp_path.joinpath("state.json").exists()  # nothing persisted until committed
+
+    extractor.commit_watermark()
+    state = json.loads(tmp_path.joinpath("state.json").read_text())
+    assert state["watermarks"]["/v1/public/characters"] == "2020-01-02T10:00:00-0500"
+
+    # Next run asks only for rows modified since the watermark
+    sent.clear()
+    Extractor(config, data_dir=tmp_path).run()
+    assert all(p["modifiedSince"] == "2020-01-02T10:00:00-0500" for p in sent)
+
+def test_extractor_arrow_raw_format(monkeypatch, tmp_path, config, marvel_character_data):
+    pytest.importorskip("pyarrow")
+    from etl_pipeline.raw_io import detect_format, read_frame
+    config["output"]["raw_format"] = "arrow"
+    config["output"]["raw_compression"] = "zstd"
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        results = [marvel_character_data, {**marvel_character_data, "id": 1011335}] if params["offset"] == 0 else []
+        response.json.return_value = {"data": {"results": results}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert count == 2
+    assert detect_format(path) == ("arrow", None)
+    assert read_frame(path)["id"].tolist() == [1011334, 1011335]
+
+def test_extractor_cache_hit_revalidate_and_miss(monkeypatch, tmp_path, config, marvel_character_data, caplog):
+    import logging
+    caplog.set_level(logging.INFO)
+    config["cache"] = {"enabled": True, "ttl_seconds": 60}
+    requests_seen = []
+
+    def mock_get(session, url, params=None, timeout=None, headers=None):
+        requests_seen.append(headers or {})
+        response = Mock()
+        results = [marvel_character_data] if params["offset"] == 0 else []
+        body = json.dumps({"etag": f"etag-{params['offset']}", "data": {"results": results}}).encode()
+        if (headers or {}).get("If-None-Match") == f"etag-{params['offset']}":
+            response.status_code = 304
+            return response
+        response.status_code = 200
+        response.headers = {}
+        response.content = body
+        response.json.return_value = json.loads(body)
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+
+    # Cold cache: both pages are misses
+    assert Extractor(config, data_dir=tmp_path).run()[1] == 1
+    assert requests_seen == [{}, {}]
+
+    # Fresh entries are served without any request
+    requests_seen.clear()
+    assert Extractor(config, data_dir=tmp_path).run()[1] == 1
+    assert requests_seen == []
+
+    # Stale entries are revalidated with If-None-Match and reused on 304
+    config["cache"]["ttl_seconds"] = 0
+    extractor = Extractor(config, data_dir=tmp_path)
+    assert extractor.run()[1] == 1
+    assert requests_seen == [{"If-None-Match": "etag-0"}, {"If-None-Match": "etag-2"}]
+    assert extractor.cache.stats["revalidated"] == 2
+    assert extractor.cache.stats["bytes_saved"] > 0
+    assert "HTTP cache: 0 hits, 2 revalidated, 0 misses" in caplog.text
+
+def test_extractors_share_request_budget(monkeypatch, tmp_path, config, marvel_character_data):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    config["api"]["concurrency"] = 4
+    budget = threading.BoundedSemaphore(3)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def mock_get(session, url, params=None, timeout=None):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        response = Mock()
+        response.json.return_value = {"data": {"total": 8, "results": [{**marvel_character_data, "id": params["offset"]}] * 2}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    comics = {**config, "api": {**config["api"], "api_path": "/v1/public/comics"}, "output": {**config["output"], "raw_file": "comics.jsonl"}}
+    extractors = [Extractor(c, data_dir=tmp_path, budget=budget) for c in (config, comics)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda e: e.run(), extractors))
+
+    assert [count for _, count in results] == [8, 8]
+    assert peak <= 3
+
+def test_extractor_resumes_from_checkpoint(monkeypatch, tmp_path, config, marvel_character_data):
+    requested = []
+    crash_at = [4]
+
+    def mock_get(session, url, params=None, timeout=None):
+        offset = params["offset"]
+        requested.append(offset)
+        if offset == crash_at[0]:
+            raise RuntimeError("killed")
+        response = Mock()
+        ids = range(offset, min(offset + 2, 7))
+        response.json.return_value = {"data": {"results": [{**marvel_character_data, "id": i} for i in ids]}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    (tmp_path / "raw.jsonl").write_text("previous run\n")
+
+    with pytest.raises(RuntimeError):
+        Extractor(config, data_dir=tmp_path).run()
+
+    # the last published raw file is untouched, the partial one is kept with its checkpoint
+    assert (tmp_path / "raw.jsonl").read_text() == "previous run\n"
+    checkpoint = json.loads((tmp_path / "raw.jsonl.checkpoint.json").read_text())
+    assert (checkpoint["offset"], checkpoint["rows"]) == (4, 4)
+    # simulate a torn write after the checkpoint
+    with open(tmp_path / "raw.jsonl.partial", "a") as f:
+        f.write('{"id": 99, "na')
+
+    crash_at[0] = None
+    requested.clear()
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert requested == [4, 6, 8]
+    assert count == 7
+    with open(path) as f:
+        assert [json.loads(line)["id"] for line in f] == list(range(7))
+    assert not (tmp_path / "raw.jsonl.partial").exists()
+    assert not (tmp_path / "raw.jsonl.checkpoint.json").exists()
+
+def test_extractor_stops_after_current_page(monkeypatch, tmp_path, config, marvel_character_data):
+    stop_event = threading.Event()
+    requested = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        offset = params["offset"]
+        requested.append(offset)
+        if offset == 2:
+            stop_event.set()  # e.g. SIGTERM while this page is in flight
+        response = Mock()
+        ids = range(offset, min(offset + 2, 7))
+        response.json.return_value = {"data": {"results": [{**marvel_character_data, "id": i} for i in ids]}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+
+    with pytest.raises(ExtractionInterrupted):
+        Extractor(config, data_dir=tmp_path, stop_event=stop_event).run()
+
+    # the page in flight is written and checkpointed, nothing after it is requested
+    assert requested == [0, 2]
+    checkpoint = json.loads((tmp_path / "raw.jsonl.checkpoint.json").read_text())
+    assert (checkpoint["offset"], checkpoint["rows"]) == (4, 4)
+
+    path, count = Extractor(config, data_dir=tmp_path).run()
+    assert count == 7
+
+def test_extractor_ignores_foreign_checkpoint(monkeypatch, tmp_path, config, marvel_character_data):
+    requested = []
+
+    def mock_get(session, url, params=None, timeout=None):
+        requested.append(params["offset"])
+        response = Mock()
+        rows = [marvel_character_data] if params["offset"] == 0 else []
+        response.json.return_value = {"data": {"results": rows}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    (tmp_path / "raw.jsonl.partial").write_text("x" * 10)
+    (tmp_path / "raw.jsonl.checkpoint.json").write_text(json.dumps(
+        {"api_path": "/v1/public/comics", "limit": 2, "offset": 6, "rows": 6, "bytes": 10, "since": None, "watermark": None}
+    ))
+
+    _, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert requested == [0, 2]
+    assert count == 1
+
+def test_extractor_discards_partial_file_without_checkpoint(monkeypatch, tmp_path, config, marvel_character_data):
+    def mock_get(session, url, params=None, timeout=None):
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    config["output"]["raw_compression"] = "gzip"
+
+    with pytest.raises(RuntimeError):
+        Extractor(config, data_dir=tmp_path).run()
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize("cache_enabled", [False, True])
+def test_extractor_passthrough_writes_rows_as_received(monkeypatch, tmp_path, config, cache_enabled):
+    config["output"]["passthrough"] = True
+    config["output"]["json_codec"] = "json"
+    config["cache"] = {"enabled": cache_enabled}
+    config["incremental"] = {"enabled": True}
+    pages = {
+        0: b'{"etag":"e0","data":{"total":3,"results":[{"id":1,"name":"A","modified":"2014-01-01T00:00:00-0400"},\n'
+           b'  {"id":2,"name":"B","modified":"2015-01-01T00:00:00-0400"}]}}',
+        2: b'{"etag":"e2","data":{"total":3,"results":[{"id": 3, "name": "C\\u00e9"}]}}',
+        4: b'{"etag":"e4","data":{"total":3,"results":[]}}',
+    }
+
+    def mock_get(session, url, params=None, timeout=None, headers=None):
+        response = Mock(status_code=200, headers={}, content=pages[params["offset"]])
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    assert count == 3
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == [
+            '{"id":1,"name":"A","modified":"2014-01-01T00:00:00-0400"}',
+            '{"id":2,"name":"B","modified":"2015-01-01T00:00:00-0400"}',
+            '{"id": 3, "name": "C\\u00e9"}',
+        ]
+    assert extractor.watermark == "2015-01-01T00:00:00-0400"
+
+class ChangingCollection:
+    """Stand-in API over a list of ids, with `changes` applied just before the page at a given offset is served."""
+
+    def __init__(self, ids, changes=None, crash_at=None):
+        self.ids = list(ids)
+        self.changes = dict(changes or {})
+        self.crash_at = crash_at
+        self.requested = []
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        offset, limit = params["offset"], params["limit"]
+        self.requested.append(offset)
+        if offset == self.crash_at:
+            self.crash_at = None
+            raise RuntimeError("killed")
+        change = self.changes.pop(offset, None)
+        if change:
+            change(self.ids)
+        body = json.dumps({"data": {"total": len(self.ids), "results": [
+            {"id": i, "name": f"Hero {i}"} for i in self.ids[offset:offset + limit]
+        ]}})
+        response = Mock(status_code=200, headers={}, content=body.encode())
+        response.json.return_value = json.loads(body)
+        response.raise_for_status.return_value = None
+        return response
+
+def prepend(*ids):
+    def change(collection):
+        collection[:0] = ids
+    return change
+
+def append(*ids):
+    def change(collection):
+        collection.extend(ids)
+    return change
+
+def raw_ids(path):
+    with open(path) as f:
+        return [json.loads(line)["id"] for line in f]
+
+def test_extractor_drops_duplicate_ids(monkeypatch, tmp_path, config):
+    config["dedup"] = {"enabled": True, "reconcile": False}
+    # two rows inserted at the front before the second page: rows 0-1 come back on it
+    api = ChangingCollection(range(6), changes={2: prepend(101, 100)})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    assert raw_ids(path) == [0, 1, 2, 3, 4, 5]
+    assert count == 6
+    assert extractor.metrics.to_dict()["counters"]["duplicates_dropped"] == 2
+
+def test_extractor_without_dedup_keeps_duplicates(monkeypatch, tmp_path, config):
+    api = ChangingCollection(range(4), changes={2: prepend(100)})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert raw_ids(path) == [0, 1, 1, 2, 3]
+
+def test_extractor_reconciles_rows_skipped_by_a_shift(monkeypatch, tmp_path, config, caplog):
+    config["dedup"] = {"enabled": True}
+    # row 0 deleted before the second page: row 2 moves to offset 1 and the plain crawl never sees it
+    api = ChangingCollection(range(7), changes={2: lambda ids: ids.remove(0)})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    assert sorted(raw_ids(path)) == [0, 1, 2, 3, 4, 5, 6]
+    assert count == 7
+    assert extractor.shifts == [[2, 7, 6]]
+    # only the window around the shift is read again, not the whole collection
+    assert api.requested == [0, 2, 4, 6, 0, 2]
+    assert extractor.metrics.to_dict()["counters"]["reconciled_rows"] == 1
+
+def test_extractor_bloom_filter_keeps_false_positives(monkeypatch, tmp_path, config, caplog):
+    import logging
+
+    caplog.set_level(logging.INFO)
+    config["output"]["passthrough"] = True
+    # a filter far too small for the collection: most new ids look already seen and are verified at the end
+    config["dedup"] = {"enabled": True, "method": "bloom", "expected_rows": 2, "error_rate": 0.5, "reconcile": False}
+    api = ChangingCollection(range(40), changes={10: prepend(100)})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    extractor = Extractor(config, data_dir=tmp_path)
+    path, count = extractor.run()
+
+    ids = raw_ids(path)
+    assert len(ids) == len(set(ids)) == count
+    assert set(ids) == set(range(40))  # 100 was inserted before offset 10 was read, row 9 repeated and dropped
+    assert "false positives kept" in caplog.text
+
+@pytest.mark.parametrize("method", ["exact", "bloom"])
+def test_extractor_dedup_survives_resume(monkeypatch, tmp_path, config, method):
+    config["dedup"] = {"enabled": True, "reconcile": False, "method": method, "expected_rows": 2, "error_rate": 0.5}
+    api = ChangingCollection(range(6), changes={4: prepend(100)}, crash_at=4)
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    with pytest.raises(RuntimeError):
+        Extractor(config, data_dir=tmp_path).run()
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    # after the resume row 3 comes back on the page at offset 4 and is recognised from the partial file;
+    # rows held back by the bloom filter are written at the end
+    ids = raw_ids(path)
+    assert sorted(ids) == [0, 1, 2, 3, 4, 5]
+    assert count == 6
+
+def test_extractor_concurrent_fetches_rows_added_during_crawl(monkeypatch, tmp_path, config):
+    config["api"]["concurrency"] = 4
+    # the first page reports 100 rows, 10 more are added before the page at offset 4 is served
+    api = ChangingCollection(range(100), changes={4: append(*range(100, 110))})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    assert raw_ids(path) == list(range(110))
+    assert count == 110
+    assert max(api.requested) == 110  # the empty page past the new total ends the crawl
+
+def test_extractor_dedup_exact_when_collection_grows_during_concurrent_crawl(monkeypatch, tmp_path, config):
+    config["api"]["concurrency"] = 4
+    config["dedup"] = {"enabled": True}
+    # 10 rows inserted at the front: every later page repeats earlier rows and the last 10 move past the first total
+    api = ChangingCollection(range(100), changes={4: prepend(*range(1000, 1010))})
+    monkeypatch.setattr("requests.Session.get", api.get)
+
+    path, count = Extractor(config, data_dir=tmp_path).run()
+
+    ids = raw_ids(path)
+    assert sorted(ids) == [*range(100), *range(1000, 1010)]
+    assert count == 110
+
+def test_extractor_concurrent_prefetch_is_bounded(monkeypatch, tmp_path, config):
+    import threading
+    import time
+
+    config["api"]["concurrency"] = 4
+    api = ChangingCollection(range(400))
+    lock = threading.Lock()
+    ahead = []
+
+    def get(session, url, params=None, timeout=None, headers=None):
+        with lock:
+            return api.get(url, params=params, timeout=timeout, headers=headers)
+
+    def slow_consumer(rows):
+        time.sleep(0.01)
+        with lock:
+            ahead.append(len(api.requested) - (len(ahead) + 1))
+
+    monkeypatch.setattr("requests.Session.get", get)
+    path, count = Extractor(config, data_dir=tmp_path).run(on_page=slow_consumer)
+
+    assert count == 400
+    # pages requested beyond the ones handed to the consumer: the first page plus 2 per worker at most
+    assert max(ahead) <= 1 + 2 * 4
@@ -0,0 +1,37 @@
+import os
+
+from etl_pipeline.fingerprint import code_version, file_digest, load_result, save_result, stage_fingerprint
+
+def test_file_digest_of_file_and_directory(tmp_path):
+    (tmp_path / "a.txt").write_text("one")
+    digest = file_digest(tmp_path / "a.txt")
+    assert digest == file_digest(tmp_path / "a.txt")
+    (tmp_path / "a.txt").write_text("two")
+    assert file_digest(tmp_path / "a.txt") != digest
+
+    dataset = tmp_path / "out.parquet"
+    (dataset / "id_bucket=0").mkdir(parents=True)
+    (dataset / "id_bucket=0" / "part-0.parquet").write_bytes(b"x")
+    before = file_digest(dataset)
+    (dataset / "id_bucket=0" / "part-0.parquet").rename(dataset / "id_bucket=0" / "part-1.parquet")
+    assert file_digest(dataset) != before
+
+def test_stage_fingerprint_is_order_independent():
+    assert stage_fingerprint({"a": 1, "b": {"x": 2, "y": None}}) == stage_fingerprint({"b": {"y": None, "x": 2}, "a": 1})
+    assert stage_fingerprint({"a": 1}) != stage_fingerprint({"a": 2})
+    assert len(code_version()) == 64
+
+def test_result_roundtrip(tmp_path):
+    output = tmp_path / "out.csv"
+    output.write_text("id\n1\n")
+
+    save_result(output, "abc", (str(output), 1))
+
+    assert load_result(output, "abc") == (str(output), 1)
+    assert load_result(output, "def") is None
+    os.utime(output, ns=(0, 0))
+    assert load_result(output, "abc") is None
+
+def test_result_not_saved_without_output(tmp_path):
+    save_result(tmp_path / "out.csv", "abc", (str(tmp_path / "out.csv"), 0))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,63 @@
+from etl_pipeline.http_cache import ResponseCache, cache_key
+
+def test_cache_key_normalizes_params():
+    a = cache_key("https://api/v1/public/characters", {"offset": 0, "limit": 50, "ts": "1", "apikey": "k", "hash": "h"})
+    b = cache_key("https://api/v1/public/characters", {"limit": "50", "offset": "0", "ts": "2"})
+    assert a == b
+    assert a != cache_key("https://api/v1/public/characters", {"limit": 50, "offset": 50})
+
+def test_cache_store_and_lookup_persists(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=60)
+    cache.store("k", b'{"data": {}}', "etag-1")
+    assert not (tmp_path / "index.json").exists()  # written once per run, by flush()
+    cache.flush()
+
+    reopened = ResponseCache(str(tmp_path), ttl_seconds=60)
+    entry, body = reopened.lookup("k")
+    assert body == b'{"data": {}}'
+    assert entry["etag"] == "etag-1"
+    assert reopened.is_fresh(entry)
+    assert reopened.lookup("missing") == (None, None)
+
+def test_cache_ttl_expiry(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=10)
+    cache.store("k", b"{}", "e")
+    entry, _ = cache.lookup("k")
+
+    monkeypatch.setattr("time.time", lambda: entry["stored_at"] + 11)
+    assert not cache.is_fresh(entry)
+
+def test_cache_lru_eviction_by_size(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("time.time", lambda: next(clock))
+    cache = ResponseCache(str(tmp_path), max_bytes=10)
+
+    cache.store("a", b"1234", None)
+    cache.store("b", b"1234", None)
+    cache.lookup("a")  # a is now more recently used than b
+    cache.store("c", b"1234", None)
+
+    assert cache.lookup("b") == (None, None)
+    assert cache.lookup("a")[1] == b"1234"
+    assert cache.lookup("c")[1] == b"1234"
+    assert cache.stats["evicted"] == 1
+    cache.flush()
+    assert len(list(tmp_path.glob("*.json"))) == 3  # two bodies + index
+
+def test_cache_only_sorts_when_over_budget(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), max_bytes=10)
+
+    def no_sort(*args, **kwargs):
+        raise AssertionError("sorted while under budget")
+
+    monkeypatch.setattr("etl_pipeline.http_cache.sorted", no_sort, raising=False)
+    cache.store("a", b"1234", None)
+    cache.store("a", b"12345", None)  # replaced, not added twice
+    cache.store("b", b"1234", None)
+    assert cache._bytes == 9
+
+    monkeypatch.undo()
+    cache.store("c", b"1234", None)
+    assert cache._bytes == 8 and cache.stats["evicted"] == 1
+    cache.flush()
+    assert ResponseCache(str(tmp_path), max_bytes=10)._bytes == 8
@@ -0,0 +1,54 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from etl_pipeline.http_session import build_session, pool_stats
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.headers_seen.append(dict(self.headers))
+        body = json.dumps({"data": {"results": []}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    httpd.headers_seen = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_session_reuses_connection(server):
+    session = build_session(pool_size=2)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/public/characters"
+
+    for _ in range(5):
+        session.get(url, timeout=(5, 5)).raise_for_status()
+
+    stats = pool_stats(session)
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+def test_session_sends_compression_and_keepalive_headers(server):
+    session = build_session()
+    session.get(f"http://127.0.0.1:{server.server_address[1]}/", timeout=5)
+
+    headers = server.headers_seen[0]
+    assert "gzip" in headers["Accept-Encoding"]
+    assert "deflate" in headers["Accept-Encoding"]
+    assert headers["Connection"] == "keep-alive"
+
+def test_pool_stats_empty_session():
+    assert pool_stats(build_session()) == {"requests": 0, "connections_opened": 0, "connections_reused": 0}
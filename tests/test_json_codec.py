@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from etl_pipeline.json_codec import JsonCodec, JsonRows, get_codec, split_results
+
+ROWS = [{"id": 1, "name": "A-Bomb", "description": "Rick \"Jones\"\n", "comics": {"available": 2}},
+        {"id": 2, "name": "Ægir", "description": "", "urls": [{"type": "detail"}]}]
+
+def test_split_results_keeps_row_text():
+    body = ('{"code": 200, "etag": "e1", "data": {"offset": 0, "results": [ '
+            '{"id":1,"name":"A-Bomb","description":"Rick \\"Jones\\"\\n","comics":{"available":2}} ,\n'
+            '{"id": 2, "name": "\\u00c6gir", "description": "", "urls": [{"type": "detail"}]}\n], "total": 2}}').encode()
+
+    payload = split_results(body, JsonCodec())
+
+    rows = payload["data"]["results"]
+    assert isinstance(rows, JsonRows)
+    assert rows == ROWS
+    assert rows.lines == ['{"id":1,"name":"A-Bomb","description":"Rick \\"Jones\\"\\n","comics":{"available":2}}',
+                          '{"id": 2, "name": "\\u00c6gir", "description": "", "urls": [{"type": "detail"}]}']
+    assert [json.loads(line) for line in rows.lines] == ROWS
+    assert payload["data"]["total"] == 2 and payload["etag"] == "e1"
+
+def test_split_results_reencodes_pretty_printed_rows():
+    body = json.dumps({"data": {"results": ROWS}}, indent=2)
+
+    rows = split_results(body)["data"]["results"]
+
+    assert rows.lines == [json.dumps(row) for row in ROWS]
+
+@pytest.mark.parametrize("payload", [
+    {"results": [{"id": 9}], "data": {"results": ROWS}},  # a results array outside data comes first
+    {"data": {"results": []}},
+    {"data": {"count": 0}},
+    {"code": 409, "status": "Limit greater than 100."},
+])
+def test_split_results_odd_shapes(payload):
+    parsed = split_results(json.dumps(payload).encode())
+    assert parsed == payload
+    results = parsed.get("data", {}).get("results")
+    if results is not None:
+        assert results.lines == [json.dumps(row) for row in results]
+
+def test_split_results_malformed():
+    with pytest.raises(ValueError):
+        split_results(b'{"data": {"results": [{"id": 1}, {"id": ')
+
+def test_get_codec(monkeypatch):
+    import builtins
+
+    assert get_codec("json").name == "json"
+    with pytest.raises(ValueError, match="Unsupported JSON codec"):
+        get_codec("simdjson")
+
+    real_import = builtins.__import__
+
+    def no_orjson(name, *args, **kwargs):
+        if name == "orjson":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_orjson)
+    assert get_codec("auto").name == "json"
+    with pytest.raises(ImportError):
+        get_codec("orjson")
+
+def test_orjson_codec_when_installed():
+    pytest.importorskip("orjson")
+    codec = get_codec("orjson")
+    rows = split_results(json.dumps({"data": {"results": ROWS}}).encode(), codec)["data"]["results"]
+    assert [json.loads(line) for line in rows.lines] == ROWS
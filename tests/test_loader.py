@@ -0,0 +1,97 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from etl_pipeline.loader import Loader
+
+@pytest.fixture
+def config():
+    return {
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "characters", "format": "csv"},
+        "transform": {"nested_fields": {"comics": "available", "series": "available"}},
+        "load": {"enabled": True, "database": "etl.sqlite", "batch_rows": 3},
+    }
+
+def frame(ids, name="C"):
+    return pd.DataFrame({
+        "id": ids,
+        "name": [f"{name}{i}" for i in ids],
+        "description": ["" if i % 2 else f"about {i}" for i in ids],
+        "comics": [float(i) if i != 2 else None for i in ids],
+        "series": [i * 10 for i in ids],
+    })
+
+def query(path, sql):
+    with sqlite3.connect(path) as connection:
+        return connection.execute(sql).fetchall()
+
+def test_loader_csv_upsert(tmp_path, config):
+    output = tmp_path / "characters.csv"
+    frame(range(7)).to_csv(output, index=False)
+
+    path, count = Loader(config, data_dir=tmp_path).run(str(output))
+
+    assert count == 7
+    rows = query(path, "SELECT id, name, description, comics, series FROM characters ORDER BY id")
+    assert rows[2] == (2, "C2", "about 2", None, 20)
+    assert rows[3] == (3, "C3", "", 3, 30)
+    assert query(path, "SELECT typeof(comics) FROM characters WHERE id = 1") == [("integer",)]
+
+    # second load: ids 5, 6 updated, 7, 8 new
+    frame([5, 6, 7, 8], name="New").to_csv(output, index=False)
+    _, count = Loader(config, data_dir=tmp_path).run(str(output))
+
+    assert count == 4
+    assert query(path, "SELECT count(*) FROM characters") == [(9,)]
+    assert query(path, "SELECT name FROM characters WHERE id IN (4, 5, 8) ORDER BY id") == [("C4",), ("New5",), ("New8",)]
+    assert query(path, "SELECT name FROM sqlite_master WHERE type = 'index'") == [("idx_characters_name",)]
+
+@pytest.mark.parametrize("partition_by", [None, "id_bucket"])
+def test_loader_parquet(tmp_path, config, partition_by):
+    pytest.importorskip("pyarrow")
+    from etl_pipeline.parquet_output import parquet_options, write_parquet
+    import pyarrow as pa
+
+    config["output"]["format"] = "parquet"
+    config["output"]["parquet"] = {"partition_by": partition_by, "id_buckets": 3}
+    output = tmp_path / "characters.parquet"
+    write_parquet(pa.Table.from_pandas(frame(range(10)), preserve_index=False), output,
+                  parquet_options(config["output"]["parquet"]))
+
+    path, count = Loader(config, data_dir=tmp_path).run(str(output))
+
+    assert count == 10
+    assert [row[1] for row in query(path, "PRAGMA table_info(characters)")] == ["id", "name", "description", "comics", "series"]
+    assert query(path, "SELECT id, comics FROM characters WHERE id IN (2, 9) ORDER BY id") == [(2, None), (9, 9)]
+
+def test_loader_adds_new_columns(tmp_path, config):
+    output = tmp_path / "characters.csv"
+    frame([1]).drop(columns=["series"]).to_csv(output, index=False)
+    Loader(config, data_dir=tmp_path).run(str(output))
+
+    frame([2]).to_csv(output, index=False)
+    path, _ = Loader(config, data_dir=tmp_path).run(str(output))
+
+    assert query(path, "SELECT id, series FROM characters ORDER BY id") == [(1, None), (2, 20)]
+
+def test_loader_failure_rolls_back(tmp_path, config):
+    output = tmp_path / "characters.csv"
+    frame(range(4)).to_csv(output, index=False)
+    path, _ = Loader(config, data_dir=tmp_path).run(str(output))
+
+    # the short last row makes the upsert fail after the first batch was inserted
+    pd.DataFrame({"id": [10, 11, 12, 13], "name": ["x"] * 4}).to_csv(output, index=False)
+    with open(output, "a") as f:
+        f.write("14\n")
+    with pytest.raises(sqlite3.Error):
+        Loader(config, data_dir=tmp_path).run(str(output))
+
+    assert query(path, "SELECT count(*) FROM characters") == [(4,)]
+    assert query(path, "SELECT name FROM sqlite_master WHERE type = 'index'") == [("idx_characters_name",)]
+
+def test_loader_requires_id(tmp_path, config):
+    output = tmp_path / "characters.csv"
+    pd.DataFrame({"name": ["a"]}).to_csv(output, index=False)
+    with pytest.raises(ValueError, match="no id column"):
+        Loader(config, data_dir=tmp_path).run(str(output))
@@ -0,0 +1,128 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+from etl_pipeline.main import CONFIG_PATH, DATA_DIR, main, parse_args
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    config = {
+        "api": {"base_url": "https://gateway.marvel.com", "api_path": "/v1/public/characters", "retries": 1,
+                "timeout": 10, "page_size": 2},
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "final", "format": "csv"},
+        "cache": {"enabled": False},
+    }
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return path
+
+def test_parse_args_defaults_to_run():
+    args = parse_args([])
+    assert args.command == "run"
+    assert (args.config, args.data_dir) == (CONFIG_PATH, DATA_DIR)
+
+def test_parse_args_config_before_or_after_command():
+    assert parse_args(["--config", "a.yaml", "extract"]).config == Path("a.yaml")
+    assert parse_args(["extract", "--config", "b.yaml"]).config == Path("b.yaml")
+    args = parse_args(["--config", "c.yaml", "--force"])
+    assert (args.command, args.config, args.force) == ("run", Path("c.yaml"), True)
+
+EXTRACT_SCRIPT = """
+import json, sys
+from unittest.mock import Mock
+import requests
+
+def fake_get(session, url, params=None, timeout=None, **kwargs):
+    response = Mock()
+    rows = [{"id": 1, "name": "3-D Man"}] if params["offset"] == 0 else []
+    response.json.return_value = {"data": {"total": 1, "results": rows}}
+    response.content = json.dumps(response.json.return_value).encode()
+    response.raise_for_status.return_value = None
+    return response
+
+requests.Session.get = fake_get
+from etl_pipeline.main import main
+path, count = main(sys.argv[1:])
+print(json.dumps({"count": count, "heavy": sorted(m for m in ("pandas", "pyarrow", "numpy") if m in sys.modules)}))
+"""
+
+def test_extract_does_not_import_pandas(config_path, tmp_path):
+    completed = subprocess.run(
+        [sys.executable, "-c", EXTRACT_SCRIPT, "--config", str(config_path), "--data-dir", str(tmp_path), "extract"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert report == {"count": 1, "heavy": []}
+    assert (tmp_path / "raw.jsonl").exists()
+
+def test_help_does_not_import_stages():
+    completed = subprocess.run(
+        [sys.executable, "-c", "import sys; from etl_pipeline.main import parse_args; parse_args(['extract']); "
+                               "print(sorted(m for m in sys.modules if m.startswith(('pandas', 'requests', 'etl_pipeline.'))))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    assert completed.stdout.strip() == "['etl_pipeline.main', 'etl_pipeline.scheduler']"
+
+def test_transform_command_uses_existing_raw_file(config_path, tmp_path):
+    (tmp_path / "raw.jsonl").write_text(json.dumps({"id": 1, "name": "3-D Man", "description": "", "comics": {"available": 2}}) + "\n")
+
+    path, count = main(["--config", str(config_path), "--data-dir", str(tmp_path), "transform"])
+
+    assert count == 1
+    assert Path(path) == tmp_path / "final.csv"
+
+def test_inspect_reports_files(config_path, tmp_path, capsys):
+    (tmp_path / "raw.jsonl").write_text("{}\n")
+    (tmp_path / "raw.jsonl.checkpoint.json").write_text(json.dumps({"offset": 4, "rows": 4}))
+
+    report = main(["inspect", "--config", str(config_path), "--data-dir", str(tmp_path)])
+
+    characters = report["characters"]
+    assert characters["raw"]["exists"] and characters["raw"]["format"] == "jsonl"
+    assert characters["checkpoint"] == {"offset": 4, "rows": 4}
+    assert characters["transformed"] == {"path": str(tmp_path / "final.csv"), "exists": False}
+    assert json.loads(capsys.readouterr().out) == json.loads(json.dumps(report))
+
+def test_query_command_prints_rows(config_path, tmp_path, capsys):
+    rows = [{"id": i, "name": f"Hero {i}", "description": "", "comics": {"available": i * 3 % 7}} for i in range(1, 6)]
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+    main(["--config", str(config_path), "--data-dir", str(tmp_path), "transform"])
+    capsys.readouterr()
+
+    top = main(["query", "--top", "comics", "-n", "2", "--config", str(config_path), "--data-dir", str(tmp_path)])
+    assert [row["id"] for row in top] == [2, 4]
+    assert json.loads(capsys.readouterr().out) == top
+    assert main(["query", "--id", "3", "--config", str(config_path), "--data-dir", str(tmp_path)])["comics"] == 2
+
+def test_split_extract_transform_advances_incremental_watermark(config_path, tmp_path, monkeypatch):
+    from unittest.mock import Mock
+
+    config = yaml.safe_load(config_path.read_text())
+    config["incremental"] = {"enabled": True, "state_file": "state.json"}
+    config_path.write_text(yaml.safe_dump(config))
+    rows = [{"id": 1, "name": "3-D Man", "description": "", "modified": "2020-01-02T10:00:00-0500"}]
+
+    def fake_get(session, url, params=None, timeout=None, **kwargs):
+        response = Mock()
+        response.json.return_value = {"data": {"total": 1, "results": rows if params["offset"] == 0 else []}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    argv = ["--config", str(config_path), "--data-dir", str(tmp_path)]
+    state_path = tmp_path / "state.json"
+
+    main([*argv, "extract"])
+    assert not state_path.exists()  # nothing advances before the delta is transformed
+    assert (tmp_path / "raw.jsonl.watermark.json").exists()
+
+    main([*argv, "transform"])
+    assert json.loads(state_path.read_text())["watermarks"] == {"/v1/public/characters": "2020-01-02T10:00:00-0500"}
+    assert not (tmp_path / "raw.jsonl.watermark.json").exists()
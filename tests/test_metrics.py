@@ -0,0 +1,63 @@
+import json
+from etl_pipeline.metrics import MetricsCollector
+
+def test_metrics_stage_throughput_and_bytes():
+    metrics = MetricsCollector()
+    metrics.record_stage("extract", 2.0, 100)
+    metrics.add_bytes("extract", read=10, written=4)
+    metrics.add_bytes("extract", read=5)
+
+    stage = metrics.to_dict()["stages"]["extract"]
+    assert stage["rows_per_sec"] == 50
+    assert stage["bytes_read"] == 15
+    assert stage["bytes_written"] == 4
+
+def test_metrics_latency_histogram_is_cumulative():
+    metrics = MetricsCollector()
+    for seconds in (0.01, 0.2, 0.3, 30):
+        metrics.observe_request(seconds)
+    metrics.increment("http_retries", 2)
+
+    http = metrics.to_dict()["http"]
+    assert http["requests"] == 4
+    assert http["retries"] == 2
+    assert http["latency_buckets"]["0.05"] == 1
+    assert http["latency_buckets"]["0.5"] == 3
+    assert http["latency_buckets"]["10.0"] == 3
+    assert http["latency_buckets"]["+Inf"] == 4
+
+def test_metrics_json_report(tmp_path):
+    metrics = MetricsCollector()
+    metrics.record_stage("transform", 1.0, 10)
+    metrics.write_json(tmp_path / "report.json", extra={"success": True})
+
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["success"] is True
+    assert report["stages"]["transform"]["rows"] == 10
+
+def test_metrics_prometheus_textfile(tmp_path):
+    metrics = MetricsCollector()
+    metrics.record_stage("extract", 2.0, 100)
+    metrics.observe_request(0.07)
+    metrics.write_prometheus(tmp_path / "etl.prom", success=False)
+
+    text = (tmp_path / "etl.prom").read_text()
+    assert '# TYPE etl_http_request_duration_seconds histogram' in text
+    assert 'etl_stage_rows_per_second{stage="extract"} 50.0' in text
+    assert 'etl_http_request_duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'etl_http_request_duration_seconds_bucket{le="+Inf"} 1' in text
+    assert 'etl_http_request_duration_seconds_count 1' in text
+    assert 'etl_last_run_success 0' in text
+    assert not (tmp_path / "etl.prom.tmp").exists()
+
+def test_metrics_prometheus_constant_labels(tmp_path):
+    metrics = MetricsCollector()
+    metrics.record_stage("extract", 2.0, 100)
+    metrics.observe_request(0.07)
+    metrics.write_prometheus(tmp_path / "etl.prom", labels={"resource": "comics"})
+
+    text = (tmp_path / "etl.prom").read_text()
+    assert 'etl_stage_rows{resource="comics",stage="extract"} 100' in text
+    assert 'etl_http_request_duration_seconds_bucket{resource="comics",le="0.1"} 1' in text
+    assert 'etl_http_request_duration_seconds_count{resource="comics"} 1' in text
+    assert 'etl_last_run_success{resource="comics"} 1' in text
@@ -0,0 +1,66 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+ds = pytest.importorskip("pyarrow.dataset")
+
+from etl_pipeline.parquet_output import parquet_options, write_parquet
+
+@pytest.fixture
+def table():
+    ids = [9, 3, 7, 1, 5, 2, 8, 4, 6, 0]
+    names = ["Wolverine", "Abyss", "Beast", "abomination", None, "3-D Man", "Blade", "Angel", "Ÿ", "Thor"]
+    return pa.table({"id": ids, "name": names, "comics": list(range(10))})
+
+def test_single_file_tuning(tmp_path, table):
+    options = parquet_options({"row_group_size": 3, "compression": "zstd", "sort_by_id": True, "use_dictionary": False})
+    path = tmp_path / "out.parquet"
+
+    assert write_parquet(table, path, options) == 1
+
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 4
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+    # sorted ids: each row group covers a disjoint id range
+    ranges = [(metadata.row_group(i).column(0).statistics.min, metadata.row_group(i).column(0).statistics.max)
+              for i in range(metadata.num_row_groups)]
+    assert ranges == [(0, 2), (3, 5), (6, 8), (9, 9)]
+
+def test_dataset_partitioned_by_id_bucket(tmp_path, table):
+    options = parquet_options({"partition_by": "id_bucket", "id_buckets": 3, "sort_by_id": True})
+    root = tmp_path / "out.parquet"
+
+    assert write_parquet(table, root, options) == 3
+
+    assert sorted(p.name for p in root.iterdir()) == ["_common_metadata", "_metadata", "id_bucket=0", "id_bucket=1", "id_bucket=2"]
+    summary = pq.read_metadata(root / "_metadata")
+    assert summary.num_rows == 10
+    assert summary.row_group(0).column(0).file_path == "id_bucket=0/part-0.parquet"
+
+    dataset = ds.parquet_dataset(str(root / "_metadata"), partitioning="hive")
+    bucket = dataset.to_table(filter=ds.field("id_bucket") == 1)
+    assert bucket["id"].to_pylist() == [1, 4, 7]
+
+def test_dataset_partitioned_by_name_initial(tmp_path, table):
+    root = tmp_path / "out.parquet"
+    write_parquet(table, root, parquet_options({"partition_by": "name_initial"}))
+
+    partitions = sorted(p.name for p in root.iterdir() if p.is_dir())
+    assert partitions == ["name_initial=3", "name_initial=A", "name_initial=B", "name_initial=T",
+                          "name_initial=W", "name_initial=_"]
+    a = pq.read_table(root / "name_initial=A" / "part-0.parquet")
+    assert sorted(a["name"].to_pylist()) == ["Abyss", "Angel", "abomination"]
+
+def test_dataset_replaces_previous_output(tmp_path, table):
+    root = tmp_path / "out.parquet"
+    root.write_bytes(b"old single file")
+
+    write_parquet(table, root, parquet_options({"partition_by": "id_bucket", "id_buckets": 2}))
+    write_parquet(table, root, parquet_options({}))
+
+    assert root.is_file()
+    assert pq.read_table(root).num_rows == 10
+
+def test_unsupported_partition_key():
+    with pytest.raises(ValueError, match="Unsupported partition key"):
+        parquet_options({"partition_by": "publisher"})
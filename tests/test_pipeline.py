@@ -58,6 +58,28 @@ def test_pipeline_no_data_extracted(caplog, tmp_path):
     assert "Pipeline aborted: no data extracted" in caplog.text
     assert "Transformation step completed" not in caplog.text
 
+def test_pipeline_empty_incremental_delta_succeeds(caplog, tmp_path):
+    import json
+
+    caplog.set_level(logging.INFO)
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 0)
+    extractor.incremental = True
+    extractor.commit_watermark = Mock()
+    transformer = MockTransformer(str(tmp_path / "out.csv"), 0)
+    transformer.run = Mock()
+    pipeline = Pipeline(extractor, transformer, report_path=tmp_path / "report.json",
+                        prometheus_path=tmp_path / "etl.prom")
+
+    result = pipeline.run()
+
+    assert result["raw"] == (str(tmp_path / "raw.jsonl"), 0)
+    assert result["transformed"][1] == 0
+    transformer.run.assert_not_called()
+    extractor.commit_watermark.assert_called_once()
+    assert "No rows changed since the last run" in caplog.text
+    assert json.loads((tmp_path / "report.json").read_text())["success"] is True
+    assert "etl_last_run_success 1" in (tmp_path / "etl.prom").read_text()
+
 def test_pipeline_extraction_failure(caplog, tmp_path):
     caplog.set_level(logging.INFO)
     
@@ -122,3 +144,274 @@ def test_pipeline_data_flow_validation(caplog, tmp_path):
     assert result["transformed"][1] == 8
     assert "10 rows" in caplog.text
     assert "8 rows" in caplog.text
+
+def test_pipeline_commits_watermark_after_transform(tmp_path):
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 5)
+    extractor.commit_watermark = Mock()
+    pipeline = Pipeline(extractor, MockTransformer(str(tmp_path / "out.csv"), 5))
+
+    assert pipeline.run() is not None
+    extractor.commit_watermark.assert_called_once()
+
+def test_pipeline_keeps_watermark_on_transform_failure(tmp_path):
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 5)
+    extractor.commit_watermark = Mock()
+    pipeline = Pipeline(extractor, MockTransformer(str(tmp_path / "out.csv"), 5, should_fail=True))
+
+    assert pipeline.run() is None
+    extractor.commit_watermark.assert_not_called()
+
+class FusedExtractor:
+    def __init__(self, pages, should_fail=False):
+        self.pages = pages
+        self.should_fail = should_fail
+        self.write_raw = None
+        self.handed_off = 0
+
+    def run(self, on_page=None, write_raw=True):
+        self.write_raw = write_raw
+        for rows in self.pages:
+            on_page(rows)
+            self.handed_off += 1
+        if self.should_fail:
+            raise Exception("Extraction failed")
+        return (None if not write_raw else "raw.jsonl"), sum(len(rows) for rows in self.pages)
+
+class FusedTransformer:
+    def __init__(self, should_fail=False):
+        self.should_fail = should_fail
+        self.received = []
+
+    def run_pages(self, pages):
+        for rows in pages:
+            if self.should_fail:
+                raise Exception("Transformation failed")
+            self.received.append(rows)
+        return "out.csv", sum(len(rows) for rows in self.received)
+
+def test_pipeline_fused_success(caplog):
+    caplog.set_level(logging.INFO)
+    pages = [[{"id": i}] * 2 for i in range(5)]
+    extractor = FusedExtractor(pages)
+    transformer = FusedTransformer()
+    pipeline = Pipeline(extractor, transformer, fused=True, queue_size=2, tee_raw=False)
+
+    result = pipeline.run()
+
+    assert result["raw"] == (None, 10)
+    assert result["transformed"] == ("out.csv", 10)
+    assert transformer.received == pages
+    assert extractor.write_raw is False
+    assert set(result["timings"]) == {"extract", "transform", "total", "overlap"}
+    assert "Extraction step completed" in caplog.text
+    assert "Transformation step completed" in caplog.text
+    assert "overlapped with extraction" in caplog.text
+
+def test_pipeline_fused_transformation_failure_stops_extraction(caplog):
+    caplog.set_level(logging.INFO)
+    extractor = FusedExtractor([[{"id": i}] for i in range(100)])
+    pipeline = Pipeline(extractor, FusedTransformer(should_fail=True), fused=True, queue_size=2)
+
+    result = pipeline.run()
+
+    assert result is None
+    assert "Transformation failed" in caplog.text
+    assert extractor.handed_off < 100
+
+def test_pipeline_fused_extraction_failure(caplog):
+    caplog.set_level(logging.INFO)
+    pipeline = Pipeline(FusedExtractor([[{"id": 1}]], should_fail=True), FusedTransformer(), fused=True)
+
+    assert pipeline.run() is None
+    assert "Extraction failed" in caplog.text
+    assert "Pipeline finished successfully" not in caplog.text
+
+def test_pipeline_fused_end_to_end(monkeypatch, tmp_path):
+    import pandas as pd
+    from etl_pipeline.extractor import Extractor
+    from etl_pipeline.transformer import Transformer
+
+    config = {
+        "api": {"base_url": "http://api", "api_path": "/v1/public/characters", "retries": 3, "timeout": 10, "page_size": 2},
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "out", "format": "csv"},
+        "transform": {"chunk_rows": 3},
+    }
+    characters = [
+        {"id": i, "name": f"Hero {i}", "description": " a\n b ", "comics": {"available": i},
+         "series": {"available": 1}, "stories": {"available": 2}, "events": {"available": 3}}
+        for i in range(5)
+    ]
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        offset = params["offset"]
+        response.json.return_value = {"data": {"results": characters[offset:offset + params["limit"]]}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    pipeline = Pipeline(Extractor(config, data_dir=tmp_path), Transformer(config, data_dir=tmp_path), fused=True, tee_raw=False)
+
+    result = pipeline.run()
+
+    assert result["transformed"][1] == 5
+    assert not (tmp_path / "raw.jsonl").exists()
+    df = pd.read_csv(tmp_path / "out.csv")
+    assert df["id"].tolist() == list(range(5))
+    assert df["description"].iloc[0] == "a b"
+
+def test_pipeline_fused_extraction_failure_keeps_previous_output(tmp_path, caplog):
+    from etl_pipeline.transformer import Transformer
+
+    config = {"output": {"raw_file": "raw.jsonl", "transformed_file": "out", "format": "csv", "index": True},
+              "transform": {"chunk_rows": 1}}
+    previous = "id,name,description,comics,series,stories,events\n" + "".join(f"{i},Hero {i},,1,1,1,1\n" for i in range(100))
+    (tmp_path / "out.csv").write_text(previous)
+    page = [{"id": 1, "name": "Hero 1", "description": "", "comics": {"available": 1}}]
+    pipeline = Pipeline(FusedExtractor([page], should_fail=True), Transformer(config, data_dir=tmp_path), fused=True)
+
+    assert pipeline.run() is None
+    assert (tmp_path / "out.csv").read_text() == previous
+    assert not (tmp_path / "out.csv.index").exists()
+    assert [path.name for path in tmp_path.iterdir()] == ["out.csv"]
+    assert "Extraction failed" in caplog.text
+
+def test_pipeline_metrics_with_stages_that_do_not_report(tmp_path):
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 10)
+    transformer = MockTransformer(str(tmp_path / "out.csv"), 8)
+    pipeline = Pipeline(extractor, transformer, report_path=tmp_path / "report.json",
+                        prometheus_path=tmp_path / "etl.prom")
+
+    result = pipeline.run()
+
+    stages = result["metrics"]["stages"]
+    assert stages["extract"]["rows"] == 10
+    assert stages["transform"]["rows"] == 8
+    assert stages["total"]["seconds"] >= stages["extract"]["seconds"]
+    assert (tmp_path / "report.json").exists()
+    assert 'etl_stage_rows{stage="transform"} 8' in (tmp_path / "etl.prom").read_text()
+
+def test_pipeline_failed_run_still_exports(tmp_path):
+    import json
+    pipeline = Pipeline(MockExtractor("raw.jsonl", 5, should_fail=True), MockTransformer("out.csv", 5),
+                        report_path=tmp_path / "report.json", prometheus_path=tmp_path / "etl.prom")
+
+    assert pipeline.run() is None
+    assert json.loads((tmp_path / "report.json").read_text())["success"] is False
+    assert "etl_last_run_success 0" in (tmp_path / "etl.prom").read_text()
+
+def test_pipeline_shares_metrics_with_reporting_stages(monkeypatch, tmp_path):
+    from etl_pipeline.extractor import Extractor
+    from etl_pipeline.transformer import Transformer
+
+    config = {
+        "api": {"base_url": "http://api", "api_path": "/v1/public/characters", "retries": 3, "timeout": 10, "page_size": 2},
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "out", "format": "csv"},
+    }
+    character = {"id": 1, "name": "A", "description": "", "comics": {"available": 1},
+                 "series": {"available": 1}, "stories": {"available": 1}, "events": {"available": 1}}
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        response.content = b"{}"
+        response.json.return_value = {"data": {"results": [character] if params["offset"] == 0 else []}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    pipeline = Pipeline(Extractor(config, data_dir=tmp_path), Transformer(config, data_dir=tmp_path))
+
+    metrics = pipeline.run()["metrics"]
+
+    assert metrics["http"]["requests"] == 2
+    assert metrics["stages"]["extract"]["bytes_read"] == 4
+    assert metrics["stages"]["extract"]["bytes_written"] == (tmp_path / "raw.jsonl").stat().st_size
+    assert metrics["stages"]["transform"]["bytes_written"] == (tmp_path / "out.csv").stat().st_size
+
+def _real_pipeline(monkeypatch, tmp_path, characters, force=False):
+    from etl_pipeline.extractor import Extractor
+    from etl_pipeline.transformer import Transformer
+
+    config = {
+        "api": {"base_url": "http://api", "api_path": "/v1/public/characters", "retries": 3, "timeout": 10, "page_size": 50},
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "out", "format": "csv"},
+    }
+
+    def mock_get(session, url, params=None, timeout=None):
+        response = Mock()
+        response.json.return_value = {"data": {"results": characters if params["offset"] == 0 else []}}
+        response.raise_for_status.return_value = None
+        return response
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    return Pipeline(Extractor(config, data_dir=tmp_path), Transformer(config, data_dir=tmp_path), force=force)
+
+def test_pipeline_skips_unchanged_transformation(monkeypatch, tmp_path, caplog):
+    from etl_pipeline.transformer import Transformer
+
+    caplog.set_level(logging.INFO)
+    characters = [{"id": i, "name": f"C{i}", "description": ""} for i in range(3)]
+    assert _real_pipeline(monkeypatch, tmp_path, characters).run()["transformed"][1] == 3
+    assert (tmp_path / "out.csv.fingerprint.json").exists()
+
+    transform_calls = []
+    monkeypatch.setattr(Transformer, "run", lambda self: transform_calls.append(1) or ("x", 0))
+
+    result = _real_pipeline(monkeypatch, tmp_path, characters).run()
+    assert transform_calls == []
+    assert result["transformed"] == (str(tmp_path / "out.csv"), 3)
+    assert result["metrics"]["counters"]["stages_skipped"] == 1
+    assert "Transformation skipped" in caplog.text
+
+    # --force, changed raw data and a modified output all run the stage again
+    _real_pipeline(monkeypatch, tmp_path, characters, force=True).run()
+    assert len(transform_calls) == 1
+
+def test_pipeline_reruns_transformation_when_inputs_change(monkeypatch, tmp_path):
+    characters = [{"id": i, "name": f"C{i}", "description": ""} for i in range(3)]
+    _real_pipeline(monkeypatch, tmp_path, characters).run()
+
+    result = _real_pipeline(monkeypatch, tmp_path, characters[:2]).run()
+    assert result["transformed"][1] == 2
+    assert "stages_skipped" not in result["metrics"]["counters"]
+
+    (tmp_path / "out.csv").write_text("id\n")
+    result = _real_pipeline(monkeypatch, tmp_path, characters[:2]).run()
+    assert "stages_skipped" not in result["metrics"]["counters"]
+    assert len((tmp_path / "out.csv").read_text().splitlines()) == 3
+
+class MockLoader:
+    def __init__(self, should_fail=False):
+        self.should_fail = should_fail
+        self.loaded = []
+
+    def run(self, path):
+        if self.should_fail:
+            raise Exception("database is locked")
+        self.loaded.append(path)
+        return "etl.sqlite", 5
+
+def test_pipeline_runs_loader_before_committing_watermark(caplog, tmp_path):
+    caplog.set_level(logging.INFO)
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 5)
+    extractor.commit_watermark = Mock()
+    loader = MockLoader()
+    pipeline = Pipeline(extractor, MockTransformer(str(tmp_path / "out.csv"), 5), loader=loader)
+
+    result = pipeline.run()
+
+    assert loader.loaded == [str(tmp_path / "out.csv")]
+    assert result["loaded"] == ("etl.sqlite", 5)
+    assert "load" in result["timings"]
+    assert result["metrics"]["stages"]["load"]["rows"] == 5
+    extractor.commit_watermark.assert_called_once()
+    assert "Load step completed" in caplog.text
+
+def test_pipeline_load_failure(caplog, tmp_path):
+    extractor = MockExtractor(str(tmp_path / "raw.jsonl"), 5)
+    extractor.commit_watermark = Mock()
+    pipeline = Pipeline(extractor, MockTransformer(str(tmp_path / "out.csv"), 5), loader=MockLoader(should_fail=True))
+
+    assert pipeline.run() is None
+    assert "Load failed: database is locked" in caplog.text
+    extractor.commit_watermark.assert_not_called()
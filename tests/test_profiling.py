@@ -0,0 +1,63 @@
+import pstats
+from etl_pipeline.profiling import StageProfiler
+from etl_pipeline.pipeline import Pipeline
+from etl_pipeline.main import parse_args
+
+def busy_stage():
+    data = [str(i) * 10 for i in range(20000)]
+    return "out.csv", len(data)
+
+def test_profiler_writes_stage_files(tmp_path):
+    profiler = StageProfiler(tmp_path / "run", top_n=5)
+
+    assert profiler.profile("transform", busy_stage) == ("out.csv", 20000)
+
+    assert pstats.Stats(str(tmp_path / "run" / "transform.prof")).total_calls > 0
+    allocations = (tmp_path / "run" / "transform_allocations.txt").read_text().splitlines()
+    assert allocations[0].startswith("Top 5 allocation sites for stage 'transform'")
+    assert 1 <= len(allocations) <= 6
+    assert profiler.results[0]["peak_mib"] > 0
+
+def test_profiler_records_failing_stage(tmp_path):
+    profiler = StageProfiler(tmp_path)
+
+    def failing():
+        raise RuntimeError("boom")
+
+    try:
+        profiler.profile("extract", failing)
+    except RuntimeError:
+        pass
+    assert (tmp_path / "extract.prof").exists()
+    assert "extract" in profiler.summary()
+
+class Stage:
+    def __init__(self, count):
+        self.count = count
+
+    def run(self):
+        return "path", self.count
+
+def test_pipeline_profiles_each_stage(tmp_path):
+    profiler = StageProfiler(tmp_path)
+    pipeline = Pipeline(Stage(3), Stage(3), fused=True, profiler=profiler)
+
+    assert pipeline.run()["transformed"] == ("path", 3)  # fused mode is turned off while profiling
+    assert [r["stage"] for r in profiler.results] == ["extract", "transform"]
+    summary = profiler.summary()
+    assert "hot spot" in summary
+    assert "transform" in summary
+
+def test_pipeline_profiles_extraction_on_one_thread(tmp_path):
+    extractor = Stage(3)
+    extractor.concurrency = 4
+    pipeline = Pipeline(extractor, Stage(3), profiler=StageProfiler(tmp_path))
+
+    assert pipeline.run() is not None
+    assert extractor.concurrency == 1  # fetch workers would hide their HTTP and JSON time from cProfile
+
+def test_profile_flag_defaults_off():
+    assert parse_args([]).profile is False
+    args = parse_args(["--profile", "--profile-top", "5"])
+    assert args.profile is True
+    assert args.profile_top == 5
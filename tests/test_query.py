@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from etl_pipeline.query import OutputIndex, StaleIndexError, build_index, csv_record_offsets, index_path
+from etl_pipeline.transformer import Transformer
+
+
+@pytest.fixture
+def config():
+    return {
+        "output": {
+            "raw_file": "raw.jsonl",
+            "transformed_file": "out",
+            "format": "csv",
+            "index": True,
+        }
+    }
+
+def character(id, comics, series=None, description=""):
+    row = {"id": id, "name": f"Hero {id}", "description": description, "comics": {"available": comics}}
+    if series is not None:
+        row["series"] = {"available": series}
+    return row
+
+def write_raw(tmp_path, rows):
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+ROWS = [
+    character(30, 5, 1),
+    character(10, 12, description='Said "hi",\ntwice'),
+    character(20, 12, 7),
+    character(40, 0, 2),
+]
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_transformer_writes_index_for_lookups_and_top(tmp_path, config, fmt):
+    config["output"]["format"] = fmt
+    write_raw(tmp_path, ROWS)
+    path, _ = Transformer(config, data_dir=tmp_path).run()
+    assert os.path.exists(index_path(path))
+
+    with OutputIndex(path, rebuild=False) as index:
+        assert len(index) == 4
+        assert index.rank_columns == ["comics", "series", "stories", "events"]
+        row = index.get(10)
+        assert (row["name"], row["comics"], row["series"]) == ("Hero 10", 12, None)
+        assert row["description"] == 'Said "hi", twice'
+        assert index.get(11) is None
+        assert [row["id"] for row in index.top("comics", 3)] == [10, 20, 30]
+        # rows without the count rank last
+        assert [row["id"] for row in index.top("series")] == [20, 40, 30, 10]
+        with pytest.raises(ValueError, match="No ranking"):
+            index.top("name")
+
+def test_index_rebuilt_when_output_rewritten(tmp_path, config):
+    write_raw(tmp_path, ROWS)
+    transformer = Transformer(config, data_dir=tmp_path)
+    path, _ = transformer.run()
+
+    write_raw(tmp_path, [*ROWS, character(50, 99)])
+    transformer.run()
+
+    with OutputIndex(path, rebuild=False) as index:
+        assert index.top("comics", 1)[0]["id"] == 50
+        assert index.get(50)["comics"] == 99
+
+def test_stale_index_is_detected(tmp_path, config):
+    config["output"]["index"] = False
+    write_raw(tmp_path, ROWS)
+    path, _ = Transformer(config, data_dir=tmp_path).run()
+    assert not os.path.exists(index_path(path))
+
+    with pytest.raises(StaleIndexError):
+        OutputIndex(path, rebuild=False)
+    with OutputIndex(path) as index:  # built on demand
+        assert index.get(40)["comics"] == 0
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("60,Hero 60,,1,,,\n")
+    with pytest.raises(StaleIndexError):
+        OutputIndex(path, rebuild=False)
+    with OutputIndex(path) as index:
+        assert index.get(60)["comics"] == 1
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_empty_run_keeps_output_and_index(tmp_path, config, fused):
+    write_raw(tmp_path, ROWS)
+    transformer = Transformer(config, data_dir=tmp_path)
+    path, _ = transformer.run()
+    (tmp_path / "raw.jsonl").write_text("{}\n")
+
+    _, count = transformer.run_pages(iter([])) if fused else transformer.run()
+
+    # nothing was published: the previous output and its index stay usable
+    assert count == 0
+    with OutputIndex(path, rebuild=False) as index:
+        assert index.get(40)["comics"] == 0
+
+def test_csv_record_offsets_skip_quoted_newlines(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_bytes(b'id,description\n1,"a\nb"\n2,"say ""x""\n"\n3,plain\n')
+
+    offsets = csv_record_offsets(path)
+
+    data = path.read_bytes()
+    assert [data[offset:offset + 2] for offset in offsets] == [b"1,", b"2,", b"3,"]
+
+def test_build_index_skips_partitioned_dataset(tmp_path, config):
+    config["output"].update({"format": "parquet", "parquet": {"partition_by": "id_bucket", "id_buckets": 2}})
+    write_raw(tmp_path, ROWS)
+    path, _ = Transformer(config, data_dir=tmp_path).run()
+
+    assert build_index(path, "parquet") is None
+    assert not os.path.exists(index_path(path))
@@ -0,0 +1,77 @@
+import pytest
+import json
+from etl_pipeline.raw_io import RawWriter, detect_format, read_frame, iter_frames
+
+@pytest.fixture
+def rows():
+    return [
+        {"id": 1, "name": "3-D Man", "description": "Test", "modified": "2014-04-29T14:18:17-0400",
+         "comics": {"available": 12, "items": [{"name": "x"}]}, "series": {"available": 3},
+         "stories": {"available": 21}, "events": {"available": 1}, "thumbnail": {"path": "p"}},
+        {"id": 2, "name": "A-Bomb", "description": None,
+         "comics": None, "series": {"available": 0}, "stories": "invalid", "events": {"available": 2}},
+    ]
+
+@pytest.mark.parametrize("fmt,compression", [
+    ("jsonl", None),
+    ("jsonl", "gzip"),
+    ("jsonl", "zstd"),
+    ("arrow", None),
+    ("arrow", "zstd"),
+])
+def test_raw_writer_round_trip(tmp_path, rows, fmt, compression):
+    if fmt == "arrow" or compression == "zstd":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / "raw"
+
+    with RawWriter(path, fmt, compression) as writer:
+        writer.write_rows(rows[:1])
+        writer.write_rows(rows[1:])
+
+    assert detect_format(path) == (fmt, compression if fmt == "jsonl" else None)
+    df = read_frame(path)
+    assert df["id"].tolist() == [1, 2]
+    assert df["comics"].iloc[0]["available"] == 12
+    assert df["comics"].iloc[1] is None
+    assert [len(chunk) for chunk in iter_frames(path, chunk_rows=1)] == [1, 1]
+
+def test_raw_writer_arrow_keeps_only_landing_fields(tmp_path, rows):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "raw.arrow"
+
+    with RawWriter(path, "arrow") as writer:
+        writer.write_rows(rows)
+
+    df = read_frame(path)
+    assert "thumbnail" not in df.columns
+    assert df["modified"].iloc[0] == "2014-04-29T14:18:17-0400"
+    assert df["stories"].iloc[1] is None  # malformed nested value nulled like the pandas flattening
+
+def test_raw_writer_plain_jsonl_is_unchanged(tmp_path, rows):
+    path = tmp_path / "raw.jsonl"
+
+    with RawWriter(path) as writer:
+        writer.write_rows(rows)
+
+    assert path.read_text() == "".join(json.dumps(row) + "\n" for row in rows)
+
+def test_raw_writer_rejects_unsupported_options(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported raw format"):
+        RawWriter(tmp_path / "raw", "xml")
+    with pytest.raises(ValueError, match="Unsupported raw compression"):
+        RawWriter(tmp_path / "raw", "jsonl", "bz2")
+    with pytest.raises(ValueError, match="zstd compression only"):
+        RawWriter(tmp_path / "raw", "arrow", "gzip")
+
+def test_raw_writer_passthrough_rows_are_written_as_is(tmp_path, rows):
+    from etl_pipeline.json_codec import JsonRows
+
+    path = tmp_path / "raw.jsonl"
+    lines = ['{"id":1, "name":"3-D Man"}', '{"id":2,"name":"A-Bomb"}']
+
+    with RawWriter(path) as writer:
+        writer.write_rows(JsonRows([{"id": 1, "name": "3-D Man"}, {"id": 2, "name": "A-Bomb"}], lines))
+        writer.write_rows([])
+        writer.write_rows(rows[1:])
+
+    assert path.read_text().splitlines() == lines + [json.dumps(rows[1])]
@@ -0,0 +1,110 @@
+import logging
+import time
+
+import pytest
+
+from etl_pipeline.main import build_pipelines
+from etl_pipeline.scheduler import Scheduler, resource_configs
+
+@pytest.fixture
+def config():
+    return {
+        "api": {
+            "base_url": "https://gateway.marvel.com",
+            "api_path": "/v1/public/characters",
+            "retries": 3,
+            "timeout": 10,
+            "page_size": 2,
+            "pool_size": 4,
+            "max_in_flight": 6,
+        },
+        "output": {"raw_file": "raw.jsonl", "transformed_file": "final", "format": "csv"},
+        "cache": {"enabled": False, "dir": "http_cache"},
+        "transform": {"engine": "pandas", "nested_fields": {"comics": "available"}},
+        "metrics": {"report_file": "report.json", "prometheus_textfile": "/tmp/etl.prom"},
+    }
+
+class SleepyPipeline:
+    def __init__(self, seconds, fail=False):
+        self.seconds = seconds
+        self.fail = fail
+
+    def run(self):
+        time.sleep(self.seconds)
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"timings": {"total": self.seconds}}
+
+def test_resource_configs_without_resources(config):
+    assert resource_configs(config) == [("characters", config)]
+
+def test_resource_configs_merge_and_prefix(config):
+    config["resources"] = [
+        {"name": "characters"},
+        {
+            "name": "comics",
+            "api": {"api_path": "/v1/public/comics"},
+            "output": {"format": "parquet"},
+            "transform": {"name_field": "title", "nested_fields": {"creators": "available"}},
+        },
+        {"api": {"api_path": "/v1/public/series/"}, "output": {"raw_file": "series.jsonl"}},
+    ]
+
+    resources = dict(resource_configs(config))
+
+    assert list(resources) == ["characters", "comics", "series"]
+    comics = resources["comics"]
+    assert "resources" not in comics
+    assert comics["api"]["api_path"] == "/v1/public/comics"
+    assert comics["api"]["base_url"] == "https://gateway.marvel.com"
+    assert comics["output"] == {"raw_file": "comics_raw.jsonl", "transformed_file": "comics_final", "format": "parquet"}
+    assert comics["transform"] == {"engine": "pandas", "name_field": "title", "nested_fields": {"creators": "available"}}
+    assert comics["cache"]["dir"] == "http_cache/comics"
+    assert comics["metrics"] == {"report_file": "comics_report.json", "prometheus_textfile": "/tmp/etl_comics.prom"}
+    assert resources["series"]["output"]["raw_file"] == "series.jsonl"
+    assert config["output"]["raw_file"] == "raw.jsonl"  # top-level config untouched
+
+def test_resource_configs_duplicate_names(config):
+    config["resources"] = [{"name": "comics"}, {"name": "comics"}]
+    with pytest.raises(ValueError, match="Duplicate resource names: comics"):
+        resource_configs(config)
+
+def test_build_pipelines_share_session_and_budget(tmp_path, config):
+    config["resources"] = [{"name": "characters"}, {"name": "comics", "api": {"api_path": "/v1/public/comics"}}]
+
+    pipelines = build_pipelines(config, data_dir=tmp_path)
+
+    characters, comics = pipelines["characters"], pipelines["comics"]
+    assert characters.extractor.session is comics.extractor.session
+    assert characters.extractor.budget is comics.extractor.budget
+    assert characters.extractor.limiter is comics.extractor.limiter
+    assert characters.extractor.breaker is comics.extractor.breaker
+    assert characters.extractor.session.get_adapter("https://").poolmanager.connection_pool_kw["maxsize"] == 6
+    assert comics.extractor.api_path == "/v1/public/comics"
+    assert comics.name == "comics"
+    assert comics.report_path == tmp_path / "comics_report.json"
+
+def test_build_pipelines_single_resource(tmp_path, config):
+    pipelines = build_pipelines(config, data_dir=tmp_path)
+    assert list(pipelines) == ["characters"]
+    assert pipelines["characters"].name is None
+
+def test_scheduler_runs_resources_concurrently(caplog):
+    caplog.set_level(logging.INFO)
+    pipelines = {"a": SleepyPipeline(0.2), "b": SleepyPipeline(0.2), "c": SleepyPipeline(0.2, fail=True)}
+
+    start = time.perf_counter()
+    results = Scheduler(pipelines).run()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert results["a"] == {"timings": {"total": 0.2}}
+    assert results["c"] is None
+    assert "Resource 'c' failed: boom" in caplog.text
+    assert "failed: c" in caplog.text
+
+def test_scheduler_max_parallel():
+    pipelines = {"a": SleepyPipeline(0.1), "b": SleepyPipeline(0.1)}
+    start = time.perf_counter()
+    Scheduler(pipelines, max_parallel=1).run()
+    assert time.perf_counter() - start >= 0.2
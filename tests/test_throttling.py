@@ -0,0 +1,163 @@
+import json
+import random
+import threading
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from etl_pipeline.throttling import (
+    CircuitBreaker, CircuitOpenError, TokenBucket, backoff_delay, build_limiter, is_retryable, retry_after_seconds,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def http_error(status, headers=None):
+    return requests.exceptions.HTTPError(f"{status}", response=Mock(status_code=status, headers=headers or {}))
+
+def test_token_bucket_paces_after_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, burst=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(6):
+        bucket.acquire()
+
+    assert clock.sleeps == [0.25] * 4
+    assert clock.now == pytest.approx(1.0)
+
+def test_token_bucket_unlimited_never_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+    for _ in range(1000):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+def test_token_bucket_throttle_pauses_and_recovers():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, min_rate=4, clock=clock, sleep=clock.sleep)
+
+    bucket.throttle(retry_after=3)
+    assert bucket.rate == 5
+    bucket.acquire()
+    assert clock.sleeps[0] == 3
+
+    bucket.throttle()
+    assert bucket.rate == 4  # floored at min_rate
+    for _ in range(20):
+        bucket.record_success()
+    assert bucket.rate == 10  # back to the configured rate, never above
+
+def test_build_limiter_from_config():
+    limiter = build_limiter({"rate_limit": {"requests_per_second": 20, "burst": 5}})
+    assert (limiter.rate, limiter.burst, limiter.min_rate) == (20, 5, 1.0)
+    assert build_limiter({}).rate is None
+
+def test_circuit_breaker_opens_and_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now = 31
+    breaker.check()  # trial request allowed
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now = 62
+    breaker.check()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.check()  # closed again, counting from zero
+
+def test_circuit_breaker_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 31
+
+    outcomes = []
+    barrier = threading.Barrier(2)
+
+    def worker():
+        barrier.wait()
+        try:
+            breaker.check()
+            outcomes.append("probe")
+        except CircuitOpenError:
+            outcomes.append("rejected")
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["probe", "rejected"]
+    with pytest.raises(CircuitOpenError, match="half-open"):
+        breaker.check()
+    breaker.record_success()
+    breaker.check()
+    breaker.check()  # closed: everyone goes through
+
+def test_circuit_breaker_unreported_probe_expires():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 31
+    breaker.check()  # probe that never reports back (non-retryable error)
+
+    clock.now = 50
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    clock.now = 61
+    breaker.check()  # a new probe
+
+@pytest.mark.parametrize("exc, retryable", [
+    (http_error(500), True),
+    (http_error(503), True),
+    (http_error(429), True),
+    (http_error(401), False),
+    (http_error(404), False),
+    (requests.exceptions.HTTPError("no response"), False),
+    (requests.exceptions.ConnectTimeout("slow"), True),
+    (requests.exceptions.ConnectionError("reset"), True),
+    (requests.exceptions.ChunkedEncodingError("cut"), True),
+    (json.JSONDecodeError("Expecting value", "{", 1), True),
+    (UnicodeDecodeError("utf-8", b"\xc3", 0, 1, "unexpected end of data"), True),
+    (ValueError("not a decode error"), False),
+    (requests.exceptions.MissingSchema("no scheme"), False),
+    (requests.exceptions.InvalidSchema("ftp"), False),
+    (requests.exceptions.InvalidURL("bad host"), False),
+    (CircuitOpenError("open"), False),
+])
+def test_is_retryable(exc, retryable):
+    assert is_retryable(exc) is retryable
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(http_error(429, {"Retry-After": "12"})) == 12
+    assert retry_after_seconds(http_error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after_seconds(http_error(429, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(http_error(429)) is None
+    assert retry_after_seconds(requests.exceptions.ConnectionError()) is None
+
+def test_backoff_delay_full_jitter():
+    rng = random.Random(1)
+    delays = [backoff_delay(attempt, 1.0, 10.0, rng) for attempt in range(1, 8) for _ in range(50)]
+    assert all(0 <= delay <= 10.0 for delay in delays)
+    assert max(delays[:50]) <= 2.0
+    assert len(set(delays)) == len(delays)
@@ -1,5 +1,6 @@
 import pytest
 import json
+import io
 import pandas as pd
 from etl_pipeline.transformer import Transformer
 
@@ -151,3 +152,449 @@ def test_transformer_unsupported_format(tmp_path, config):
     
     with pytest.raises(ValueError, match="Unsupported format: json"):
         transformer.run()
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_transformer_incremental_upsert_by_id(tmp_path, config, marvel_character_data, fmt):
+    config["output"]["format"] = fmt
+    config["incremental"] = {"enabled": True}
+    raw_file = tmp_path / "raw.jsonl"
+
+    raw_file.write_text(
+        json.dumps(marvel_character_data) + "\n"
+        + json.dumps({**marvel_character_data, "id": 2, "name": "A-Bomb"}) + "\n"
+    )
+    Transformer(config, data_dir=tmp_path).run()
+
+    # Delta: id 2 changed, id 3 is new
+    raw_file.write_text(
+        json.dumps({**marvel_character_data, "id": 2, "name": "A-Bomb (HAS)", "comics": {"available": 99}}) + "\n"
+        + json.dumps({**marvel_character_data, "id": 3, "name": "Abyss"}) + "\n"
+    )
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    df = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+    assert count == 3
+    assert sorted(df["id"]) == [2, 3, 1011334]
+    updated = df[df["id"] == 2].iloc[0]
+    assert updated["name"] == "A-Bomb (HAS)"
+    assert updated["comics"] == 99
+
+def write_characters(raw_file, marvel_character_data, n):
+    with open(raw_file, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({**marvel_character_data, "id": i, "name": f"Hero {i}"}) + "\n")
+
+def test_transformer_streaming_csv_matches_batch(tmp_path, config, marvel_character_data):
+    write_characters(tmp_path / "raw.jsonl", marvel_character_data, 7)
+
+    batch_path, batch_count = Transformer(config, data_dir=tmp_path).run()
+    batch_bytes = open(batch_path, "rb").read()
+
+    config["transform"] = {"mode": "stream", "chunk_rows": 3}
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == batch_count == 7
+    assert open(path, "rb").read() == batch_bytes  # header written once, rows in order
+
+def test_transformer_streaming_parquet_row_groups(tmp_path, config, marvel_character_data):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    config["output"]["format"] = "parquet"
+    config["transform"] = {"mode": "stream", "chunk_rows": 3}
+    raw_file = tmp_path / "raw.jsonl"
+    write_characters(raw_file, marvel_character_data, 7)
+    with open(raw_file, "a") as f:
+        f.write(json.dumps({**marvel_character_data, "id": 7, "comics": None}) + "\n")
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 8
+    assert pq.ParquetFile(path).num_row_groups == 3
+    df = pd.read_parquet(path)
+    assert df["id"].tolist() == list(range(8))
+    assert df["description"].iloc[0] == "Test description with multiple spaces"
+    assert pd.isna(df["comics"].iloc[7])
+
+def test_transformer_streaming_empty_file(tmp_path, config):
+    config["transform"] = {"mode": "stream", "chunk_rows": 3}
+    (tmp_path / "raw.jsonl").write_text("")
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+    assert count == 0
+
+def test_transformer_streaming_invalid_json(tmp_path, config):
+    config["transform"] = {"mode": "stream", "chunk_rows": 3}
+    (tmp_path / "raw.jsonl").write_text("invalid json content")
+
+    with pytest.raises(ValueError):
+        Transformer(config, data_dir=tmp_path).run()
+
+def legacy_flatten(df_raw):
+    """Row-by-row reference implementation the vectorized path must match byte for byte."""
+    import re
+    df = pd.DataFrame({
+        "id": df_raw["id"],
+        "name": df_raw["name"],
+        "description": df_raw["description"],
+        **{
+            field: df_raw[field].apply(lambda x: x.get("available") if isinstance(x, dict) else None)
+            for field in ["comics", "series", "stories", "events"]
+        },
+    })
+    df["description"] = df["description"].fillna("").apply(lambda x: re.sub(r"\s+", " ", str(x))).str.strip()
+    return df
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_transformer_vectorized_output_is_byte_identical(tmp_path, config, marvel_character_data, fmt):
+    pytest.importorskip("pyarrow")
+    config["output"]["format"] = fmt
+    rows = [
+        marvel_character_data,
+        {**marvel_character_data, "id": 2, "description": None, "comics": None, "stories": "invalid"},
+        {**marvel_character_data, "id": 3, "description": " odd spaces\x0b", "series": [1, 2]},
+        {**marvel_character_data, "id": 4, "description": 42, "events": {"items": []}},
+        {**marvel_character_data, "id": 5, "events": {"available": None}},
+    ]
+    raw_file = tmp_path / "raw.jsonl"
+    raw_file.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    expected = legacy_flatten(pd.read_json(raw_file, lines=True))
+    expected_path = tmp_path / f"expected.{fmt}"
+    if fmt == "csv":
+        expected.to_csv(expected_path, index=False)
+    else:
+        expected.to_parquet(expected_path, index=False)
+    assert open(path, "rb").read() == expected_path.read_bytes()
+
+def test_transformer_configurable_nested_fields(tmp_path, config, marvel_character_data):
+    config["transform"] = {"nested_fields": {"comics": "available", "urls": "length"}}
+    raw_file = tmp_path / "raw.jsonl"
+    raw_file.write_text(
+        json.dumps({**marvel_character_data, "urls": [{"type": "detail"}, {"type": "wiki"}]}) + "\n"
+        + json.dumps({**marvel_character_data, "id": 2, "urls": None}) + "\n"
+    )
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    df = pd.read_csv(path)
+    assert list(df.columns) == ["id", "name", "description", "comics", "urls"]
+    assert df["urls"].iloc[0] == 2
+    assert pd.isna(df["urls"].iloc[1])
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_transformer_arrow_engine_matches_pandas(tmp_path, config, marvel_character_data, fmt):
+    pytest.importorskip("pyarrow")
+    config["output"]["format"] = fmt
+    rows = [
+        marvel_character_data,
+        {**marvel_character_data, "id": 2, "description": None, "comics": None, "thumbnail": {"path": "x"}},
+        {**marvel_character_data, "id": 3, "description": " nbsp\x0band more\x1f ", "series": {"available": 0}},
+    ]
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    pandas_path, pandas_count = Transformer(config, data_dir=tmp_path).run()
+    read = pd.read_csv if fmt == "csv" else pd.read_parquet
+    expected = read(pandas_path)
+    expected_bytes = open(pandas_path, "rb").read()
+
+    config["transform"] = {"engine": "arrow"}
+    arrow_path, arrow_count = Transformer(config, data_dir=tmp_path).run()
+    actual = read(arrow_path)
+
+    assert arrow_path == pandas_path
+    assert arrow_count == pandas_count == 3
+    pd.testing.assert_frame_equal(actual, expected)
+    if fmt == "csv":
+        assert open(arrow_path, "rb").read() == expected_bytes
+
+@pytest.mark.parametrize("schema", [None, "declared"])
+def test_transformer_arrow_engine_writes_pandas_csv_text(tmp_path, config, marvel_character_data, schema):
+    rows = [
+        {**marvel_character_data, "name": 'Hero, "The"', "series": None},
+        {**marvel_character_data, "id": 2, "name": "Plain Hero", "description": ""},
+        {**marvel_character_data, "id": 3, "name": None, "description": None, "comics": None},
+    ]
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+    config["transform"] = {"schema": DECLARED_SCHEMA if schema else None}
+    path, _ = Transformer(config, data_dir=tmp_path).run()
+    expected = (tmp_path / "out.csv").read_text()
+
+    config["transform"]["engine"] = "arrow"
+    Transformer(config, data_dir=tmp_path).run()
+
+    assert (tmp_path / "out.csv").read_text() == expected
+    assert "\n2,Plain Hero,," in expected  # strings quoted only when needed, empty description bare
+
+def test_transformer_arrow_engine_falls_back_on_malformed_nested(tmp_path, config, caplog):
+    pytest.importorskip("pyarrow")
+    config["transform"] = {"engine": "arrow"}
+    (tmp_path / "raw.jsonl").write_text(json.dumps({
+        "id": 1, "name": "3-D Man", "description": "Test", "comics": None,
+        "series": {"available": 3}, "stories": "invalid", "events": {"available": 1},
+    }) + "\n")
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 1
+    assert "falling back to pandas" in caplog.text
+    df = pd.read_csv(path)
+    assert pd.isna(df.iloc[0]["stories"])
+
+def test_transformer_arrow_engine_empty_and_invalid(tmp_path, config):
+    pytest.importorskip("pyarrow")
+    config["transform"] = {"engine": "arrow"}
+    raw_file = tmp_path / "raw.jsonl"
+
+    raw_file.write_text("")
+    assert Transformer(config, data_dir=tmp_path).run()[1] == 0
+
+    raw_file.write_text("invalid json content")
+    with pytest.raises(ValueError):
+        Transformer(config, data_dir=tmp_path).run()
+
+@pytest.mark.parametrize("fmt,compression", [("jsonl", "gzip"), ("jsonl", "zstd"), ("arrow", None)])
+@pytest.mark.parametrize("transform", [{}, {"mode": "stream", "chunk_rows": 1}, {"engine": "arrow"}])
+def test_transformer_detects_raw_landing_format(tmp_path, config, marvel_character_data, fmt, compression, transform):
+    pytest.importorskip("pyarrow")
+    from etl_pipeline.raw_io import RawWriter
+    rows = [marvel_character_data, {**marvel_character_data, "id": 2, "name": "A-Bomb"}]
+    config["transform"] = transform
+
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+    expected = open(Transformer(config, data_dir=tmp_path).run()[0], "rb").read()
+
+    with RawWriter(tmp_path / "raw.jsonl", fmt, compression) as writer:
+        writer.write_rows(rows)
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 2
+    assert open(path, "rb").read() == expected
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_transformer_partitioned_parquet_dataset(tmp_path, config, marvel_character_data, engine):
+    pytest.importorskip("pyarrow")
+    config["output"]["format"] = "parquet"
+    config["output"]["parquet"] = {"partition_by": "id_bucket", "id_buckets": 2, "sort_by_id": True}
+    config["transform"] = {"engine": engine}
+    config["incremental"] = {"enabled": False}
+    write_characters(tmp_path / "raw.jsonl", marvel_character_data, 6)
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 6
+    assert (tmp_path / "out.parquet" / "_metadata").exists()
+    df = pd.read_parquet(path)
+    assert sorted(df["id"]) == list(range(6))
+
+def test_transformer_incremental_merge_into_partitioned_dataset(tmp_path, config, marvel_character_data):
+    pytest.importorskip("pyarrow")
+    config["output"]["format"] = "parquet"
+    config["output"]["parquet"] = {"partition_by": "id_bucket", "id_buckets": 2}
+    config["incremental"] = {"enabled": True}
+    write_characters(tmp_path / "raw.jsonl", marvel_character_data, 4)
+    Transformer(config, data_dir=tmp_path).run()
+
+    (tmp_path / "raw.jsonl").write_text(json.dumps({**marvel_character_data, "id": 1, "name": "Renamed"}) + "\n")
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    df = pd.read_parquet(path)
+    assert count == 4
+    assert list(df.columns) == ["id", "name", "description", "comics", "series", "stories", "events", "id_bucket"]
+    assert df.set_index("id").loc[1, "name"] == "Renamed"
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_transformer_name_field(tmp_path, config, marvel_character_data, engine):
+    config["transform"] = {"engine": engine, "name_field": "title"}
+    comic = {k: v for k, v in marvel_character_data.items() if k != "name"}
+    (tmp_path / "raw.jsonl").write_text(json.dumps({**comic, "title": "Avengers (1963) #1"}) + "\n")
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    df = pd.read_csv(path)
+    assert list(df.columns[:3]) == ["id", "name", "description"]
+    assert df.loc[0, "name"] == "Avengers (1963) #1"
+
+@pytest.mark.parametrize("mode", ["batch", "stream"])
+def test_transformer_failure_keeps_previous_output(tmp_path, config, marvel_character_data, monkeypatch, mode):
+    config["transform"] = {"mode": mode}
+    (tmp_path / "raw.jsonl").write_text(json.dumps(marvel_character_data) + "\n")
+    (tmp_path / "out.csv").write_text("previous output\n")
+
+    def failing_to_csv(df, path_or_buf, *args, **kwargs):
+        target = path_or_buf if hasattr(path_or_buf, "write") else open(path_or_buf, "w")
+        target.write("id,na")
+        target.flush()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", failing_to_csv)
+
+    with pytest.raises(OSError):
+        Transformer(config, data_dir=tmp_path).run()
+
+    assert (tmp_path / "out.csv").read_text() == "previous output\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.csv", "raw.jsonl"]
+
+def test_transformer_replaces_partitioned_dataset_with_single_file(tmp_path, config, marvel_character_data):
+    pytest.importorskip("pyarrow")
+    config["output"]["format"] = "parquet"
+    write_characters(tmp_path / "raw.jsonl", marvel_character_data, 4)
+    config["output"]["parquet"] = {"partition_by": "id_bucket", "id_buckets": 2}
+    Transformer(config, data_dir=tmp_path).run()
+    assert (tmp_path / "out.parquet").is_dir()
+
+    config["output"]["parquet"] = {}
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert (tmp_path / "out.parquet").is_file()
+    assert len(pd.read_parquet(path)) == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.parquet", "raw.jsonl"]
+
+def test_shard_ranges_are_line_aligned(tmp_path):
+    from etl_pipeline.transformer import shard_ranges
+
+    path = tmp_path / "raw.jsonl"
+    lines = [json.dumps({"id": i, "name": "x" * (i % 7)}) + "\n" for i in range(50)]
+    path.write_text("".join(lines))
+    data = path.read_bytes()
+
+    for shards in (1, 2, 3, 8, 200):
+        ranges = shard_ranges(path, shards)
+        assert len(ranges) <= shards
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+    assert len(shard_ranges(path, 200)) == 50
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_transformer_parallel_matches_streaming(tmp_path, config, marvel_character_data, fmt):
+    config["output"]["format"] = fmt
+    rows = []
+    for i in range(300):
+        row = {**marvel_character_data, "id": i, "name": f"Hero {i}"}
+        if i % 50 == 0:
+            row["comics"] = None  # nulls in one shard only
+        if i >= 200:
+            row["description"] = None
+        rows.append(row)
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    config["transform"] = {"mode": "stream", "chunk_rows": 1000}
+    Transformer(config, data_dir=tmp_path).run()
+    expected = (tmp_path / f"out.{fmt}").read_bytes()
+
+    config["transform"] = {"mode": "parallel", "workers": 3, "parallel_min_bytes": 0}
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 300
+    if fmt == "csv":
+        assert (tmp_path / "out.csv").read_bytes() == expected
+    else:
+        pd.testing.assert_frame_equal(pd.read_parquet(path), pd.read_parquet(io.BytesIO(expected)))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out." + fmt, "raw.jsonl"]
+
+@pytest.mark.parametrize("compression, min_bytes", [(None, 10**9), ("gzip", 0)])
+def test_transformer_parallel_falls_back(tmp_path, config, marvel_character_data, caplog, compression, min_bytes):
+    import logging
+    from etl_pipeline.raw_io import RawWriter
+
+    caplog.set_level(logging.INFO)
+    config["transform"] = {"mode": "parallel", "workers": 4, "parallel_min_bytes": min_bytes}
+    with RawWriter(tmp_path / "raw.jsonl", "jsonl", compression) as writer:
+        writer.write_rows([{**marvel_character_data, "id": i} for i in range(3)])
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 3
+    assert "transforming in a single process" in caplog.text
+
+DECLARED_SCHEMA = {"id": "Int32", "name": "string[pyarrow]", "description": "string[pyarrow]", "counts": "Int32"}
+
+def test_output_dtypes_expands_counts():
+    from etl_pipeline.transformer import output_dtypes
+
+    assert output_dtypes(None, ["comics"]) is None
+    dtypes = output_dtypes({**DECLARED_SCHEMA, "events": "Int16"}, ["comics", "events"])
+    assert {column: str(dtype) for column, dtype in dtypes.items()} == {
+        "id": "Int32", "name": "string", "description": "string", "comics": "Int32", "events": "Int16"
+    }
+    with pytest.raises(ValueError, match="thumbnail"):
+        output_dtypes({"thumbnail": "string"}, ["comics"])
+
+def schema_rows(marvel_character_data):
+    rows = []
+    for i in range(300):
+        row = {**marvel_character_data, "id": i, "name": f"Hero {i}", "thumbnail": {"path": "x" * 40}}
+        if i % 50 == 0:
+            row["stories"] = None  # missing counts stay integers
+        if i >= 200:
+            row["description"] = None
+        rows.append(row)
+    return rows
+
+def test_transformer_declared_schema(tmp_path, config, marvel_character_data, caplog):
+    import logging
+
+    caplog.set_level(logging.INFO)
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in schema_rows(marvel_character_data)))
+    config["transform"] = {"schema": DECLARED_SCHEMA}
+
+    transformer = Transformer(config, data_dir=tmp_path)
+    df = transformer._flatten(transformer._read_frame())
+    path, count = transformer.run()
+
+    assert "thumbnail" not in transformer._read_frame().columns  # only the needed fields are parsed
+    assert {column: str(dtype) for column, dtype in df.dtypes.items()} == {
+        "id": "Int32", "name": "string", "description": "string",
+        "comics": "Int32", "series": "Int32", "stories": "Int32", "events": "Int32",
+    }
+    lines = (tmp_path / "out.csv").read_text().splitlines()
+    assert lines[1] == "0,Hero 0,Test description with multiple spaces,12,3,,1"
+    assert lines[2] == "1,Hero 1,Test description with multiple spaces,12,3,21,1"
+    assert "DataFrame memory (deep)" in caplog.text and "with the declared schema" in caplog.text
+
+@pytest.mark.parametrize("transform", [{}, {"mode": "stream", "chunk_rows": 1}])
+def test_transformer_declared_schema_null_name_in_preview(tmp_path, config, marvel_character_data, transform, capsys):
+    rows = [{**marvel_character_data, "name": None}, marvel_character_data]
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+    config["transform"] = {"schema": DECLARED_SCHEMA, **transform}
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 2
+    assert "| None " in capsys.readouterr().out
+    assert pd.read_csv(path)["name"].isna().tolist() == [True, False]
+
+@pytest.mark.parametrize("transform", [
+    {"engine": "arrow"},
+    {"mode": "stream", "chunk_rows": 120},
+    {"mode": "parallel", "workers": 3, "parallel_min_bytes": 0},
+])
+def test_transformer_declared_schema_same_types_in_every_mode(tmp_path, config, marvel_character_data, transform):
+    import pyarrow.parquet as pq
+
+    config["output"]["format"] = "parquet"
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in schema_rows(marvel_character_data)))
+    config["transform"] = {"schema": DECLARED_SCHEMA}
+    path, _ = Transformer(config, data_dir=tmp_path).run()
+    expected = pq.read_table(path)
+
+    config["transform"] = {"schema": DECLARED_SCHEMA, **transform}
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 300
+    table = pq.read_table(path)
+    assert table.schema.remove_metadata() == expected.schema.remove_metadata()
+    assert table.to_pylist() == expected.to_pylist()
+
+def test_transformer_declared_schema_falls_back_on_malformed_rows(tmp_path, config, marvel_character_data, caplog):
+    rows = [marvel_character_data, {**marvel_character_data, "id": 2, "comics": 5}]
+    (tmp_path / "raw.jsonl").write_text("".join(json.dumps(row) + "\n" for row in rows))
+    config["transform"] = {"schema": DECLARED_SCHEMA}
+
+    path, count = Transformer(config, data_dir=tmp_path).run()
+
+    assert count == 2
+    assert "inferring every field" in caplog.text
+    assert (tmp_path / "out.csv").read_text().splitlines()[2] == "2,3-D Man,Test description with multiple spaces,,3,21,1"